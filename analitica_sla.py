@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analítica histórica de SLA sobre las tablas de soporte, que solo crecen. Se leen
+las mismas tablas donde escriben los scripts:
+  - registro_sincronizacion (lectura_tablas.TABLA_REGISTRO_SYNC): resincronizaciones
+    por tabla y su desfase (fecha del registro - hora_detencion);
+  - error_sincronizacion (lectura_tablas.TABLA_ERROR_SYNC): errores de sincronización
+    por planta (sin las filas de cambios del circuito);
+  - la tabla de problemas del supervisor (SLA_TABLA_CONEXION, por defecto su
+    TABLA_PROBLEMAS): caídas por planta. Las filas seguidas de una planta forman
+    una caída; la cierra la fila "RECUPERADA tras N s" que deja el supervisor al
+    cerrarse el circuito, o se estima (ver _cerrar_caidas).
+Si una de las tablas no existe se avisa y se omite esa fuente.
+
+Cada corrida lee solo las filas nuevas (id > último id procesado, por fuente, en
+lotes de SLA_LOTE) y suma lo leído a tablas de resumen diario en el esquema de
+soporte; el resumen y el último id se guardan en la misma transacción, así que
+una corrida interrumpida no cuenta dos veces. Los reportes y tableros leen solo
+los resúmenes:
+  - sla_diario_tabla (dia, tabla): resyncs, desfase suma/máximo e histograma;
+  - sla_diario_planta (dia, planta): errores, fallos de conexión, caídas,
+    minutos caída y reparaciones (para MTTR);
+  - sla_progreso: último id por fuente; sla_caidas_abiertas: caídas en curso.
+
+    python analitica_sla.py                   # actualiza y muestra los últimos 7 días
+    python analitica_sla.py --dias 30 --json
+    python analitica_sla.py --solo-reporte
+"""
+import argparse
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+
+import pymysql
+
+import circuito_plantas
+import lectura_tablas as lt
+import supervisor_conexiones_remotas as sup
+
+SLA_ESQUEMA = os.getenv("SLA_ESQUEMA", lt.DB_NAME_SOPORTE)   # donde se crean los resúmenes
+# fuentes, como esquema.tabla (sin esquema: SLA_ESQUEMA)
+SLA_TABLA_RESYNC = os.getenv("SLA_TABLA_RESYNC", lt.TABLA_REGISTRO_SYNC)
+SLA_TABLA_ERRORES = os.getenv("SLA_TABLA_ERRORES", lt.TABLA_ERROR_SYNC)
+SLA_TABLA_CONEXION = os.getenv("SLA_TABLA_CONEXION", sup.TABLA_PROBLEMAS)
+SLA_LOTE = int(os.getenv("SLA_LOTE", "5000"))
+SLA_DIAS = int(os.getenv("SLA_DIAS", "7"))
+# fallos de una planta separados por más de esto son caídas distintas
+SLA_HUECO_CAIDA_MIN = float(os.getenv("SLA_HUECO_CAIDA_MIN", "30"))
+# duración que se asume para una caída sin fila de recuperación (intervalo del supervisor)
+SLA_INTERVALO_SONDEO_MIN = float(os.getenv("SLA_INTERVALO_SONDEO_MIN", "2"))
+
+# histograma de desfase: columna -> límite superior en segundos
+BUCKETS_DESFASE = (("d_1m", 60), ("d_5m", 300), ("d_15m", 900), ("d_1h", 3600),
+                   ("d_6h", 21600), ("d_mas", None))
+RECUPERADA = "RECUPERADA"
+CIRCUITO = "CIRCUITO"   # otros cambios de estado del circuito (circuito_plantas.describir)
+_APERTURA = re.compile(r"^CIRCUITO \w+ -> abierto\b")   # apertura o reapertura: un fallo de conexión
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS {e}.sla_progreso (
+        fuente VARCHAR(64) NOT NULL PRIMARY KEY,
+        ultimo_id BIGINT NOT NULL DEFAULT 0,
+        actualizado DATETIME NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {e}.sla_diario_tabla (
+        dia DATE NOT NULL,
+        tabla VARCHAR(30) NOT NULL,
+        planta VARCHAR(10) NULL,
+        tipo VARCHAR(10) NULL,
+        resyncs INT NOT NULL DEFAULT 0,
+        desfase_suma_s DOUBLE NOT NULL DEFAULT 0,
+        desfase_max_s DOUBLE NOT NULL DEFAULT 0,
+        """ + ",\n        ".join(f"{c} INT NOT NULL DEFAULT 0" for c, _ in BUCKETS_DESFASE) + """,
+        PRIMARY KEY (dia, tabla)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {e}.sla_diario_planta (
+        dia DATE NOT NULL,
+        planta VARCHAR(10) NOT NULL,
+        errores_sync INT NOT NULL DEFAULT 0,
+        fallos_conexion INT NOT NULL DEFAULT 0,
+        caidas INT NOT NULL DEFAULT 0,
+        minutos_caida DOUBLE NOT NULL DEFAULT 0,
+        reparaciones INT NOT NULL DEFAULT 0,
+        minutos_reparacion DOUBLE NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, planta)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {e}.sla_caidas_abiertas (
+        planta VARCHAR(10) NOT NULL PRIMARY KEY,
+        inicio DATETIME NOT NULL,
+        ultimo DATETIME NOT NULL
+    )
+    """,
+)
+
+_COLS_TABLA = ("resyncs", "desfase_suma_s", "desfase_max_s") + tuple(c for c, _ in BUCKETS_DESFASE)
+_COLS_PLANTA = ("errores_sync", "fallos_conexion", "caidas", "minutos_caida", "reparaciones", "minutos_reparacion")
+
+
+def crear_tablas(conn):
+    with conn.cursor() as cur:
+        for ddl in _DDL:
+            cur.execute(ddl.format(e=SLA_ESQUEMA))
+    # con tabla en VARCHAR(10) las resyncs de horometro_XX / pesometro_XX quedan sin planta
+    if _fqn(SLA_TABLA_RESYNC) == lt.TABLA_REGISTRO_SYNC:
+        lt.ampliar_registro_sync(conn)
+
+
+def _partes(fqn):
+    """'esquema.tabla' -> (esquema, tabla); sin esquema, SLA_ESQUEMA."""
+    esquema, _, tabla = fqn.strip().rpartition(".")
+    return esquema or SLA_ESQUEMA, tabla
+
+
+def _fqn(fqn):
+    return "{}.{}".format(*_partes(fqn))
+
+
+def _planta_de(valor):
+    """'HOST_61', '61', 'plc_61' -> '61'; None si no trae número."""
+    m = re.search(r"(\d+)$", str(valor or ""))
+    return m.group(1) if m else None
+
+
+def _bucket(desfase_s):
+    for col, limite in BUCKETS_DESFASE:
+        if limite is None or desfase_s <= limite:
+            return col
+
+
+def _por_dia(inicio, fin):
+    """Reparte [inicio, fin) en (dia, minutos) por día calendario."""
+    while inicio < fin:
+        corte = min(fin, datetime.combine(inicio.date() + timedelta(days=1), datetime.min.time()))
+        yield inicio.date(), (corte - inicio).total_seconds() / 60
+        inicio = corte
+
+
+class Acumulado:
+    """Sumas de un lote, por (dia, tabla) y (dia, planta), listas para el upsert."""
+
+    def __init__(self):
+        self.tablas = {}    # (dia, tabla) -> {"planta", "tipo", col: valor}
+        self.plantas = {}   # (dia, planta) -> {col: valor}
+
+    def _planta(self, dia, planta):
+        return self.plantas.setdefault((dia, planta), dict.fromkeys(_COLS_PLANTA, 0))
+
+    def resync(self, fila):
+        tabla = fila["tabla"] or ""
+        tipo, planta = lt._parse_tipo_planta(tabla)
+        a = self.tablas.setdefault((fila["fecha"].date(), tabla), {
+            "planta": str(planta) if planta is not None else None, "tipo": tipo,
+            **dict.fromkeys(_COLS_TABLA, 0)})
+        desfase = max(0.0, (fila["fecha"] - fila["hora_detencion"]).total_seconds()) \
+            if fila["hora_detencion"] else 0.0
+        a["resyncs"] += 1
+        a["desfase_suma_s"] += desfase
+        a["desfase_max_s"] = max(a["desfase_max_s"], desfase)
+        a[_bucket(desfase)] += 1
+
+    def error(self, dia, planta):
+        self._planta(dia, planta or "")["errores_sync"] += 1
+
+    def fallo(self, fecha, planta):
+        self._planta(fecha.date(), planta)["fallos_conexion"] += 1
+
+    def caida(self, planta, inicio, fin):
+        """Caída cerrada: cuenta al día de inicio, los minutos por día y la reparación al día de fin."""
+        self._planta(inicio.date(), planta)["caidas"] += 1
+        for dia, minutos in _por_dia(inicio, fin):
+            self._planta(dia, planta)["minutos_caida"] += minutos
+        r = self._planta(fin.date(), planta)
+        r["reparaciones"] += 1
+        r["minutos_reparacion"] += (fin - inicio).total_seconds() / 60
+
+    def vacio(self):
+        return not self.tablas and not self.plantas
+
+
+def _upsert(cur, tabla, claves, filas, cols, maximos=()):
+    if not filas:
+        return
+    todas = claves + cols
+    marcas = "(" + ", ".join(["%s"] * len(todas)) + ")"
+    act = ", ".join(
+        f"`{c}` = GREATEST(`{c}`, VALUES(`{c}`))" if c in maximos else f"`{c}` = `{c}` + VALUES(`{c}`)"
+        for c in cols)
+    sql = (f"INSERT INTO {SLA_ESQUEMA}.{tabla} ({', '.join(f'`{c}`' for c in todas)}) VALUES "
+           + ", ".join([marcas] * len(filas)) + f" ON DUPLICATE KEY UPDATE {act}")
+    valores = []
+    for f in filas:
+        valores.extend(f)
+    cur.execute(sql, valores)
+
+
+def _guardar(conn, acumulado, progreso, abiertas=None):
+    """Suma el lote a los resúmenes y avanza el progreso en una sola transacción."""
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            _upsert(cur, "sla_diario_tabla", ("dia", "tabla", "planta", "tipo"),
+                    [(d, t, a["planta"], a["tipo"], *(a[c] for c in _COLS_TABLA))
+                     for (d, t), a in acumulado.tablas.items()],
+                    _COLS_TABLA, maximos=("desfase_max_s",))
+            _upsert(cur, "sla_diario_planta", ("dia", "planta"),
+                    [(d, p, *(a[c] for c in _COLS_PLANTA)) for (d, p), a in acumulado.plantas.items()],
+                    _COLS_PLANTA)
+            for fuente, ultimo_id in progreso.items():
+                cur.execute(
+                    f"INSERT INTO {SLA_ESQUEMA}.sla_progreso (fuente, ultimo_id, actualizado) VALUES (%s, %s, %s) "
+                    f"ON DUPLICATE KEY UPDATE ultimo_id = VALUES(ultimo_id), actualizado = VALUES(actualizado)",
+                    (fuente, ultimo_id, datetime.now()))
+            if abiertas is not None:
+                cur.execute(f"DELETE FROM {SLA_ESQUEMA}.sla_caidas_abiertas")
+                for planta, (inicio, ultimo) in abiertas.items():
+                    cur.execute(f"INSERT INTO {SLA_ESQUEMA}.sla_caidas_abiertas (planta, inicio, ultimo) "
+                                f"VALUES (%s, %s, %s)", (planta, inicio, ultimo))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _progreso(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT fuente, ultimo_id FROM {SLA_ESQUEMA}.sla_progreso")
+        return {r["fuente"]: int(r["ultimo_id"]) for r in cur.fetchall()}
+
+
+def _lotes(conn, fuente, columnas, desde_id, lote=SLA_LOTE):
+    """Genera lotes de filas con id > desde_id, en orden de id."""
+    sql = (f"SELECT id, {', '.join(columnas)} FROM {_fqn(fuente)} "
+           f"WHERE id > %s ORDER BY id LIMIT %s")
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(sql, (desde_id, lote))
+            filas = cur.fetchall()
+        if not filas:
+            return
+        yield filas
+        desde_id = filas[-1]["id"]
+
+
+def _columnas(conn, fuente):
+    esquema, tabla = _partes(fuente)
+
+    def consultar():
+        with conn.cursor() as cur:
+            cur.execute("SELECT COLUMN_NAME AS col FROM information_schema.columns "
+                        "WHERE table_schema = %s AND table_name = %s", (esquema, tabla))
+            return {r["col"] for r in cur.fetchall()}
+    return lt.cache_descubrimiento.columnas(conn, tabla, consultar, schema=esquema)
+
+
+def _clave(fuente):
+    """Clave de la fuente en sla_progreso: el nombre de la tabla."""
+    return _partes(fuente)[1]
+
+
+def _procesar_resyncs(conn, desde_id, fuente=None):
+    fuente = fuente or SLA_TABLA_RESYNC
+    n = 0
+    for filas in _lotes(conn, fuente, ("fecha", "tabla", "hora_detencion"), desde_id):
+        acc = Acumulado()
+        for f in filas:
+            if f["fecha"] is not None:
+                acc.resync(f)
+        _guardar(conn, acc, {_clave(fuente): filas[-1]["id"]})
+        n += len(filas)
+    return n
+
+
+def _procesar_errores(conn, desde_id, fuente=None):
+    fuente = fuente or SLA_TABLA_ERRORES
+    # error_sincronizacion no siempre tiene columna de fecha: sin ella, cada fila cuenta
+    # el día en que se procesa (con corridas frecuentes, el mismo día en que se insertó)
+    con_fecha = "fecha" in _columnas(conn, fuente)
+    n = 0
+    for filas in _lotes(conn, fuente, ("planta", "tipo", "fecha") if con_fecha else ("planta", "tipo"), desde_id):
+        acc = Acumulado()
+        hoy = date.today()
+        for f in filas:
+            if f["tipo"] == "circuito":   # cambios de estado del circuito, no errores
+                continue
+            acc.error(f["fecha"].date() if con_fecha and f["fecha"] else hoy, f["planta"])
+        _guardar(conn, acc, {_clave(fuente): filas[-1]["id"]})
+        n += len(filas)
+    return n
+
+
+def _caidas_abiertas(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT planta, inicio, ultimo FROM {SLA_ESQUEMA}.sla_caidas_abiertas")
+        return {r["planta"]: (r["inicio"], r["ultimo"]) for r in cur.fetchall()}
+
+
+def _estimada(ultimo):
+    return ultimo + timedelta(minutes=SLA_INTERVALO_SONDEO_MIN)
+
+
+def _procesar_conexion(conn, desde_id, fuente=None):
+    """
+    Arma las caídas a partir de los fallos: un fallo a menos de SLA_HUECO_CAIDA_MIN del
+    anterior de la misma planta sigue la misma caída; una fila RECUPERADA la cierra en
+    su fecha y las demás filas del circuito (semiabierto, reapertura) la extienden.
+    Una fila "CIRCUITO ... -> abierto" es un fallo y, sin caída abierta, la empieza:
+    la planta pudo caer primero para lectura_tablas (su fallo queda en
+    error_sincronizacion) o el único fallo visto es el del sondeo semiabierto.
+    Las caídas que siguen abiertas quedan en sla_caidas_abiertas.
+    """
+    fuente = fuente or SLA_TABLA_CONEXION
+    abiertas = _caidas_abiertas(conn)
+    hueco = timedelta(minutes=SLA_HUECO_CAIDA_MIN)
+    n = 0
+    for filas in _lotes(conn, fuente, ("fecha", "planta", "problema"), desde_id):
+        acc = Acumulado()
+        for f in filas:
+            planta, fecha = _planta_de(f["planta"]), f["fecha"]
+            if planta is None or fecha is None:
+                continue
+            abierta = abiertas.get(planta)
+            problema = f["problema"] or ""
+            if problema.startswith(RECUPERADA):
+                if abierta:
+                    acc.caida(planta, abierta[0], max(fecha, abierta[0]))
+                    del abiertas[planta]
+                continue
+            if problema.startswith(CIRCUITO):
+                if _APERTURA.match(problema):
+                    acc.fallo(fecha, planta)
+                if abierta:
+                    abiertas[planta] = (abierta[0], max(fecha, abierta[1]))
+                elif _APERTURA.match(problema):
+                    abiertas[planta] = (fecha, fecha)
+                continue
+            acc.fallo(fecha, planta)
+            if abierta and fecha - abierta[1] <= hueco:
+                abiertas[planta] = (abierta[0], fecha)
+                continue
+            if abierta:
+                acc.caida(planta, abierta[0], _estimada(abierta[1]))
+            abiertas[planta] = (fecha, fecha)
+        _guardar(conn, acc, {_clave(fuente): filas[-1]["id"]}, abiertas)
+        n += len(filas)
+    _cerrar_caidas(conn, abiertas)
+    return n
+
+
+def _cerrar_caidas(conn, abiertas, ahora=None):
+    """
+    Cierra las caídas abiertas que ya terminaron sin fila RECUPERADA: si el circuito de
+    la planta está cerrado (lo cerró p.ej. lectura_tablas), en el momento en que se
+    cerró; sin circuito, si pasó SLA_HUECO_CAIDA_MIN sin fallos, un intervalo de sondeo
+    después del último fallo. Con el circuito abierto la caída sigue en curso.
+    """
+    ahora = ahora or datetime.now()
+    circuitos = circuito_plantas.estado() if circuito_plantas.CIRCUITO else {}
+    acc = Acumulado()
+    for planta, (inicio, ultimo) in list(abiertas.items()):
+        e = circuitos.get(planta)
+        if e is not None:
+            if e["estado"] != "cerrado":
+                continue
+            fin = max(datetime.fromtimestamp(e["desde"]), ultimo)
+        elif ahora - ultimo > timedelta(minutes=SLA_HUECO_CAIDA_MIN):
+            fin = _estimada(ultimo)
+        else:
+            continue
+        acc.caida(planta, inicio, fin)
+        del abiertas[planta]
+    if not acc.vacio():
+        _guardar(conn, acc, {}, abiertas)
+
+
+def actualizar(conn=None):
+    """
+    Procesa las filas nuevas de las tres fuentes. Retorna {fuente: filas leídas}, con
+    None en las fuentes cuya tabla no existe.
+    """
+    cerrar = conn is None
+    conn = conn or lt.get_conn_soporte()
+    try:
+        crear_tablas(conn)
+        progreso = _progreso(conn)
+        res = {}
+        for fuente, procesar in ((SLA_TABLA_RESYNC, _procesar_resyncs),
+                                 (SLA_TABLA_ERRORES, _procesar_errores),
+                                 (SLA_TABLA_CONEXION, _procesar_conexion)):
+            try:
+                res[_clave(fuente)] = procesar(conn, progreso.get(_clave(fuente), 0), fuente)
+            except pymysql.err.MySQLError as e:
+                if not (e.args and e.args[0] == 1146):
+                    raise
+                print(f"⚠️  {_fqn(fuente)} no existe, se omite: {e}")
+                res[_clave(fuente)] = None
+        return res
+    finally:
+        if cerrar:
+            conn.close()
+
+
+def _percentil_histograma(buckets, p):
+    """Límite superior (s) del bucket donde cae el percentil p; None = más de 6 h."""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    acumulado = 0
+    for col, limite in BUCKETS_DESFASE:
+        acumulado += buckets.get(col, 0)
+        if acumulado >= total * p / 100:
+            return limite
+    return None
+
+
+def reporte(conn=None, dias: int = SLA_DIAS):
+    """
+    SLA de los últimos `dias` días (incluido hoy) a partir de los resúmenes:
+    por planta uptime %, MTTR, caídas y errores; por tabla resyncs/día y desfase.
+    """
+    cerrar = conn is None
+    conn = conn or lt.get_conn_soporte()
+    desde = date.today() - timedelta(days=dias - 1)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT planta, SUM(errores_sync) AS errores_sync, SUM(fallos_conexion) AS fallos_conexion, "
+                f"SUM(caidas) AS caidas, SUM(minutos_caida) AS minutos_caida, SUM(reparaciones) AS reparaciones, "
+                f"SUM(minutos_reparacion) AS minutos_reparacion "
+                f"FROM {SLA_ESQUEMA}.sla_diario_planta WHERE dia >= %s GROUP BY planta", (desde,))
+            por_planta = cur.fetchall()
+            cur.execute(
+                f"SELECT tabla, MAX(planta) AS planta, MAX(tipo) AS tipo, SUM(resyncs) AS resyncs, "
+                f"SUM(desfase_suma_s) AS desfase_suma_s, MAX(desfase_max_s) AS desfase_max_s, "
+                + ", ".join(f"SUM({c}) AS {c}" for c, _ in BUCKETS_DESFASE) +
+                f" FROM {SLA_ESQUEMA}.sla_diario_tabla WHERE dia >= %s GROUP BY tabla", (desde,))
+            por_tabla = cur.fetchall()
+        abiertas = _caidas_abiertas(conn)
+    finally:
+        if cerrar:
+            conn.close()
+
+    ahora = datetime.now()
+    minutos_periodo = (ahora - datetime.combine(desde, datetime.min.time())).total_seconds() / 60
+    # plantas con una caída en curso que empezó antes de la ventana no tienen filas en ella
+    vistas = {r["planta"] for r in por_planta}
+    por_planta = list(por_planta) + [
+        {"planta": p, **dict.fromkeys(_COLS_PLANTA, 0)} for p in abiertas if p not in vistas]
+    plantas = []
+    for r in por_planta:
+        caida = float(r["minutos_caida"] or 0)
+        en_curso = abiertas.get(r["planta"])
+        if en_curso:
+            caida += (ahora - max(en_curso[0], datetime.combine(desde, datetime.min.time()))).total_seconds() / 60
+        rep = int(r["reparaciones"] or 0)
+        plantas.append({
+            "planta": r["planta"],
+            "uptime_pct": round(max(0.0, 100 * (1 - caida / minutos_periodo)), 3),
+            "mttr_min": round(float(r["minutos_reparacion"]) / rep, 1) if rep else None,
+            "caidas": int(r["caidas"] or 0) + (1 if en_curso else 0),
+            "caida_en_curso_desde": en_curso[0].strftime("%Y-%m-%d %H:%M:%S") if en_curso else None,
+            "minutos_caida": round(caida, 1),
+            "fallos_conexion": int(r["fallos_conexion"] or 0),
+            "errores_sync": int(r["errores_sync"] or 0),
+        })
+    tablas = []
+    for r in por_tabla:
+        n = int(r["resyncs"] or 0)
+        buckets = {c: int(r[c] or 0) for c, _ in BUCKETS_DESFASE}
+        tablas.append({
+            "tabla": r["tabla"], "planta": r["planta"], "tipo": r["tipo"],
+            "resyncs": n,
+            "resyncs_por_dia": round(n / dias, 2),
+            "desfase_medio_s": round(float(r["desfase_suma_s"]) / n, 1) if n else None,
+            "desfase_p50_s": _percentil_histograma(buckets, 50),
+            "desfase_p95_s": _percentil_histograma(buckets, 95),
+            "desfase_max_s": round(float(r["desfase_max_s"] or 0), 1),
+            "histograma": buckets,
+        })
+    plantas.sort(key=lambda p: p["uptime_pct"])
+    tablas.sort(key=lambda t: t["resyncs"], reverse=True)
+    return {"desde": desde.isoformat(), "dias": dias, "generado": ahora.strftime("%Y-%m-%d %H:%M:%S"),
+            "plantas": plantas, "tablas": tablas}
+
+
+def _fmt_p(v):
+    return "-" if v is None else (f"<={v // 60}m" if v < 3600 else f"<={v // 3600}h")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dias", type=int, default=SLA_DIAS)
+    ap.add_argument("--solo-reporte", action="store_true", help="no procesar filas nuevas")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    conn = lt.get_conn_soporte()
+    try:
+        leidas = {} if args.solo_reporte else actualizar(conn)
+        data = reporte(conn, args.dias)
+    finally:
+        conn.close()
+    data["filas_procesadas"] = leidas
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
+        return data
+    if leidas:
+        print("filas nuevas: " + ", ".join(f"{k}={'omitida' if v is None else v}" for k, v in leidas.items()))
+    print(f"\n--- plantas (desde {data['desde']}) ---")
+    for p in data["plantas"]:
+        mttr = "-" if p["mttr_min"] is None else f"{p['mttr_min']}min"
+        curso = f" ⚠️ caída desde {p['caida_en_curso_desde']}" if p["caida_en_curso_desde"] else ""
+        print(f"planta {p['planta']}: uptime {p['uptime_pct']}% caídas={p['caidas']} MTTR={mttr} "
+              f"errores_sync={p['errores_sync']}{curso}")
+    print("\n--- tablas por resyncs ---")
+    for t in data["tablas"]:
+        print(f"{t['tabla']}: {t['resyncs']} resyncs ({t['resyncs_por_dia']}/día) desfase "
+              f"p50 {_fmt_p(t['desfase_p50_s'])} p95 {_fmt_p(t['desfase_p95_s'])} máx {t['desfase_max_s']}s")
+    return data
+
+
+if __name__ == "__main__":
+    main()
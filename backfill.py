@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relleno (backfill) de una tabla del centralizado copiando directo desde la planta.
+
+En vez de borrar la cola del centralizado y esperar a que el sincronizador la
+vuelva a bajar, copia las filas remotas de un rango de fechas:
+  - lee la tabla remota con un cursor sin buffer (SSDictCursor) en bloques de
+    BACKFILL_CHUNK filas, así la memoria no depende del tamaño del vacío;
+  - escribe cada bloque con un INSERT de varias filas: si el centralizado tiene
+    índice único en `fecha`, INSERT ... ON DUPLICATE KEY UPDATE; si no, borra el
+    tramo de fechas del bloque y lo inserta en la misma transacción;
+  - después de cada bloque guarda un checkpoint en BACKFILL_CHECKPOINTS, y una
+    corrida interrumpida retoma desde ahí.
+
+    python backfill.py --tabla plc_61 --desde "2026-10-17 08:00" --hasta "2026-10-17 12:00"
+    python backfill.py --completitud completitud.json    # los intervalos faltantes del reporte
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pymysql
+
+import cache_descubrimiento
+import diagnostico_indices
+import lectura_tablas as lt
+import planificador_resync
+import registro_plantas
+
+BACKFILL_CHUNK = int(os.getenv("BACKFILL_CHUNK", "1000"))
+BACKFILL_CHECKPOINTS = os.getenv("BACKFILL_CHECKPOINTS", "backfill_checkpoints.json")
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+_lock_checkpoints = threading.Lock()
+
+
+def _leer_checkpoints(path=BACKFILL_CHECKPOINTS):
+    p = Path(path)
+    if not p.exists():
+        return {}
+    try:
+        with p.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_checkpoint(tabla, estado, path=BACKFILL_CHECKPOINTS):
+    """Actualiza (o borra, con estado None) el checkpoint de `tabla`."""
+    with _lock_checkpoints:
+        data = _leer_checkpoints(path)
+        if estado is None:
+            data.pop(tabla, None)
+        else:
+            data[tabla] = estado
+        p = Path(path)
+        tmp = p.with_name(p.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp.replace(p)
+
+
+def indices(conn, tabla):
+    """{indice: {"columnas": [...], "unico": bool}} (cacheado en cache_descubrimiento)."""
+    def consultar():
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT INDEX_NAME AS idx, COLUMN_NAME AS col, NON_UNIQUE AS nu
+                FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = %s
+                ORDER BY INDEX_NAME, SEQ_IN_INDEX
+                """,
+                (tabla,),
+            )
+            res = {}
+            for r in cur.fetchall():
+                i = res.setdefault(r["idx"], {"columnas": [], "unico": not int(r["nu"])})
+                i["columnas"].append(r["col"])
+            return res
+    return cache_descubrimiento.indices(conn, tabla, consultar)
+
+
+def fecha_unica(conn, tabla) -> bool:
+    """True si la tabla tiene un índice único exactamente sobre (`fecha`)."""
+    return any(i["unico"] and i["columnas"] == ["fecha"] for i in indices(conn, tabla).values())
+
+
+def _columnas_copia(cols_central, cols_remota):
+    """
+    (columnas leídas de la planta, columnas escritas en el centralizado). Se copian las
+    comunes salvo `id` (autoincremental propio de cada lado); `fecha_busqueda`, que solo
+    existe en el centralizado, se completa con la misma `fecha` de la fila.
+    """
+    comunes = sorted(c for c in cols_central & cols_remota if c != "id")
+    if "fecha" not in comunes:
+        raise RuntimeError("la tabla no tiene columna `fecha` en ambos lados")
+    destino = list(comunes)
+    if "fecha_busqueda" in cols_central and "fecha_busqueda" not in cols_remota:
+        destino.append("fecha_busqueda")
+    return comunes, destino
+
+
+def _escribir_bloque(conn, tabla, destino, filas, upsert, borrar_desde, incluye_desde):
+    """Escribe un bloque en una transacción. Retorna filas insertadas/actualizadas."""
+    cols = ", ".join(f"`{c}`" for c in destino)
+    marcas = "(" + ", ".join(["%s"] * len(destino)) + ")"
+    valores = []
+    for f in filas:
+        valores.extend(f["fecha"] if c == "fecha_busqueda" and c not in f else f[c] for c in destino)
+    sql = f"INSERT INTO `{tabla}` ({cols}) VALUES " + ", ".join([marcas] * len(filas))
+    if upsert:
+        sql += " ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"`{c}` = VALUES(`{c}`)" for c in destino if c != "fecha")
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            if not upsert:
+                op = ">=" if incluye_desde else ">"
+                cur.execute(f"DELETE FROM `{tabla}` WHERE `fecha` {op} %s AND `fecha` <= %s",
+                            (borrar_desde, filas[-1]["fecha"]))
+            cur.execute(sql, valores)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(filas)
+
+
+def copiar_rango(tabla, desde, hasta, chunk: int = BACKFILL_CHUNK, dry_run: bool = False):
+    """
+    Copia a `tabla` (centralizado) las filas remotas con desde <= fecha < hasta.
+    Si hay un checkpoint del mismo rango, retoma desde él. Retorna un resumen dict.
+    """
+    e = registro_plantas.obtener().entrada_central(tabla)
+    if e is None:
+        raise RuntimeError(f"{tabla} no tiene tabla remota en plantas.json")
+    remota = e["tabla_remota"]
+    for t in (tabla, remota):
+        if not lt._VALID_TBL.match(t):
+            raise ValueError(f"Nombre de tabla inválido: {t}")
+
+    rango = {"desde": desde.strftime(_FMT), "hasta": hasta.strftime(_FMT)}
+    previo = _leer_checkpoints().get(tabla)
+    inicio, incluye_inicio, copiadas = desde, True, 0
+    if previo and previo.get("desde") == rango["desde"] and previo.get("hasta") == rango["hasta"]:
+        inicio = datetime.strptime(previo["checkpoint"], _FMT)
+        copiadas = previo.get("filas", 0)
+        print(f"{tabla}: retomando desde {previo['checkpoint']} ({copiadas} filas ya copiadas)")
+
+    bloques = 0
+    with lt.bloqueo_tabla(tabla):  # no borrar/escribir a la vez que un ciclo de lectura_tablas
+        conn_central = lt.get_conn()
+        conn_remota = lt._conectar_planta(e["planta"])
+        try:
+            leer, destino = _columnas_copia(
+                planificador_resync.columnas(conn_central, tabla),
+                diagnostico_indices.columnas_tabla(conn_remota, remota),
+            )
+            upsert = fecha_unica(conn_central, tabla)
+            with conn_remota.cursor() as cur:
+                # el servidor remoto espera mientras se escribe cada bloque en el centralizado
+                cur.execute("SET SESSION net_write_timeout = 600")
+            sql = (f"SELECT {', '.join(f'`{c}`' for c in leer)} FROM `{remota}` "
+                   f"WHERE `fecha` >= %s AND `fecha` < %s ORDER BY `fecha`")
+            with conn_remota.cursor(pymysql.cursors.SSDictCursor) as cur:
+                cur.execute(sql, (inicio, hasta))
+                while True:
+                    filas = cur.fetchmany(chunk)
+                    if not filas:
+                        break
+                    bloques += 1
+                    if not dry_run:
+                        copiadas += _escribir_bloque(conn_central, tabla, destino, filas, upsert,
+                                                     inicio, incluye_inicio)
+                        # todo lo anterior a la última fecha del bloque ya está completo
+                        _guardar_checkpoint(tabla, {**rango, "checkpoint": filas[-1]["fecha"].strftime(_FMT),
+                                                    "filas": copiadas})
+                    else:
+                        copiadas += len(filas)
+                    inicio, incluye_inicio = filas[-1]["fecha"], False
+        finally:
+            conn_remota.close()
+            conn_central.close()
+
+    if not dry_run:
+        _guardar_checkpoint(tabla, None)
+    return {"tabla": tabla, "tabla_remota": remota, **rango, "filas": copiadas, "bloques": bloques,
+            "modo": "upsert" if upsert else "reemplazo", "dry_run": dry_run}
+
+
+def _intervalos_completitud(path):
+    """[(tabla, desde, hasta)] de los intervalos faltantes de un reporte de completitud.py."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    res = []
+    for r in data.get("tablas", []):
+        for d in r.get("intervalos", []):
+            if d["tipo"] == "faltante":
+                res.append((r["tabla"], datetime.strptime(d["desde"], _FMT), datetime.strptime(d["hasta"], _FMT)))
+    return res
+
+
+def _fecha(v):
+    for fmt in (_FMT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(v, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"fecha inválida: {v}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tabla", help="tabla del centralizado")
+    ap.add_argument("--desde", type=_fecha)
+    ap.add_argument("--hasta", type=_fecha)
+    ap.add_argument("--completitud", help="reporte de completitud.py: rellena sus intervalos faltantes")
+    ap.add_argument("--chunk", type=int, default=BACKFILL_CHUNK)
+    ap.add_argument("--dry-run", action="store_true", help="solo cuenta las filas a copiar")
+    args = ap.parse_args(argv)
+
+    if args.completitud:
+        trabajos = _intervalos_completitud(args.completitud)
+    elif args.tabla and args.desde and args.hasta:
+        trabajos = [(args.tabla, args.desde, args.hasta)]
+    else:
+        ap.error("indicar --tabla, --desde y --hasta, o --completitud")
+
+    resultados = []
+    for tabla, desde, hasta in trabajos:
+        try:
+            r = copiar_rango(tabla, desde, hasta, args.chunk, args.dry_run)
+            print(f"✅ {tabla} {r['desde']} - {r['hasta']}: {r['filas']} filas en {r['bloques']} bloques ({r['modo']})")
+        except Exception as e:
+            r = {"tabla": tabla, "desde": desde.strftime(_FMT), "hasta": hasta.strftime(_FMT),
+                 "error": f"{type(e).__name__}: {e}"}
+            print(f"❌ {tabla} {r['desde']} - {r['hasta']}: {r['error']}")
+        resultados.append(r)
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ciclo de lectura_tablas.main() y de verificar_conexiones_plantas().
+
+Arma un centralizado y N plantas con tablas plc_/horometro_/pesometro_ sintéticas
+sobre fake_mysql (servidor simulado en memoria), con latencia inyectada por
+planta y plantas caídas, y mide el ciclo completo y cada etapa:
+listado, escaneo central, consultas remotas, borrados y registros.
+
+    python benchmark.py --plantas 8 16 32 --filas 5000 --atrasadas 0.5 --caidas 1 \
+        --latencia-ms 80 --salida bench_resultados/actual.json
+    python benchmark.py ... --comparar bench_resultados/anterior.json
+
+Los resultados se guardan en JSON para comparar entre versiones.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TIPOS = {"plc": "plc1", "horometro": "horometro_plc1", "pesometro": "pesometro1"}
+COLS_CENTRAL = ["id", "fecha", "fecha_busqueda", "valor"]
+COLS_REMOTA = ["id", "fecha", "valor"]
+PASO_S = 5  # segundos entre registros sintéticos
+
+
+def _filas(n, ultima, paso_s, con_busqueda, busqueda=None):
+    filas = []
+    for i in range(n):
+        f = ultima - timedelta(seconds=paso_s * (n - 1 - i))
+        fila = {"id": i + 1, "fecha": f, "valor": i}
+        if con_busqueda:
+            fila["fecha_busqueda"] = busqueda if (busqueda and i == n - 1) else f
+        filas.append(fila)
+    return filas
+
+
+def armar_escenario(fake, n_plantas, filas, atrasadas, caidas, latencia_ms, latencia_central_ms, paso_s=PASO_S):
+    """
+    Crea servidor simulado + plantas.json. Las tablas "atrasadas" tienen el centralizado
+    10 minutos detrás de la planta y fecha_busqueda adelantada (disparan borrado).
+    Retorna (servidor, env, config).
+    """
+    srv = fake.Servidor()
+    ahora = datetime.now().replace(microsecond=0)
+    plantas = [str(101 + i) for i in range(n_plantas)]
+    env = {
+        "DB_HOST": "central", "DB_PORT": "3306", "DB_USER": "bench", "DB_PASS": "bench",
+        "DB_NAME": "datos_base_plantas", "DB_NAME_SOPORTE": "soporte_tensor",
+    }
+    config = {"plantas": {}}
+    central = srv.base("central", "datos_base_plantas")
+    srv.latencia["central"] = (latencia_central_ms / 1000, latencia_central_ms / 1000)
+    n_atrasadas = int(round(atrasadas * n_plantas * len(TIPOS)))
+    k = 0
+    for i, p in enumerate(plantas):
+        host = f"planta-{p}"
+        env.update({f"HOST_{p}": host, f"USER_{p}": "bench", f"PASS_{p}": "bench", f"DB_{p}": "planta"})
+        config["plantas"][p] = {"numero_planta": i, "tablas": dict(TIPOS)}
+        srv.latencia[host] = (latencia_ms / 1000, latencia_ms / 1000)
+        if i < caidas:
+            srv.caidos.add(host)
+        remota = srv.base(host, "planta")
+        for tipo, tabla_remota in TIPOS.items():
+            atrasada = k < n_atrasadas
+            k += 1
+            ultima_remota = ahora - timedelta(seconds=30)
+            ultima_central = ultima_remota - timedelta(minutes=10) if atrasada else ultima_remota
+            central[f"{tipo}_{p}"] = fake.Tabla(
+                COLS_CENTRAL, _filas(filas, ultima_central, paso_s, True, busqueda=ahora if atrasada else None))
+            remota[tabla_remota] = fake.Tabla(COLS_REMOTA, _filas(filas, ultima_remota, paso_s, False))
+    return srv, env, config
+
+
+def sembrar_estado(config, paso_s=PASO_S):
+    """
+    Estado inicial fijo para cada repetición: el modelo de llegadas ya aprendido con la
+    cadencia del escenario (mismos umbrales en todas las corridas, no arranque en frío) y
+    el diagnóstico con índice en `fecha`, así la muestra del modelo se pide en cada ciclo.
+    """
+    import lectura_tablas
+    import modelo_llegadas
+
+    tablas = [f"{tipo}_{p}" for p, c in config["plantas"].items() for tipo in c["tablas"]]
+    semilla = {"media": float(paso_s), "var": 0.0, "n": modelo_llegadas.MIN_MUESTRAS_LLEGADAS, "ultima": None}
+    Path(modelo_llegadas.MODELO_LLEGADAS_FILE).write_text(
+        json.dumps({t: semilla for t in tablas}), encoding="utf-8")
+    Path(lectura_tablas.DIAGNOSTICO_FILE).write_text(
+        json.dumps({"estrategias_central": {t: "max" for t in tablas}}), encoding="utf-8")
+
+
+class Etapas:
+    """Envuelve funciones de un módulo para acumular llamadas y tiempos por etapa."""
+
+    def __init__(self):
+        self.datos = {}
+        self._originales = []
+
+    def envolver(self, modulo, nombre, etapa):
+        original = getattr(modulo, nombre)
+
+        def envuelta(*a, **kw):
+            t0 = time.perf_counter()
+            try:
+                return original(*a, **kw)
+            finally:
+                dt = time.perf_counter() - t0
+                d = self.datos.setdefault(etapa, {"llamadas": 0, "total_s": 0.0, "max_s": 0.0})
+                d["llamadas"] += 1
+                d["total_s"] += dt
+                d["max_s"] = max(d["max_s"], dt)
+
+        setattr(modulo, nombre, envuelta)
+        self._originales.append((modulo, nombre, original))
+
+    def restaurar(self):
+        for modulo, nombre, original in reversed(self._originales):
+            setattr(modulo, nombre, original)
+        self._originales.clear()
+
+
+def ejecutar_corrida(args, n_plantas):
+    import fake_mysql
+    srv, env, config = armar_escenario(
+        fake_mysql, n_plantas, args.filas, args.atrasadas, args.caidas, args.latencia_ms, args.latencia_central_ms)
+
+    Path("plantas.json").write_text(json.dumps(config), encoding="utf-8")
+    for k in [k for k in os.environ if k.split("_")[0] in ("HOST", "USER", "PASS", "DB", "PORT") and k[-1:].isdigit()]:
+        del os.environ[k]
+    os.environ.update(env)
+
+    import registro_plantas
+    import lectura_tablas
+    import supervisor_conexiones_remotas as sup
+    registro_plantas._registro = None
+    sembrar_estado(config)
+
+    deshacer = fake_mysql.instalar(srv, sup)
+    etapas = Etapas()
+    lt = lectura_tablas
+    etapas.envolver(lt, "listar_tablas", "listado")
+    etapas.envolver(lt, "consultar_tablas_lote", "escaneo_central")
+    etapas.envolver(lt, "consultar_tabla", "escaneo_central")
+    etapas.envolver(lt, "ultima_hora_plc", "consulta_remota")
+    etapas.envolver(lt, "ultimas_horas_planta", "consulta_remota")
+    etapas.envolver(lt, "consultar_remotas_concurrente", "consultas_remotas_lote")
+    etapas.envolver(lt, "resincronizar_tabla", "borrado")
+    etapas.envolver(lt, "borrar_ultimos_30", "borrado")
+    etapas.envolver(lt, "registrar_sincronizacion", "registro")
+    etapas.envolver(lt, "registrar_error", "registro")
+    etapas.envolver(lt.eventos_sink.SinkEventos, "vaciar", "registro_vaciado")
+    try:
+        t0 = time.perf_counter()
+        with open(os.devnull, "w") as nulo:
+            salida, sys.stdout = sys.stdout, nulo
+            try:
+                lt.main()
+                t_ciclo = time.perf_counter() - t0
+                t1 = time.perf_counter()
+                sup.verificar_conexiones_plantas()
+                t_conexiones = time.perf_counter() - t1
+            finally:
+                sys.stdout = salida
+    finally:
+        etapas.restaurar()
+        deshacer()
+
+    soporte = srv.base("central", "soporte_tensor")
+    return {
+        "plantas": n_plantas,
+        "ciclo_s": t_ciclo,
+        "conexiones_s": t_conexiones,
+        "etapas": etapas.datos,
+        "consultas": sum(srv.consultas.values()),
+        "conexiones_abiertas": sum(srv.conexiones.values()),
+        "registros": {t: len(v.filas) for t, v in soporte.items()},
+    }
+
+
+def _mediana(corridas, clave):
+    return statistics.median(c[clave] for c in corridas)
+
+
+def _resumir(corridas):
+    etapas = {}
+    for c in corridas:
+        for e, d in c["etapas"].items():
+            etapas.setdefault(e, []).append(d["total_s"])
+    return {
+        "plantas": corridas[0]["plantas"],
+        "repeticiones": len(corridas),
+        "ciclo_s": _mediana(corridas, "ciclo_s"),
+        "conexiones_s": _mediana(corridas, "conexiones_s"),
+        "etapas_s": {e: statistics.median(v) for e, v in etapas.items()},
+        "consultas": corridas[-1]["consultas"],
+        "conexiones_abiertas": corridas[-1]["conexiones_abiertas"],
+        "registros": corridas[-1]["registros"],
+    }
+
+
+def _version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def comparar(actual, anterior):
+    previos = {r["plantas"]: r for r in anterior.get("resultados", [])}
+    for r in actual["resultados"]:
+        p = previos.get(r["plantas"])
+        if not p:
+            continue
+        print(f"plantas={r['plantas']}:")
+        for clave in ("ciclo_s", "conexiones_s"):
+            _linea(clave, p[clave], r[clave])
+        for e in sorted(set(r["etapas_s"]) | set(p["etapas_s"])):
+            _linea(f"  {e}", p["etapas_s"].get(e), r["etapas_s"].get(e))
+
+
+def _linea(nombre, antes, ahora):
+    if antes is None or ahora is None:
+        print(f"{nombre:28s} antes={antes} ahora={ahora}")
+        return
+    cambio = (ahora / antes - 1) * 100 if antes else 0.0
+    print(f"{nombre:28s} {antes:8.3f}s -> {ahora:8.3f}s ({cambio:+.1f}%)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--plantas", type=int, nargs="+", default=[8], help="cantidades de plantas a medir")
+    ap.add_argument("--filas", type=int, default=2000, help="filas por tabla")
+    ap.add_argument("--atrasadas", type=float, default=0.25, help="fracción de tablas atrasadas (0-1)")
+    ap.add_argument("--caidas", type=int, default=1, help="plantas inalcanzables")
+    ap.add_argument("--latencia-ms", type=float, default=50, help="latencia por conexión/consulta a plantas")
+    ap.add_argument("--latencia-central-ms", type=float, default=1, help="latencia por conexión/consulta al centralizado")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--salida", default=None, help="archivo JSON de resultados")
+    ap.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    args = ap.parse_args(argv)
+
+    raiz = Path(__file__).resolve().parent
+    sys.path.insert(0, str(raiz))
+    salida = Path(args.salida).resolve() if args.salida else \
+        raiz / "bench_resultados" / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    anterior = Path(args.comparar).resolve() if args.comparar else None
+
+    # directorio de trabajo temporal: logs, cache y plantas.json de la corrida
+    trabajo = tempfile.mkdtemp(prefix="bench_monitoreo_")
+    os.chdir(trabajo)
+    os.environ["PLANTAS_CONFIG"] = str(Path(trabajo) / "plantas.json")
+    os.environ.setdefault("CACHE_WATERMARKS", "0")  # medir el ciclo sin cache salvo que se pida
+    os.environ.setdefault("CIRCUITO", "0")  # idem circuit breaker: cada repeticion sondea las caidas
+    os.environ.setdefault("CACHE_DESCUBRIMIENTO", "0")
+    # el modelo de llegadas queda activo (su subconsulta es parte del escaneo); sembrar_estado
+    # lo reinicia en cada repeticion para que todas decidan igual
+
+    resultados = []
+    for n in args.plantas:
+        corridas = [ejecutar_corrida(args, n) for _ in range(args.repeticiones)]
+        r = _resumir(corridas)
+        resultados.append(r)
+        etapas = " ".join(f"{e}={v:.3f}s" for e, v in sorted(r["etapas_s"].items()))
+        print(f"plantas={n:4d} ciclo={r['ciclo_s']:.3f}s conexiones={r['conexiones_s']:.3f}s "
+              f"consultas={r['consultas']} | {etapas}")
+
+    data = {
+        "version": _version(),
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "parametros": vars(args),
+        "resultados": resultados,
+    }
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"resultados en {salida}")
+
+    if anterior:
+        comparar(data, json.loads(anterior.read_text(encoding="utf-8")))
+    return data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de descubrimiento del centralizado: lista de tablas monitoreadas y, por
+tabla, sus columnas e índices. Evita consultar information_schema en cada ciclo
+(en un MySQL cargado esas consultas son lentas y pueden tomar metadata locks).
+
+Validez, por esquema:
+  - durante DESCUBRIMIENTO_TTL_S desde la última verificación se usa tal cual,
+    sin tocar information_schema;
+  - vencido el TTL se calcula una firma barata del esquema (cantidad de tablas y
+    suma de CRC32(nombre@CREATE_TIME)) en una sola consulta; si no cambió se
+    renueva el TTL, si cambió se descarta todo y se vuelve a listar;
+  - invalidar() lo descarta de inmediato (p.ej. ante "Unknown column" o
+    "Table doesn't exist").
+
+Se guarda en DESCUBRIMIENTO_FILE (JSON) y se mantiene en memoria del proceso.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+CACHE_DESCUBRIMIENTO = os.getenv("CACHE_DESCUBRIMIENTO", "1") == "1"
+DESCUBRIMIENTO_FILE = os.getenv("DESCUBRIMIENTO_FILE", "cache_descubrimiento.json")
+DESCUBRIMIENTO_TTL_S = float(os.getenv("DESCUBRIMIENTO_TTL_S", "3600"))
+
+_datos = None      # {schema: {"firma", "verificado", "clave", "tablas", "columnas", "indices"}}
+_lock = threading.RLock()
+
+
+def esquema(conn):
+    """Base de datos de la conexión (pymysql guarda el nombre en `db`)."""
+    db = getattr(conn, "db", None) or getattr(conn, "database", None)
+    return db.decode() if isinstance(db, bytes) else (db or "")
+
+
+def firma(conn, schema):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*) AS n,
+                   COALESCE(SUM(CRC32(CONCAT(TABLE_NAME, '@', COALESCE(CREATE_TIME, '')))), 0) AS h
+            FROM information_schema.tables
+            WHERE table_schema = %s
+            """,
+            (schema,),
+        )
+        r = cur.fetchone() or {}
+    return f"{r.get('n')}:{r.get('h')}"
+
+
+def _cargar():
+    global _datos
+    if _datos is None:
+        _datos = {}
+        p = Path(DESCUBRIMIENTO_FILE)
+        if p.exists():
+            try:
+                with p.open(encoding="utf-8") as f:
+                    _datos = json.load(f)
+            except (OSError, ValueError):
+                _datos = {}
+    return _datos
+
+
+def _guardar():
+    p = Path(DESCUBRIMIENTO_FILE)
+    tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(_datos, f, ensure_ascii=False)
+        tmp.replace(p)
+    except OSError as e:
+        print(f"no se pudo guardar {DESCUBRIMIENTO_FILE}: {e}")
+
+
+def _entrada(conn, schema):
+    """Entrada vigente del esquema (revalidada por firma si venció el TTL), o None."""
+    e = _cargar().get(schema)
+    if e is None:
+        return None
+    if time.time() - e.get("verificado", 0) < DESCUBRIMIENTO_TTL_S:
+        return e
+    if firma(conn, schema) == e.get("firma"):
+        e["verificado"] = time.time()
+        _guardar()
+        return e
+    _datos.pop(schema, None)
+    return None
+
+
+def tablas(conn, schema, listar, clave=None):
+    """
+    Lista de tablas del esquema. `listar()` hace la consulta real y solo se llama si
+    no hay entrada vigente o si cambió `clave` (p.ej. los patrones de búsqueda).
+    """
+    if not CACHE_DESCUBRIMIENTO:
+        return listar()
+    with _lock:
+        e = _entrada(conn, schema)
+        if e is not None and e.get("tablas") is not None and e.get("clave") == clave:
+            return list(e["tablas"])
+        f = firma(conn, schema)
+        lista = listar()
+        _cargar()[schema] = {"firma": f, "verificado": time.time(), "clave": clave,
+                             "tablas": list(lista), "columnas": {}, "indices": {}}
+        _guardar()
+        return list(lista)
+
+
+def _por_tabla(conn, schema, tabla, tipo, consultar):
+    if not CACHE_DESCUBRIMIENTO:
+        return consultar()
+    with _lock:
+        e = _entrada(conn, schema)
+        if e is not None and tabla in e[tipo]:
+            return e[tipo][tabla]
+        valor = consultar()
+        if e is None:
+            e = _cargar()[schema] = {"firma": firma(conn, schema), "verificado": time.time(), "clave": None,
+                                     "tablas": None, "columnas": {}, "indices": {}}
+        e[tipo][tabla] = valor
+        _guardar()
+        return valor
+
+
+def columnas(conn, tabla, consultar, schema=None):
+    """Columnas de `tabla` (set); `consultar()` las lee de information_schema si no están."""
+    return set(_por_tabla(conn, schema or esquema(conn), tabla, "columnas", lambda: sorted(consultar())))
+
+
+def indices(conn, tabla, consultar, schema=None):
+    """{indice: {"columnas": [...], "unico": bool}} de `tabla`; `consultar()` si no están."""
+    return _por_tabla(conn, schema or esquema(conn), tabla, "indices", consultar)
+
+
+def invalidar(schema=None, tabla=None):
+    """Descarta el cache de un esquema (o todo), o solo la metadata de una tabla."""
+    with _lock:
+        datos = _cargar()
+        if tabla is not None:
+            for s, e in datos.items():
+                if schema is None or s == schema:
+                    e["columnas"].pop(tabla, None)
+                    e["indices"].pop(tabla, None)
+        elif schema is None:
+            datos.clear()
+        else:
+            datos.pop(schema, None)
+        _guardar()
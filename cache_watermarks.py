@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Cache local (SQLite) de las últimas fechas vistas por tabla.
+
+- Centralizado: (fecha, fecha_busqueda) de cada tabla junto a su marca de cambio
+  (UPDATE_TIME y AUTO_INCREMENT de information_schema.tables, leídas para todas
+  las tablas en una sola consulta). Si la marca no se movió y la entrada no
+  venció (TTL_CACHE_S), no se vuelve a calcular MAX(fecha).
+- Remoto: fecha_ultima por (planta, tipo), reutilizable durante TTL_REMOTO_S.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+CACHE_FILE = os.getenv("CACHE_WATERMARKS_FILE", "cache_watermarks.sqlite")
+TTL_CACHE_S = float(os.getenv("TTL_CACHE_S", "3600"))
+TTL_REMOTO_S = float(os.getenv("TTL_REMOTO_S", "60"))
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def marcas_cambio(conn, schema, tablas):
+    """
+    {tabla: (update_time, auto_increment)} en una sola consulta a information_schema.tables.
+    En MySQL 8 estas columnas se cachean (information_schema_stats_expiry), por eso se
+    pide a la sesión que las lea frescas; en MariaDB la variable no existe y se ignora.
+    """
+    if not tablas:
+        return {}
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SET SESSION information_schema_stats_expiry = 0")
+        except Exception:
+            pass
+        marcas = ", ".join(["%s"] * len(tablas))
+        cur.execute(
+            f"""
+            SELECT TABLE_NAME AS tn, UPDATE_TIME AS ut, AUTO_INCREMENT AS ai
+            FROM information_schema.tables
+            WHERE table_schema = %s AND TABLE_NAME IN ({marcas})
+            """,
+            (schema, *tablas),
+        )
+        res = {}
+        for r in cur.fetchall():
+            ut = r["ut"].strftime(_FMT) if isinstance(r["ut"], datetime) else r["ut"]
+            res[r["tn"]] = (ut, r["ai"])
+        return res
+
+
+class CacheWatermarks:
+    def __init__(self, path: str = CACHE_FILE, ttl_s: float = TTL_CACHE_S,
+                 ttl_remoto_s: float = TTL_REMOTO_S):
+        self.ttl_s = ttl_s
+        self.ttl_remoto_s = ttl_remoto_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS central (
+                tabla TEXT PRIMARY KEY,
+                fecha TEXT,
+                fecha_busqueda TEXT,
+                update_time TEXT,
+                auto_inc INTEGER,
+                visto REAL
+            );
+            CREATE TABLE IF NOT EXISTS remoto (
+                planta TEXT,
+                tipo TEXT,
+                tabla TEXT,
+                fecha_ultima TEXT,
+                visto REAL,
+                PRIMARY KEY (planta, tipo)
+            );
+            """
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- centralizado ---
+    def central_vigente(self, tabla, marca):
+        """
+        Retorna (fecha, fecha_busqueda) desde el cache si la marca de cambio es
+        conocida, no se movió y la entrada no venció; si no, None.
+        """
+        if not marca or marca == (None, None):
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fecha, fecha_busqueda, update_time, auto_inc, visto FROM central WHERE tabla = ?",
+                (tabla,),
+            ).fetchone()
+        if not row:
+            return None
+        fecha, fecha_busqueda, ut, ai, visto = row
+        if (ut, ai) != tuple(marca) or time.time() - visto > self.ttl_s:
+            return None
+        return fecha, fecha_busqueda
+
+    def guardar_central(self, tabla, info, marca):
+        with self._lock:
+            if not info or not marca:
+                self._db.execute("DELETE FROM central WHERE tabla = ?", (tabla,))
+            else:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO central VALUES (?, ?, ?, ?, ?, ?)",
+                    (tabla, info["fecha"], info["fecha_busqueda"], marca[0], marca[1], time.time()),
+                )
+            self._db.commit()
+
+    # --- remoto ---
+    def remoto_vigente(self, planta, tipo):
+        """dict de ultima_hora_plc() si se consultó hace menos de TTL_REMOTO_S, si no None."""
+        if self.ttl_remoto_s <= 0:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tabla, fecha_ultima, visto FROM remoto WHERE planta = ? AND tipo = ?",
+                (str(planta), str(tipo)),
+            ).fetchone()
+        if not row or time.time() - row[2] > self.ttl_remoto_s:
+            return None
+        tabla, fecha_ultima, _ = row
+        return {
+            "planta": planta,
+            "tabla": tabla,
+            "fecha_ultima": fecha_ultima,
+            "hora_ultima": fecha_ultima[11:] if fecha_ultima else None,
+        }
+
+    def guardar_remoto(self, planta, tipo, info):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO remoto VALUES (?, ?, ?, ?, ?)",
+                (str(planta), str(tipo), info.get("tabla"), info.get("fecha_ultima"), time.time()),
+            )
+            self._db.commit()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Circuit breaker por planta, compartido por lectura_tablas y el supervisor.
+
+Estados:
+  - "cerrado": la planta se consulta normalmente.
+  - "abierto": tras CIRCUITO_UMBRAL_FALLOS fallos de conexión seguidos se deja de
+    consultar la planta (se omite al instante) durante un tiempo de espera que se
+    duplica con cada apertura seguida: CIRCUITO_BASE_S, 2x, 4x ... hasta CIRCUITO_MAX_S.
+  - "semiabierto": vencida la espera se permite un sondeo; si responde vuelve a
+    "cerrado", si falla vuelve a "abierto" con la espera siguiente.
+
+El estado se guarda en CIRCUITO_FILE (protegido con flock), así que persiste entre
+ejecuciones y un proceso aprovecha lo que vio el otro. Cada cambio de estado queda
+en el log (evento "circuito") y en transiciones(), que el proceso que lo produjo
+registra al final de su ciclo en las tablas de soporte: el fallo que abre el
+circuito (ese ya lo registra quien llama a fallo()), el paso a semiabierto, la
+reapertura y el cierre ("RECUPERADA tras N s", lo usa analitica_sla). No queda una
+fila por ciclo mientras la planta siga caída.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pymysql
+
+import log_async
+
+CIRCUITO = os.getenv("CIRCUITO", "1") == "1"
+CIRCUITO_FILE = os.getenv("CIRCUITO_FILE", "circuito_plantas.json")
+CIRCUITO_UMBRAL_FALLOS = int(os.getenv("CIRCUITO_UMBRAL_FALLOS", "1"))
+CIRCUITO_BASE_S = float(os.getenv("CIRCUITO_BASE_S", "60"))
+CIRCUITO_MAX_S = float(os.getenv("CIRCUITO_MAX_S", "3600"))
+
+# códigos MySQL de conexión: no se pudo conectar, se cortó, handshake fallido, demasiadas conexiones
+_CODIGOS_CONEXION = {1040, 1042, 1043, 1129, 2002, 2003, 2005, 2006, 2013, 2026, 2055}
+
+_lock = threading.Lock()
+_transiciones = []   # cambios de estado de este proceso aún no registrados en soporte
+
+
+class CircuitoAbierto(Exception):
+    """La planta tiene el circuito abierto: no se intentó conectar."""
+
+
+def _nuevo():
+    return {"estado": "cerrado", "fallos": 0, "aperturas": 0, "abierto_hasta": 0.0, "desde": time.time()}
+
+
+@contextmanager
+def _estados(path=None):
+    """Lee el estado de todas las plantas con el archivo bloqueado y lo guarda al salir."""
+    p = Path(path or CIRCUITO_FILE)
+    with _lock, open(f"{p}.lock", "a") as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            data = {}
+            if p.exists():
+                try:
+                    with p.open(encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = {}
+            antes = json.dumps(data, sort_keys=True)
+            yield data
+            if json.dumps(data, sort_keys=True) != antes:
+                tmp = p.with_name(p.name + ".tmp")
+                with tmp.open("w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                tmp.replace(p)
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def _transicion(planta, e, nuevo, error=None, caida_s=None):
+    anterior = e["estado"]
+    e["estado"] = nuevo
+    e["desde"] = time.time()
+    _transiciones.append({"planta": planta, "de": anterior, "a": nuevo, "error": error, "caida_s": caida_s})
+    log_async.registrar("circuito", planta=planta, de=anterior, a=nuevo, error=error,
+                        reintento_en_s=round(e["abierto_hasta"] - time.time()) if nuevo == "abierto" else None)
+    print(f"circuito planta {planta}: {anterior} -> {nuevo}")
+
+
+def permitir(planta) -> bool:
+    """
+    True si se puede consultar la planta. Un circuito abierto con la espera vencida
+    pasa a "semiabierto" y deja pasar el sondeo.
+    """
+    if not CIRCUITO:
+        return True
+    planta = str(planta)
+    with _estados() as data:
+        e = data.get(planta)
+        if e is None or e["estado"] != "abierto":
+            return True
+        if time.time() < e["abierto_hasta"]:
+            return False
+        _transicion(planta, e, "semiabierto")
+        return True
+
+
+def exito(planta):
+    """
+    La planta respondió: cierra el circuito si no lo estaba. Retorna los segundos que
+    estuvo caída (desde que se abrió) si el circuito se cerró en esta llamada, o None.
+    """
+    if not CIRCUITO:
+        return None
+    planta = str(planta)
+    with _estados() as data:
+        e = data.get(planta)
+        if e is None:
+            return None
+        e["fallos"] = 0
+        e["aperturas"] = 0
+        if e["estado"] == "cerrado":
+            return None
+        caida_s = time.time() - e.get("abierto_desde", e["desde"])
+        _transicion(planta, e, "cerrado", caida_s=caida_s)
+        return caida_s
+
+
+def fallo(planta, error=None) -> bool:
+    """
+    Registra un fallo de conexión. Retorna True si el fallo debe dejar registro en
+    las tablas de soporte: mientras el circuito sigue cerrado, o cuando lo abre.
+    """
+    if not CIRCUITO:
+        return True
+    planta = str(planta)
+    error = str(error)[:300] if error is not None else None
+    with _estados() as data:
+        e = data.setdefault(planta, _nuevo())
+        e["fallos"] += 1
+        e["ultimo_error"] = error
+        anterior = e["estado"]
+        if anterior == "cerrado" and e["fallos"] < CIRCUITO_UMBRAL_FALLOS:
+            return True
+        if anterior == "abierto":
+            return False  # otro proceso ya lo abrió
+        e["aperturas"] += 1
+        if anterior == "cerrado":
+            e["abierto_desde"] = time.time()
+        espera = min(CIRCUITO_BASE_S * 2 ** (e["aperturas"] - 1), CIRCUITO_MAX_S)
+        e["abierto_hasta"] = time.time() + espera
+        _transicion(planta, e, "abierto", error)
+        return anterior == "cerrado"
+
+
+def es_error_conexion(e) -> bool:
+    """
+    Errores que indican servidor inalcanzable (los de una planta cuentan para el circuito).
+    Los de esquema, permisos, datos o locks (1054, 1045, 1406, 1205, 1213...) son de una
+    tabla o de una consulta, no del servidor.
+    """
+    if isinstance(e, pymysql.err.OperationalError):
+        return bool(e.args) and e.args[0] in _CODIGOS_CONEXION
+    return isinstance(e, (pymysql.err.InterfaceError, TimeoutError, OSError))
+
+
+def estado():
+    """{planta: estado} de las plantas con historial de fallos."""
+    with _estados() as data:
+        return {p: dict(e) for p, e in data.items()}
+
+
+def transiciones():
+    """Cambios de estado ocurridos en este proceso desde la última llamada (y los descarta)."""
+    with _lock:
+        res = list(_transiciones)
+        _transiciones.clear()
+    return res
+
+
+def describir(t) -> str:
+    """Texto de la fila de soporte para una transición."""
+    if t["a"] == "cerrado":
+        return f"RECUPERADA tras {t['caida_s'] or 0:.0f} s"
+    texto = f"CIRCUITO {t['de']} -> {t['a']}"
+    return f"{texto}: {t['error']}" if t.get("error") else texto
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reporte de completitud entre cada tabla del centralizado y su tabla remota.
+
+lectura_tablas solo compara la última `fecha` de cada lado, así que un vacío en
+medio de la copia central no se detecta. Aquí se cuentan filas por intervalo
+(p.ej. 5 minutos) en ambos lados con GROUP BY, leyendo los conteos con cursores
+sin buffer y cruzándolos en orden, y se listan los intervalos con filas
+faltantes o sobrantes en el centralizado para resincronizarlos puntualmente.
+
+    python completitud.py --horas 24 --intervalo 300
+    python completitud.py --planta 61 --tabla plc_61 --horas 168
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pymysql
+
+import lectura_tablas as lt
+import registro_plantas
+
+COMPLETITUD_FILE = os.getenv("COMPLETITUD_FILE", "completitud.json")
+VENTANA_COMPLETITUD_H = float(os.getenv("VENTANA_COMPLETITUD_H", "24"))
+INTERVALO_COMPLETITUD_S = int(os.getenv("INTERVALO_COMPLETITUD_S", "300"))
+# no se revisan los últimos minutos: ahí el centralizado va atrasado por diseño
+MARGEN_COMPLETITUD_MIN = float(os.getenv("MARGEN_COMPLETITUD_MIN", "10"))
+
+
+def conteos_por_intervalo(conn, tabla, desde, hasta, intervalo_s):
+    """
+    Genera (intervalo, filas) ordenado por intervalo, donde intervalo es el número
+    de bloque de `intervalo_s` segundos contado desde `desde`. Solo viajan los
+    conteos agregados, leídos de a uno con un cursor sin buffer.
+    """
+    if not lt._VALID_TBL.match(tabla):
+        raise ValueError(f"Nombre de tabla inválido: {tabla}")
+    sql = f"""
+        SELECT TIMESTAMPDIFF(SECOND, %s, fecha) DIV %s AS intervalo, COUNT(*) AS filas
+        FROM `{tabla}`
+        WHERE fecha >= %s AND fecha < %s
+        GROUP BY intervalo
+        ORDER BY intervalo
+    """
+    with conn.cursor(pymysql.cursors.SSDictCursor) as cur:
+        cur.execute(sql, (desde, int(intervalo_s), desde, hasta))
+        for r in cur:
+            yield int(r["intervalo"]), int(r["filas"])
+
+
+def _cruzar(central, remota):
+    """Une dos flujos ordenados de (intervalo, filas): genera (intervalo, n_central, n_remota)."""
+    c, r = next(central, None), next(remota, None)
+    while c is not None or r is not None:
+        if r is None or (c is not None and c[0] < r[0]):
+            yield c[0], c[1], 0
+            c = next(central, None)
+        elif c is None or r[0] < c[0]:
+            yield r[0], 0, r[1]
+            r = next(remota, None)
+        else:
+            yield c[0], c[1], r[1]
+            c, r = next(central, None), next(remota, None)
+
+
+def diferencias(conn_central, tabla, conn_remota, tabla_remota, desde, hasta, intervalo_s):
+    """
+    Compara una tabla central con su remota entre `desde` y `hasta`. Retorna la lista
+    de intervalos con diferencias, uniendo bloques contiguos del mismo tipo:
+        {"desde", "hasta", "tipo": "faltante"|"sobrante", "central", "remota"}
+    """
+    paso = timedelta(seconds=intervalo_s)
+    intervalos = []
+    actual = None
+    for i, n_c, n_r in _cruzar(
+        conteos_por_intervalo(conn_central, tabla, desde, hasta, intervalo_s),
+        conteos_por_intervalo(conn_remota, tabla_remota, desde, hasta, intervalo_s),
+    ):
+        if n_c == n_r:
+            continue
+        tipo = "faltante" if n_c < n_r else "sobrante"
+        if actual and actual["tipo"] == tipo and actual["_fin"] == i:
+            actual["central"] += n_c
+            actual["remota"] += n_r
+            actual["_fin"] = i + 1
+            continue
+        actual = {"_ini": i, "_fin": i + 1, "tipo": tipo, "central": n_c, "remota": n_r}
+        intervalos.append(actual)
+    for d in intervalos:
+        d["desde"] = (desde + paso * d.pop("_ini")).strftime("%Y-%m-%d %H:%M:%S")
+        d["hasta"] = min(desde + paso * d.pop("_fin"), hasta).strftime("%Y-%m-%d %H:%M:%S")
+    return [{k: d[k] for k in ("desde", "hasta", "tipo", "central", "remota")} for d in intervalos]
+
+
+def _pares(tablas_filtro=None, plantas_filtro=None):
+    """{planta: [(tabla_central, tabla_remota)]} de las tablas centrales con remota configurada."""
+    registro = registro_plantas.obtener()
+    conn = lt.get_conn()
+    try:
+        tablas = lt.listar_tablas(conn)
+    finally:
+        conn.close()
+    por_planta = {}
+    for t in tablas:
+        if tablas_filtro and t not in tablas_filtro:
+            continue
+        e = registro.entrada_central(t)
+        if e is None or (plantas_filtro and e["planta"] not in plantas_filtro):
+            continue
+        por_planta.setdefault(e["planta"], []).append((t, e["tabla_remota"]))
+    return por_planta
+
+
+def revisar_todo(horas=VENTANA_COMPLETITUD_H, intervalo_s=INTERVALO_COMPLETITUD_S,
+                 margen_min=MARGEN_COMPLETITUD_MIN, tablas=None, plantas=None):
+    """Revisa todas las tablas (o las filtradas) y retorna el reporte por tabla."""
+    ahora = datetime.now().replace(microsecond=0)
+    hasta = ahora - timedelta(minutes=margen_min)
+    # alinear al intervalo para que los bloques sean comparables entre corridas
+    hasta = datetime.fromtimestamp(int(hasta.timestamp()) // intervalo_s * intervalo_s)
+    desde = hasta - timedelta(hours=horas)
+
+    reporte = []
+    conn_central = lt.get_conn()
+    try:
+        for planta, pares in _pares(tablas, plantas).items():
+            try:
+                conn_remota = lt._conectar_planta(planta)
+            except Exception as e:
+                for t, _ in pares:
+                    reporte.append({"tabla": t, "planta": planta, "error": f"{type(e).__name__}: {e}"})
+                continue
+            try:
+                for t, remota in pares:
+                    try:
+                        dif = diferencias(conn_central, t, conn_remota, remota, desde, hasta, intervalo_s)
+                        reporte.append({
+                            "tabla": t,
+                            "planta": planta,
+                            "tabla_remota": remota,
+                            "faltantes": sum(max(d["remota"] - d["central"], 0) for d in dif),
+                            "sobrantes": sum(max(d["central"] - d["remota"], 0) for d in dif),
+                            "intervalos": dif,
+                        })
+                    except Exception as e:
+                        reporte.append({"tabla": t, "planta": planta, "error": f"{type(e).__name__}: {e}"})
+            finally:
+                conn_remota.close()
+    finally:
+        conn_central.close()
+    return {
+        "generado": ahora.strftime("%Y-%m-%d %H:%M:%S"),
+        "desde": desde.strftime("%Y-%m-%d %H:%M:%S"),
+        "hasta": hasta.strftime("%Y-%m-%d %H:%M:%S"),
+        "intervalo_s": intervalo_s,
+        "tablas": reporte,
+    }
+
+
+def guardar_reporte(data, path: str = COMPLETITUD_FILE):
+    p = Path(path)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    tmp.replace(p)
+    return data
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--horas", type=float, default=VENTANA_COMPLETITUD_H, help="ventana a revisar")
+    ap.add_argument("--intervalo", type=int, default=INTERVALO_COMPLETITUD_S, help="segundos por bloque")
+    ap.add_argument("--margen-min", type=float, default=MARGEN_COMPLETITUD_MIN,
+                    help="minutos recientes que no se revisan")
+    ap.add_argument("--tabla", nargs="+", help="tablas del centralizado (por defecto todas)")
+    ap.add_argument("--planta", nargs="+", help="plantas (por defecto todas)")
+    ap.add_argument("--salida", default=COMPLETITUD_FILE)
+    args = ap.parse_args(argv)
+
+    print(f"Revisando completitud de las últimas {args.horas:g} h en bloques de {args.intervalo}s...")
+    data = guardar_reporte(
+        revisar_todo(args.horas, args.intervalo, args.margen_min, args.tabla, args.planta), args.salida)
+    for r in data["tablas"]:
+        if r.get("error"):
+            print(f"❌ {r['tabla']}: {r['error']}")
+        elif r["intervalos"]:
+            print(f"⚠️  {r['tabla']}: faltan {r['faltantes']} filas, sobran {r['sobrantes']} "
+                  f"en {len(r['intervalos'])} intervalos")
+            for d in r["intervalos"][:10]:
+                print(f"     {d['desde']} - {d['hasta']} {d['tipo']}: central={d['central']} remota={d['remota']}")
+        else:
+            print(f"✅ {r['tabla']}")
+    print(f"\nReporte guardado en {args.salida}")
+    return data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consulta el log estructurado (log_sincronizacion.log y sus segmentos .gz).
+
+Usa el índice de segmentos de log_async para abrir solo los que caen en el rango
+y contienen el evento/tabla/planta pedidos.
+
+    python consultar_log.py --evento resync --tabla plc_61 --dias 7
+    python consultar_log.py --planta 61 --desde "2026-10-01" --hasta "2026-10-08"
+    python consultar_log.py --evento error --ultimas 20
+"""
+import argparse
+import json
+from collections import deque
+from datetime import datetime, timedelta
+
+import log_async
+
+
+def _fecha(v, fin=False):
+    """'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM[:SS]' -> 'YYYY-MM-DD HH:MM:SS'."""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            d = datetime.strptime(v, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y-%m-%d" and fin:
+            d += timedelta(days=1, seconds=-1)
+        return d.strftime("%Y-%m-%d %H:%M:%S")
+    raise argparse.ArgumentTypeError(f"fecha inválida: {v}")
+
+
+def _fmt(reg):
+    extra = " | ".join(f"{k}={v}" for k, v in reg.items() if k not in ("ts", "evento"))
+    return f"{reg['ts']} | {reg['evento'].upper()} | {extra}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--log", default=log_async.LOG_FILE)
+    ap.add_argument("--evento", help="resync, error, conexion_fallida")
+    ap.add_argument("--tabla")
+    ap.add_argument("--planta", help="número de planta (coincide también con HOST_<n>)")
+    ap.add_argument("--desde", type=_fecha)
+    ap.add_argument("--hasta", type=lambda v: _fecha(v, fin=True))
+    ap.add_argument("--dias", type=float, help="últimos N días (ignora --desde)")
+    ap.add_argument("--ultimas", type=int, help="mostrar solo las últimas N coincidencias")
+    ap.add_argument("--json", action="store_true", help="una línea JSON por registro")
+    args = ap.parse_args(argv)
+
+    desde = args.desde
+    if args.dias is not None:
+        desde = (datetime.now() - timedelta(days=args.dias)).strftime("%Y-%m-%d %H:%M:%S")
+
+    regs = log_async.consultar(args.log, desde=desde, hasta=args.hasta,
+                               evento=args.evento, tabla=args.tabla, planta=args.planta)
+    if args.ultimas:
+        regs = deque(regs, maxlen=args.ultimas)
+    n = 0
+    for reg in regs:
+        print(json.dumps(reg, ensure_ascii=False) if args.json else _fmt(reg))
+        n += 1
+    return n
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diagnóstico de índices de las tablas monitoreadas (centralizado y remotas).
+
+Revisa information_schema.statistics y EXPLAIN de las consultas que usa
+lectura_tablas.py (MAX(fecha), MAX(fecha_busqueda), DELETE ... ORDER BY fecha)
+y deja un reporte JSON con:
+  - tablas sin índice en `fecha` / `fecha_busqueda`
+  - filas estimadas que examina cada consulta (las más lentas primero)
+  - la estrategia que lectura_tablas debe usar para cada tabla del centralizado
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+import lectura_tablas as lt
+import registro_plantas
+
+
+def indices_por_columna(conn, tabla, schema=None):
+    """
+    Retorna {columna: [indices]} considerando solo la primera columna de cada índice,
+    que es la que sirve para MAX() y ORDER BY ... LIMIT.
+    """
+    sql = """
+        SELECT COLUMN_NAME AS col, INDEX_NAME AS idx
+        FROM information_schema.statistics
+        WHERE table_schema = COALESCE(%s, DATABASE()) AND table_name = %s AND SEQ_IN_INDEX = 1
+    """
+    res = {}
+    with conn.cursor() as cur:
+        cur.execute(sql, (schema, tabla))
+        for r in cur.fetchall():
+            res.setdefault(r["col"], []).append(r["idx"])
+    return res
+
+
+def columnas_tabla(conn, tabla, schema=None):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COLUMN_NAME AS col FROM information_schema.columns
+            WHERE table_schema = COALESCE(%s, DATABASE()) AND table_name = %s
+            """,
+            (schema, tabla),
+        )
+        return {r["col"] for r in cur.fetchall()}
+
+
+def explicar(conn, sql):
+    """Ejecuta EXPLAIN y resume (type, key, rows, Extra) de cada fila del plan."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN " + sql)
+            plan = cur.fetchall()
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    pasos = [
+        {
+            "tabla": r.get("table"),
+            "tipo": r.get("type"),
+            "indice": r.get("key"),
+            "filas": r.get("rows"),
+            "extra": r.get("Extra"),
+        }
+        for r in plan
+    ]
+    # "Select tables optimized away" => MAX() resuelto por el índice, sin leer filas
+    filas = sum(int(p["filas"] or 0) for p in pasos)
+    return {"pasos": pasos, "filas_estimadas": filas, "full_scan": any(p["tipo"] == "ALL" for p in pasos)}
+
+
+def diagnosticar_central(conn, tabla):
+    cols = columnas_tabla(conn, tabla)
+    idx = indices_por_columna(conn, tabla)
+    problemas = []
+    if "fecha" in cols and "fecha" not in idx:
+        problemas.append("sin índice en `fecha`")
+    if "fecha_busqueda" in cols and "fecha_busqueda" not in idx:
+        problemas.append("sin índice en `fecha_busqueda`")
+
+    # estrategia: MAX() directo solo si ambas columnas están indexadas
+    if "fecha" in idx and ("fecha_busqueda" in idx or "fecha_busqueda" not in cols):
+        estrategia = "max"
+    elif "fecha" in idx:
+        estrategia = "orden"
+    else:
+        estrategia = "sin_indice"  # MAX() directo: sin índice en fecha ninguna estrategia evita el full scan
+
+    consulta = explicar(conn, lt._sql_fechas(tabla, estrategia, (estrategia in lt.ESTRATEGIAS_CON_INDICE) or None))
+    orden_borrado = "fecha" if "fecha" in cols else "id"
+    borrado = explicar(conn, f"DELETE FROM `{tabla}` ORDER BY `{orden_borrado}` DESC LIMIT 30")
+    for nombre, plan in (("consulta de fechas", consulta), ("borrado", borrado)):
+        if plan.get("full_scan"):
+            problemas.append(f"{nombre} recorre la tabla completa (~{plan['filas_estimadas']} filas)")
+
+    return {
+        "ambito": "central",
+        "tabla": tabla,
+        "indices": idx,
+        "estrategia": estrategia,
+        "explain_consulta": consulta,
+        "explain_borrado": borrado,
+        "problemas": problemas,
+    }
+
+
+def diagnosticar_remota(conn, planta, tabla):
+    idx = indices_por_columna(conn, tabla)
+    problemas = []
+    if "fecha" not in idx:
+        problemas.append("sin índice en `fecha`")
+    consulta = explicar(conn, f"SELECT MAX(fecha) AS ultima FROM `{tabla}`")
+    if consulta.get("full_scan"):
+        problemas.append(f"MAX(fecha) recorre la tabla completa (~{consulta['filas_estimadas']} filas)")
+    return {
+        "ambito": f"planta_{planta}",
+        "tabla": tabla,
+        "indices": idx,
+        "explain_consulta": consulta,
+        "problemas": problemas,
+    }
+
+
+def _tablas_remotas():
+    """[(planta, tabla_remota)] de las plantas configuradas."""
+    pares = {(e["planta"], e["tabla_remota"]) for e in registro_plantas.obtener().tablas.values()}
+    return sorted(pares)
+
+
+def diagnosticar_todo(incluir_remotas: bool = True):
+    reporte = []
+
+    conn = lt.get_conn()
+    try:
+        for t in lt.listar_tablas(conn):
+            try:
+                reporte.append(diagnosticar_central(conn, t))
+            except Exception as e:
+                reporte.append({"ambito": "central", "tabla": t, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+    if incluir_remotas:
+        por_planta = {}
+        for planta, tabla in _tablas_remotas():
+            por_planta.setdefault(planta, []).append(tabla)
+        for planta, tablas in por_planta.items():
+            try:
+                conn = lt._conectar_planta(planta)
+            except Exception as e:
+                reporte.append({"ambito": f"planta_{planta}", "tabla": None, "error": f"{type(e).__name__}: {e}"})
+                continue
+            try:
+                for tabla in tablas:
+                    try:
+                        reporte.append(diagnosticar_remota(conn, planta, tabla))
+                    except Exception as e:
+                        reporte.append({"ambito": f"planta_{planta}", "tabla": tabla, "error": f"{type(e).__name__}: {e}"})
+            finally:
+                conn.close()
+    return reporte
+
+
+def _costo(r):
+    return max(
+        (r.get(k) or {}).get("filas_estimadas", 0)
+        for k in ("explain_consulta", "explain_borrado")
+    )
+
+
+def guardar_reporte(reporte, path: str = lt.DIAGNOSTICO_FILE):
+    """Persiste el reporte (más costosas primero) y el mapa de estrategias que lee lectura_tablas."""
+    reporte = sorted(reporte, key=_costo, reverse=True)
+    data = {
+        "generado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "estrategias_central": {
+            r["tabla"]: r["estrategia"] for r in reporte if r.get("ambito") == "central" and "estrategia" in r
+        },
+        "tablas": reporte,
+    }
+    p = Path(path)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    tmp.replace(p)
+    return data
+
+
+if __name__ == "__main__":
+    print("Diagnosticando índices de tablas monitoreadas...")
+    data = guardar_reporte(diagnosticar_todo())
+    for r in data["tablas"]:
+        if r.get("error"):
+            print(f"❌ {r['ambito']} {r['tabla']}: {r['error']}")
+        elif r["problemas"]:
+            print(f"⚠️  {r['ambito']} {r['tabla']} (~{_costo(r)} filas): " + "; ".join(r["problemas"]))
+        else:
+            print(f"✅ {r['ambito']} {r['tabla']}")
+    print(f"\nReporte guardado en {lt.DIAGNOSTICO_FILE}")
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Buffer de eventos para las tablas de soporte (registro_sincronizacion,
+error_sincronizacion, la tabla de problemas del supervisor).
+
+Durante un ciclo los registrar_*() / _insert_problema() dejan la fila en memoria;
+al final del ciclo (o al llenarse el buffer) se insertan con un executemany por
+tabla, cada uno en su transacción (el log de archivo lo escribe log_async). Si la
+BD central no responde (error de conexión, o lock/deadlock), las filas se guardan
+en SPILL_FILE y se reintentan en el siguiente vaciado. Si el error es de la tabla
+o de los datos (tabla inexistente, dato demasiado largo...), reintentar no sirve:
+las filas de esa tabla van a DESCARTADOS_FILE con el error (y al log como evento
+"eventos_descartados") y las demás tablas se insertan igual.
+Leer, insertar y borrar/reescribir SPILL_FILE se hace con el archivo bloqueado
+(flock): lectura_tablas y el supervisor corren como procesos separados y
+comparten el mismo archivo por defecto.
+Cada vaciado recoge además los archivos hermanos (eventos_pendientes.jsonl y
+eventos_pendientes_<n>.jsonl de lectura_paralela): si cambia la cantidad de procesos,
+lo que dejaron las partes que ya no existen no se pierde. Un hermano bloqueado lo está
+vaciando su dueño y se omite.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pymysql
+
+import circuito_plantas
+import log_async
+
+SPILL_FILE = os.getenv("EVENTOS_SPILL_FILE", "eventos_pendientes.jsonl")
+DESCARTADOS_FILE = os.getenv("EVENTOS_DESCARTADOS_FILE", "eventos_descartados.jsonl")
+MAX_BUFFER = int(os.getenv("EVENTOS_MAX_BUFFER", "500"))
+_TRANSITORIOS = {1205, 1213}  # lock wait timeout, deadlock: se reintentan
+
+_activo = None
+_lock_activo = threading.Lock()
+
+
+def _reintentable(e) -> bool:
+    """Errores tras los que conviene reintentar el lote más tarde (los demás no se arreglan solos)."""
+    if circuito_plantas.es_error_conexion(e):
+        return True
+    return isinstance(e, pymysql.err.OperationalError) and bool(e.args) and e.args[0] in _TRANSITORIOS
+
+
+def _serializable(v):
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    return v
+
+
+class SinkEventos:
+    def __init__(self, conectar, spill_file: str = SPILL_FILE, max_buffer: int = MAX_BUFFER,
+                 descartados_file: str = DESCARTADOS_FILE):
+        self.conectar = conectar  # fábrica de conexión a la BD central
+        self.spill_file = spill_file
+        self.descartados_file = descartados_file
+        self.max_buffer = max_buffer
+        self._filas = []   # [{"tabla", "columnas", "valores"}]
+        self._lock = threading.Lock()
+
+    def agregar(self, tabla_fqn, columnas, valores):
+        with self._lock:
+            self._filas.append({
+                "tabla": tabla_fqn,
+                "columnas": list(columnas),
+                "valores": [_serializable(v) for v in valores],
+            })
+            lleno = len(self._filas) >= self.max_buffer
+        if lleno:
+            self.vaciar()
+
+    def pendientes(self) -> int:
+        return len(self._filas)
+
+    def vaciar(self) -> int:
+        """
+        Inserta lo acumulado (más lo pendiente en disco, propio y de los hermanos), una
+        transacción por tabla.
+        Retorna filas insertadas. Lo que no se pudo insertar por la conexión queda en
+        SPILL_FILE; lo que falló por la tabla o los datos, en DESCARTADOS_FILE.
+        """
+        with self._lock:
+            filas, self._filas = self._filas, []
+        hermanos = self._spill_hermanos()
+        if not filas and not hermanos and not Path(self.spill_file).exists():
+            return 0
+        with self._bloqueo_spill(), ExitStack() as bloqueos:
+            # los hermanos se borran recién después de insertar o pasar sus filas a SPILL_FILE
+            adoptados = [h for h in hermanos if bloqueos.enter_context(self._bloqueo_spill(h, esperar=False))]
+            adoptadas = [f for h in adoptados for f in self._leer_spill(h)]
+            insertadas = self._vaciar(adoptadas + filas)
+            for h in adoptados:
+                Path(h).unlink(missing_ok=True)
+            return insertadas
+
+    @contextmanager
+    def _bloqueo_spill(self, path=None, esperar=True):
+        """
+        Exclusión entre procesos sobre un archivo de pendientes (SPILL_FILE por defecto), desde
+        leerlo hasta borrarlo o reescribirlo. Con esperar=False entrega False si otro lo tiene.
+        """
+        with open(f"{path or self.spill_file}.lock", "a") as lf:
+            try:
+                fcntl.flock(lf, fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                tomado = False
+            else:
+                tomado = True
+            if not tomado:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _spill_hermanos(self):
+        """Otros archivos de pendientes de la misma serie (<base>.jsonl, <base>_<n>.jsonl), sin el propio."""
+        p = Path(self.spill_file)
+        base = re.sub(r"_\d+$", "", p.stem)
+        patron = re.compile(rf"^{re.escape(base)}(_\d+)?{re.escape(p.suffix)}$")
+        try:
+            nombres = os.listdir(p.parent)
+        except OSError:
+            return []
+        return sorted(str(p.with_name(n)) for n in nombres if n != p.name and patron.match(n))
+
+    def _vaciar(self, filas):
+        filas = self._leer_spill() + filas
+        if not filas:
+            return 0
+
+        grupos = {}
+        for f in filas:
+            grupos.setdefault((f["tabla"], tuple(f["columnas"])), []).append(f)
+
+        try:
+            conn = self.conectar()
+        except Exception as e:
+            print(f"BD central no disponible, {len(filas)} eventos a {self.spill_file}: {e}")
+            self._guardar_spill(filas)
+            return 0
+        insertadas = 0
+        pendientes = []
+        cortada = False
+        try:
+            for (tabla, columnas), grupo in grupos.items():
+                if cortada:  # sin conexión el resto también queda pendiente
+                    pendientes.extend(grupo)
+                    continue
+                try:
+                    self._insertar(conn, tabla, columnas, grupo)
+                    insertadas += len(grupo)
+                except Exception as e:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                    if _reintentable(e):
+                        print(f"no se pudieron insertar eventos en {tabla}, quedan en {self.spill_file}: {e}")
+                        pendientes.extend(grupo)
+                        cortada = circuito_plantas.es_error_conexion(e)
+                    else:
+                        self._descartar(tabla, grupo, e)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+        if pendientes:
+            self._guardar_spill(pendientes)
+        else:
+            Path(self.spill_file).unlink(missing_ok=True)
+        return insertadas
+
+    @staticmethod
+    def _insertar(conn, tabla, columnas, grupo):
+        cols = ", ".join(columnas)
+        marcas = ", ".join(["%s"] * len(columnas))
+        conn.begin()
+        with conn.cursor() as cur:
+            cur.executemany(f"INSERT INTO {tabla} ({cols}) VALUES ({marcas})", [tuple(f["valores"]) for f in grupo])
+        conn.commit()
+
+    def _descartar(self, tabla, grupo, error):
+        """Filas que la BD rechaza por la tabla o los datos: a DESCARTADOS_FILE con el error, no se reintentan."""
+        error = f"{type(error).__name__}: {error}"
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"⚠️  {len(grupo)} eventos de {tabla} descartados a {self.descartados_file}: {error}")
+        log_async.registrar("eventos_descartados", tabla=tabla, filas=len(grupo), error=error,
+                            archivo=self.descartados_file)
+        try:
+            with open(self.descartados_file, "a", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    for fila in grupo:
+                        f.write(json.dumps({**fila, "error": error, "descartado": ahora}, ensure_ascii=False) + "\n")
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        except OSError as e:
+            print(f"no se pudo escribir {self.descartados_file}: {e}")
+
+    def _leer_spill(self, path=None):
+        p = Path(path or self.spill_file)
+        if not p.exists():
+            return []
+        filas = []
+        with p.open(encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    filas.append(json.loads(linea))
+                except ValueError:
+                    print(f"línea inválida en {p}, se omite: {linea[:80]}")
+        return filas
+
+    def _guardar_spill(self, filas):
+        # reescribe el archivo completo: ya incluye lo leído al comenzar el vaciado
+        p = Path(self.spill_file)
+        tmp = p.with_name(p.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for fila in filas:
+                f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+        tmp.replace(p)
+
+
+def activo():
+    """Sink del ciclo en curso, o None si los registros van directo a la BD."""
+    return _activo
+
+
+@contextmanager
+def ciclo(conectar, habilitado: bool = True):
+    """
+    Activa un sink durante el bloque y lo vacía al salir. Si ya hay uno activo
+    (p.ej. el daemon lo abrió), se reutiliza y no se vacía aquí.
+    """
+    global _activo
+    with _lock_activo:
+        propio = habilitado and _activo is None
+        if propio:
+            _activo = SinkEventos(conectar)
+    try:
+        yield _activo
+    finally:
+        if propio:
+            with _lock_activo:
+                sink, _activo = _activo, None
+            sink.vaciar()
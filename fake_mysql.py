@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor MySQL simulado en memoria, compatible con la parte de pymysql que usan
+los scripts de monitoreo. Lo usa benchmark.py para medir ciclos sin depender de
+un servidor real.
+
+Solo entiende las consultas que emiten lectura_tablas, supervisor_conexiones_remotas
+y sus módulos auxiliares; cualquier otra lanza NotImplementedError para que el
+benchmark no mida algo distinto de lo que corre en producción.
+
+Permite inyectar latencia por host (conexión y por consulta) y marcar hosts caídos.
+"""
+import heapq
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import pymysql
+
+_ESPACIOS = re.compile(r"\s+")
+_TABLA = re.compile(r"FROM `(\w+)`")
+_COND = re.compile(r"`?(\w+)`? (>=|<=|>|<|=) %s")
+_OPS = {
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    "=": lambda a, b: a == b,
+}
+
+
+class Tabla:
+    def __init__(self, columnas, filas=None):
+        self.columnas = list(columnas)
+        self.filas = sorted(filas or [], key=lambda r: r["fecha"]) if "fecha" in self.columnas else list(filas or [])
+        self.auto_inc = len(self.filas) + 1
+        self.fecha_unica = False  # índice único sobre `fecha`
+        self.anchos = {}          # columna -> ancho VARCHAR (information_schema.columns)
+        self.update_time = datetime.now().replace(microsecond=0)
+
+    def tocar(self):
+        self.update_time = datetime.now().replace(microsecond=0)
+
+
+class Servidor:
+    """Conjunto de bases simuladas indexadas por (host, database)."""
+
+    def __init__(self):
+        self.bases = {}
+        self.latencia = {}   # host -> (conexion_s, consulta_s)
+        self.caidos = set()
+        self.consultas = {}  # host -> cantidad
+        self.conexiones = {}  # host -> cantidad
+        self.locks = {}       # GET_LOCK: nombre -> conexión dueña
+        self.lock = threading.RLock()
+
+    def base(self, host, database):
+        return self.bases.setdefault((host, database), {})
+
+    def esperar(self, host, tipo):
+        lat = self.latencia.get(host)
+        if lat:
+            time.sleep(lat[0] if tipo == "conexion" else lat[1])
+
+    def contar(self, dic, host):
+        with self.lock:
+            dic[host] = dic.get(host, 0) + 1
+
+    # --- reemplazo de pymysql.connect ---
+    def connect(self, host=None, port=3306, user=None, password=None, database=None,
+                cursorclass=None, defer_connect=False, **kw):
+        conn = ConexionFalsa(self, host, port, database)
+        if not defer_connect:
+            conn.connect()
+        return conn
+
+    def create_connection(self, direccion, timeout=None, **kw):
+        """Reemplazo de socket.create_connection (fase TCP del supervisor)."""
+        host = direccion[0]
+        self.esperar(host, "conexion")
+        if host in self.caidos:
+            raise ConnectionRefusedError(111, "Connection refused")
+        return _SocketFalso()
+
+
+class _SocketFalso:
+    def setsockopt(self, *a):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, servidor, host, port, database):
+        self.servidor = servidor
+        self.host = host
+        self.port = port
+        self.database = database
+        self.db = database
+        self.open = False
+
+    def connect(self, sock=None):
+        if sock is None:
+            self.servidor.esperar(self.host, "conexion")
+        if self.host in self.servidor.caidos:
+            raise pymysql.err.OperationalError(2003, f"Can't connect to MySQL server on '{self.host}' (timed out)")
+        self.servidor.esperar(self.host, "consulta")  # handshake + auth
+        self.servidor.contar(self.servidor.conexiones, self.host)
+        self.open = True
+
+    def cursor(self, cursorclass=None):
+        return CursorFalso(self)
+
+    def ping(self, reconnect=True):
+        if self.open and self.host in self.servidor.caidos:
+            self.open = False  # el servidor se fue con la conexión abierta
+        if not self.open:
+            if not reconnect:
+                raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+            self.connect()
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if not self.open:
+            raise pymysql.err.Error("Already closed")
+        self.open = False
+        with self.servidor.lock:  # MySQL libera los GET_LOCK de la sesión al cerrarla
+            for nombre in [n for n, c in self.servidor.locks.items() if c is self]:
+                del self.servidor.locks[nombre]
+
+
+class CursorFalso:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.lastrowid = None
+        self._filas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+    def fetchone(self):
+        return self._filas.pop(0) if self._filas else None
+
+    def fetchall(self):
+        filas, self._filas = self._filas, []
+        return filas
+
+    def fetchmany(self, size=1):
+        filas, self._filas = self._filas[:size], self._filas[size:]
+        return filas
+
+    def executemany(self, sql, seq):
+        n = 0
+        for params in seq:
+            self.execute(sql, params)
+            n += self.rowcount
+        self.rowcount = n
+        return n
+
+    def execute(self, sql, params=None):
+        c = self.conn
+        srv = c.servidor
+        if not c.open:
+            raise pymysql.err.InterfaceError(0, "conexión cerrada")
+        srv.esperar(c.host, "consulta")
+        srv.contar(srv.consultas, c.host)
+        sql = _ESPACIOS.sub(" ", sql).strip()
+        params = list(params or ())
+        with srv.lock:
+            self._filas, self.rowcount = _ejecutar(srv, c, sql, params, self)
+        return self.rowcount
+
+
+def _base(srv, conn, nombre):
+    """Resuelve `schema.tabla` o `tabla` a (base, tabla)."""
+    if "." in nombre:
+        schema, nombre = nombre.split(".", 1)
+        return srv.base(conn.host, schema), nombre
+    return srv.base(conn.host, conn.database), nombre
+
+
+def _tabla(srv, conn, nombre):
+    base, nombre = _base(srv, conn, nombre)
+    if nombre not in base:
+        raise pymysql.err.ProgrammingError(1146, f"Table '{conn.database}.{nombre}' doesn't exist")
+    return base[nombre]
+
+
+def _filtro(where, params):
+    """Convierte 'a > %s AND b >= %s' en predicado; consume params en orden."""
+    conds = []
+    for col, op in _COND.findall(where or ""):
+        conds.append((col, _OPS[op], params.pop(0)))
+    return lambda r: all(f(r.get(col), v) for col, f, v in conds)
+
+
+def _max(filas, col):
+    vals = [r.get(col) for r in filas if r.get(col) is not None]
+    return max(vals) if vals else None
+
+
+def _ejecutar(srv, conn, sql, params, cur):
+    up = sql.upper()
+    ahora = datetime.now()
+
+    if up.startswith("SET SESSION") or up == "SELECT 1":
+        return ([{"1": 1}] if up == "SELECT 1" else []), 0
+
+    if up.startswith("SELECT GET_LOCK("):
+        dueno = srv.locks.setdefault(params[0], conn)
+        return [{"ok": 1 if dueno is conn else 0}], 1
+
+    if up.startswith("SELECT RELEASE_LOCK("):
+        liberado = srv.locks.get(params[0]) is conn
+        if liberado:
+            del srv.locks[params[0]]
+        return [{"ok": 1 if liberado else 0}], 1
+
+    if "INFORMATION_SCHEMA.TABLES" in up and " LIKE " in up:
+        schema, patrones = params[0], [p.replace("\\_", "_").rstrip("%") for p in params[1:]]
+        nombres = sorted(t for t in srv.base(conn.host, schema) if any(t.startswith(p) for p in patrones))
+        return [{"tn": t} for t in nombres], len(nombres)
+
+    if "INFORMATION_SCHEMA.TABLES" in up and "UPDATE_TIME" in up:
+        schema, nombres = params[0], set(params[1:])
+        base = srv.base(conn.host, schema)
+        filas = [{"tn": t, "ut": base[t].update_time, "ai": base[t].auto_inc} for t in sorted(nombres) if t in base]
+        return filas, len(filas)
+
+    if "INFORMATION_SCHEMA.COLUMNS" in up and "CHARACTER_MAXIMUM_LENGTH" in up:
+        base = srv.base(conn.host, params[0])
+        t = base.get(params[1])
+        ancho = t.anchos.get("tabla") if t is not None else None
+        return ([{"ancho": ancho, "nulo": "YES"}] if ancho else []), 1 if ancho else 0
+
+    if "INFORMATION_SCHEMA.COLUMNS" in up:
+        tabla = params[-1]
+        base = srv.base(conn.host, params[0] if len(params) > 1 and params[0] else conn.database)
+        cols = base[tabla].columnas if tabla in base else []
+        return [{"col": c} for c in cols], len(cols)
+
+    if "INFORMATION_SCHEMA.STATISTICS" in up:
+        tabla = params[-1]
+        base = srv.base(conn.host, params[0] if len(params) > 1 and params[0] else conn.database)
+        if tabla not in base:
+            return [], 0
+        filas = [{"col": "id", "idx": "PRIMARY", "nu": 0}]
+        if "fecha" in base[tabla].columnas:
+            unica = base[tabla].fecha_unica
+            filas.append({"col": "fecha", "idx": "uq_fecha" if unica else "idx_fecha", "nu": 0 if unica else 1})
+        return filas, len(filas)
+
+    if "INFORMATION_SCHEMA.TABLES" in up and "CRC32" in up:
+        base = srv.base(conn.host, params[0])
+        h = sum(zlib.crc32(f"{t}@{id(v)}".encode()) for t, v in base.items())
+        return [{"n": len(base), "h": h}], 1
+
+    if up.startswith("EXPLAIN"):
+        t = _tabla(srv, conn, _TABLA.search(sql).group(1))
+        return [{"table": "x", "type": "range", "key": "idx_fecha", "rows": len(t.filas), "Extra": None}], 1
+
+    if up.startswith("INSERT INTO"):
+        m = re.match(r"INSERT INTO `?([\w.]+?)`? \(([^)]*)\) VALUES", sql, re.I)
+        base, nombre = _base(srv, conn, m.group(1))
+        cols = [c.strip().strip("`") for c in m.group(2).split(",")]
+        t = base.setdefault(nombre, Tabla(["id", *cols]))
+        n_filas = max(1, len(params) // len(cols))
+        afectadas = 0
+        for k in range(n_filas):
+            fila = dict(zip(cols, params[k * len(cols):(k + 1) * len(cols)]))
+            previa = None
+            if " ON DUPLICATE KEY UPDATE" in up and t.fecha_unica:
+                previa = next((r for r in t.filas if r.get("fecha") == fila.get("fecha")), None)
+            if previa is not None:
+                previa.update(fila)
+                afectadas += 2
+                continue
+            fila["id"] = t.auto_inc
+            t.auto_inc += 1
+            t.filas.append(fila)
+            afectadas += 1
+        if "fecha" in t.columnas:
+            t.filas.sort(key=lambda r: r["fecha"])
+        t.tocar()
+        cur.lastrowid = t.auto_inc - 1
+        return [], afectadas
+
+    if up.startswith("DELETE FROM"):
+        t = _tabla(srv, conn, re.match(r"DELETE FROM `(\w+)`", sql).group(1))
+        m = re.search(r" WHERE (.*?)(?: ORDER BY|$)", sql)
+        pred = _filtro(m.group(1) if m else "", params)
+        limite = int(params.pop(0)) if " LIMIT %s" in sql else None
+        col = "fecha" if "ORDER BY `fecha`" in sql else "id"
+        orden = sorted(range(len(t.filas)), key=lambda i: t.filas[i].get(col), reverse=True)
+        borrar = [i for i in orden if pred(t.filas[i])][:limite]
+        for i in sorted(borrar, reverse=True):
+            del t.filas[i]
+        if borrar:
+            t.tocar()
+        return [], len(borrar)
+
+    if " UNION ALL " in sql or "AS ULTIMA_FECHA" in up:
+        partes = sql.split(" UNION ALL ")
+        filas = []
+        columnas = None
+        for parte in partes:
+            t = _tabla(srv, conn, _TABLA.search(parte).group(1))
+            m = re.search(r"ORDER BY fecha DESC LIMIT (\d+)\) AS ult", parte)
+            origen = t.filas[-int(m.group(1)):] if m else t.filas
+            ultima = _max(origen, "fecha")
+            fila = {
+                "ultima_fecha": ultima,
+                "ultima_busqueda": _max(origen, "fecha_busqueda"),
+                "diff_min": int((ahora - ultima).total_seconds() // 60) if ultima else None,
+                "diff_s": int((ahora - ultima).total_seconds()) if ultima else None,
+            }
+            m = re.search(r"LIMIT 1 OFFSET (\d+)\), MAX\(fecha\)\) AS span_llegadas_s", parte)
+            if m:
+                k = int(m.group(1))
+                fechas = heapq.nlargest(k + 1, (r["fecha"] for r in t.filas if r.get("fecha")))
+                fila["span_llegadas_s"] = int((ultima - fechas[k]).total_seconds()) if len(fechas) > k else None
+            elif "NULL AS span_llegadas_s" in parte:
+                fila["span_llegadas_s"] = None
+            if "%s AS tabla" in parte:
+                fila = {"tabla": params.pop(0), **fila}
+            if columnas is not None and len(fila) != columnas:
+                raise pymysql.err.OperationalError(
+                    1222, "The used SELECT statements have a different number of columns")
+            columnas = len(fila)
+            filas.append(fila)
+        return filas, len(filas)
+
+    m = re.match(r"SELECT ((?:`\w+`(?:, )?)+) FROM `(\w+)` WHERE (.*) ORDER BY `fecha`$", sql)
+    if m:
+        cols = [c.strip("` ") for c in m.group(1).split(",")]
+        pred = _filtro(m.group(3), params)
+        filas = [{c: r.get(c) for c in cols} for r in _tabla(srv, conn, m.group(2)).filas if pred(r)]
+        return filas, len(filas)
+
+    m = re.match(r"SELECT MAX\(fecha\) AS ultima FROM `(\w+)`$", sql)
+    if m:
+        return [{"ultima": _max(_tabla(srv, conn, m.group(1)).filas, "fecha")}], 1
+
+    if up.startswith("SELECT (SELECT MAX(FECHA)"):
+        fila = {}
+        for tabla, alias in re.findall(r"\(SELECT MAX\(fecha\) FROM `(\w+)`\) AS (\w+)", sql):
+            fila[alias] = _max(_tabla(srv, conn, tabla).filas, "fecha")
+        return [fila], 1
+
+    m = re.match(r"SELECT COUNT\(\*\) AS filas, MIN\(fecha\) AS desde FROM \(SELECT .*? FROM `(\w+)` "
+                 r"ORDER BY `fecha` DESC LIMIT (\d+)\) AS cola WHERE (.*)$", sql)
+    if m:
+        cola = _tabla(srv, conn, m.group(1)).filas[-int(m.group(2)):]
+        pred = _filtro(m.group(3), params)
+        sel = [r for r in cola if pred(r)]
+        return [{"filas": len(sel), "desde": min((r["fecha"] for r in sel), default=None)}], 1
+
+    m = re.match(r"SELECT TIMESTAMPDIFF\(SECOND, %s, fecha\) DIV %s AS intervalo, COUNT\(\*\) AS filas "
+                 r"FROM `(\w+)` WHERE (.*) GROUP BY intervalo ORDER BY intervalo$", sql)
+    if m:
+        origen, paso = params.pop(0), params.pop(0)
+        pred = _filtro(m.group(2), params)
+        conteos = {}
+        for r in _tabla(srv, conn, m.group(1)).filas:
+            if pred(r):
+                i = int((r["fecha"] - origen).total_seconds()) // paso
+                conteos[i] = conteos.get(i, 0) + 1
+        filas = [{"intervalo": i, "filas": n} for i, n in sorted(conteos.items())]
+        return filas, len(filas)
+
+    m = re.match(r"SELECT COUNT\(\*\) AS filas FROM `(\w+)` WHERE (.*)$", sql)
+    if m:
+        pred = _filtro(m.group(2), params)
+        return [{"filas": sum(1 for r in _tabla(srv, conn, m.group(1)).filas if pred(r))}], 1
+
+    raise NotImplementedError(f"fake_mysql no soporta: {sql[:200]}")
+
+
+def instalar(servidor, *modulos_socket):
+    """
+    Reemplaza pymysql.connect por el servidor simulado (y socket.create_connection
+    en los módulos indicados). Retorna una función que deshace el cambio.
+    """
+    original = pymysql.connect
+    pymysql.connect = servidor.connect
+    originales_socket = []
+    for mod in modulos_socket:
+        originales_socket.append((mod, mod.socket))
+        mod.socket = _ModuloSocket(servidor, mod.socket)
+
+    def deshacer():
+        pymysql.connect = original
+        for mod, sock in originales_socket:
+            mod.socket = sock
+    return deshacer
+
+
+class _ModuloSocket:
+    def __init__(self, servidor, real):
+        self._servidor = servidor
+        self._real = real
+
+    def create_connection(self, *a, **kw):
+        return self._servidor.create_connection(*a, **kw)
+
+    def __getattr__(self, nombre):
+        return getattr(self._real, nombre)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ejecución de lectura_tablas repartida en varios procesos, para despliegues con
+muchas plantas donde un solo proceso no alcanza a terminar dentro del intervalo
+de cron.
+
+El coordinador lista las tablas del centralizado, las agrupa por planta (todas
+las tablas de una planta van al mismo proceso, así cada planta se consulta con una
+sola conexión) y reparte los grupos en PROCESOS_SYNC procesos, equilibrando la
+cantidad de tablas. Cada proceso corre lectura_tablas.main() sobre su parte con
+sus propias conexiones; el coordinador junta resultados y métricas en un único
+resumen (resumen_sync.json / .prom, igual que una corrida normal).
+
+Los borrados se hacen con el lock por tabla de lectura_tablas.bloqueo_tabla
+(GET_LOCK de MySQL), así que ni dos procesos ni dos corridas superpuestas borran
+a la vez en la misma tabla.
+
+    python lectura_paralela.py --procesos 4
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PROCESOS_SYNC = int(os.getenv("PROCESOS_SYNC", "4"))
+
+
+def repartir(tablas, procesos, planta_de):
+    """
+    Agrupa `tablas` por planta y reparte los grupos en hasta `procesos` partes: el grupo
+    más grande primero, siempre a la parte con menos tablas. Retorna [[tablas], ...].
+    """
+    grupos = {}
+    for t in tablas:
+        grupos.setdefault(planta_de(t), []).append(t)
+    partes = [[] for _ in range(max(1, min(procesos, len(grupos))))]
+    for grupo in sorted(grupos.values(), key=len, reverse=True):
+        min(partes, key=len).extend(grupo)
+    return [p for p in partes if p]
+
+
+def _worker(parte, tablas):
+    """Corre un ciclo de lectura_tablas sobre `tablas` en este proceso."""
+    # cada proceso con su propio archivo de eventos pendientes (se reescribe completo al fallar la BD);
+    # los de partes que ya no existen los recoge el sink de cualquier parte (eventos_sink._spill_hermanos)
+    spill = Path(os.getenv("EVENTOS_SPILL_FILE", "eventos_pendientes.jsonl"))
+    os.environ["EVENTOS_SPILL_FILE"] = str(spill.with_name(f"{spill.stem}_{parte}{spill.suffix}"))
+    import metricas
+    metricas.RESUMEN_DIR = ""   # el resumen lo escribe el coordinador
+    metricas.METRICAS_DIR = ""
+    import lectura_tablas as lt
+
+    t0 = time.perf_counter()
+    resultados, error = [], None
+    try:
+        resultados = lt.main(tablas) or []
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "parte": parte,
+        "pid": os.getpid(),
+        "tablas": len(tablas),
+        "duracion_s": round(time.perf_counter() - t0, 3),
+        "error": error,
+        "resultados": resultados,
+        "metricas": metricas.exportar(),
+    }
+
+
+def ejecutar(procesos: int = PROCESOS_SYNC, inicio: str = "spawn"):
+    """
+    Lista, reparte y ejecuta. Retorna {"partes": [...], "resultados": [...], "contadores": {...}}.
+    `inicio` es el método de arranque de multiprocessing ("spawn": procesos limpios, sin
+    conexiones ni hilos heredados del coordinador).
+    """
+    import lectura_tablas as lt
+    import metricas
+    import registro_plantas
+
+    registro = registro_plantas.obtener()
+    conn = lt.get_conn()
+    try:
+        tablas = lt.listar_tablas(conn)
+    finally:
+        conn.close()
+
+    partes = repartir(tablas, procesos, lambda t: lt.planta_de_tabla(t, registro))
+    print(f"{len(tablas)} tablas en {len(partes)} procesos: " + ", ".join(str(len(p)) for p in partes))
+
+    salida = []
+    with metricas.ciclo("sync"):
+        if partes:
+            with ProcessPoolExecutor(max_workers=len(partes), mp_context=mp.get_context(inicio)) as ex:
+                futuros = [ex.submit(_worker, i, p) for i, p in enumerate(partes)]
+                for f in futuros:
+                    salida.append(f.result())
+        for s in salida:
+            metricas.fusionar(s.pop("metricas"))
+            if s["error"]:
+                metricas.incrementar("procesos_fallidos")
+
+    contadores = {}
+    for (nombre, _), v in metricas.exportar()["contadores"].items():
+        contadores[nombre] = contadores.get(nombre, 0) + v
+    return {
+        "partes": [{k: v for k, v in s.items() if k != "resultados"} for s in salida],
+        "resultados": [r for s in salida for r in s["resultados"]],
+        "contadores": contadores,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--procesos", type=int, default=PROCESOS_SYNC)
+    ap.add_argument("--json", action="store_true", help="imprimir el resumen consolidado en JSON")
+    args = ap.parse_args(argv)
+
+    data = ejecutar(args.procesos)
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
+        return data
+    print("\n--- resumen por proceso ---")
+    for p in data["partes"]:
+        estado = f"❌ {p['error']}" if p["error"] else "✅"
+        print(f"proceso {p['parte']} (pid {p['pid']}): {p['tablas']} tablas en {p['duracion_s']:.2f}s {estado}")
+    c = data["contadores"]
+    print(f"tablas={c.get('tablas_escaneadas', 0)} atrasadas={c.get('tablas_atrasadas', 0)} "
+          f"borrados={c.get('borrados', 0)} filas_borradas={c.get('filas_borradas', 0)} "
+          f"errores={c.get('errores', 0)} bloqueadas={c.get('tablas_bloqueadas', 0)}")
+    return data
+
+
+if __name__ == "__main__":
+    main()
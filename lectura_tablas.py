@@ -3,7 +3,21 @@
 import os, json, pymysql
 from pymysql.cursors import DictCursor
 from dotenv import load_dotenv
+import cache_descubrimiento
+import cache_watermarks
+import circuito_plantas
+import eventos_sink
+import log_async
+import metricas
+import modelo_llegadas
+import planificador_resync
+import registro_plantas
+import pool_conexiones
+import supervisor_conexiones_remotas
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 # --- Cargar variables del entorno ---
@@ -16,7 +30,52 @@ DB_USER = os.getenv("DB_USER", "usuario")
 DB_PASS = os.getenv("DB_PASS", "password")
 DB_NAME = os.getenv("DB_NAME", "datos_base_plantas")
 DB_NAME_SOPORTE=os.getenv("DB_NAME_SOPORTE", "soporte_tensor")
-UMBRAL_MIN = int(os.getenv("UMBRAL_MIN", "3"))  # minutos
+# UMBRAL_MIN (minutos) lo lee registro_plantas; plantas.json puede definirlo por tipo/planta.
+# Con modelo_llegadas, cada tabla con historial usa su umbral adaptativo y estos quedan de respaldo.
+# VENTANA_REMOTA_S: si el último registro remoto es más reciente que esto, la planta está al día
+VENTANA_REMOTA_S = float(os.getenv("VENTANA_REMOTA_S", "300"))
+
+# Timeouts para las BD remotas de planta (enlace WAN lento)
+REMOTE_CONNECT_TIMEOUT = int(os.getenv("REMOTE_CONNECT_TIMEOUT", "6"))
+REMOTE_READ_TIMEOUT = int(os.getenv("REMOTE_READ_TIMEOUT", "10"))
+
+# Modo concurrente: consultas remotas en paralelo, acotadas por un plazo global
+MODO_CONCURRENTE = os.getenv("MODO_CONCURRENTE", "1") == "1"
+MAX_WORKERS_REMOTOS = int(os.getenv("MAX_WORKERS_REMOTOS", "8"))
+PLAZO_GLOBAL_S = float(os.getenv("PLAZO_GLOBAL_S", "30"))  # segundos
+# Sondeo por planta: una conexión y una sola consulta para todas las tablas atrasadas de la planta
+SONDEO_POR_PLANTA = os.getenv("SONDEO_POR_PLANTA", "1") == "1"
+
+# Escaneo por lotes: una consulta UNION ALL por cada LOTE_TABLAS tablas del centralizado
+MODO_LOTE = os.getenv("MODO_LOTE", "1") == "1"
+LOTE_TABLAS = int(os.getenv("LOTE_TABLAS", "50"))
+
+# Reporte de diagnostico_indices.py: define la estrategia de lectura de fechas por tabla
+DIAGNOSTICO_FILE = os.getenv("DIAGNOSTICO_FILE", "diagnostico_indices.json")
+# con estrategia "orden", fecha_busqueda se toma de los N registros más recientes
+VENTANA_BUSQUEDA = int(os.getenv("VENTANA_BUSQUEDA", "100"))
+# estrategias del reporte con índice en `fecha` ("sin_indice" no lo tiene): en esas tablas
+# la muestra del modelo de llegadas sale del índice y se pide en cada ciclo
+ESTRATEGIAS_CON_INDICE = ("max", "orden")
+
+# Buffer de eventos: registros de soporte en una sola transacción al final del ciclo
+BUFFER_EVENTOS = os.getenv("BUFFER_EVENTOS", "1") == "1"
+
+# Cache local de fechas (cache_watermarks.py): omite MAX(fecha) en tablas sin cambios
+CACHE_WATERMARKS = os.getenv("CACHE_WATERMARKS", "1") == "1"
+
+# Resincronización: "preciso" borra el rango calculado por planificador_resync, "fijo" los últimos 30
+MODO_RESYNC = os.getenv("MODO_RESYNC", "preciso")
+RESYNC_DRY_RUN = os.getenv("RESYNC_DRY_RUN", "0") == "1"  # solo informa filas y costo, no borra
+# Lock por tabla del centralizado (GET_LOCK) al borrar: segundos a esperar si otra ejecución lo tiene
+BLOQUEO_TABLA_S = float(os.getenv("BLOQUEO_TABLA_S", "0"))
+
+# Tablas de soporte donde se registran los borrados y los errores (las lee analitica_sla)
+TABLA_REGISTRO_SYNC = "soporte_tensor.registro_sincronizacion"
+TABLA_ERROR_SYNC = "soporte_tensor.error_sincronizacion"
+# registro_sincronizacion.tabla nació VARCHAR(10), que corta horometro_XX / pesometro_XX;
+# ampliar_registro_sync() la lleva a este ancho y registrar_sincronizacion corta al ancho real
+ANCHO_TABLA_SYNC = 30
 
 # Tablas a excluir (separadas por comas)
 TABLAS_EXCLUIDAS = [
@@ -26,26 +85,17 @@ TABLAS_EXCLUIDAS = [
 # Patrones válidos
 PATTERNS = ("horometro\\_%", "pesometro\\_%", "plc\\_%")
 
+# en modo daemon las conexiones salen de pool_conexiones; en cron son nuevas cada vez
 def get_conn():
-    return pymysql.connect(
+    return pool_conexiones.conectar(f"central:{DB_NAME}", lambda: pymysql.connect(
         host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASS,
         database=DB_NAME, cursorclass=DictCursor, autocommit=True
-    )
+    ))
 def get_conn_soporte():
-    return pymysql.connect(
+    return pool_conexiones.conectar(f"central:{DB_NAME_SOPORTE}", lambda: pymysql.connect(
         host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASS,
         database=DB_NAME_SOPORTE, cursorclass=DictCursor, autocommit=True
-    )
-
-def _get_env_for_plant(planta: int, key: str, required=True, default=None):
-    """
-    Lee variables como HOST_61, USER_61, PASS_61, DB_61, PORT_61 desde .env
-    """
-    env_key = f"{key.upper()}_{planta}"
-    val = os.getenv(env_key, default)
-    if required and (val is None or str(val).strip() == ""):
-        raise RuntimeError(f"Falta variable {env_key} en .env")
-    return val
+    ))
 
 def _parse_tipo_planta(nombre_tabla: str):
     """
@@ -61,8 +111,30 @@ def _parse_tipo_planta(nombre_tabla: str):
 
 ##festa funcion, lista el nombre de las tablas de la base de datos, segun un patron
 #el patron viende dado por la variable global  *PATTERNS
+@metricas.medido("listar_tablas")
 def listar_tablas(conn):
-    """Devuelve las tablas que coincidan con los patrones y no estén en TABLAS_EXCLUIDAS"""
+    """
+    Devuelve las tablas que coincidan con los patrones y no estén en TABLAS_EXCLUIDAS.
+    La lista sale de cache_descubrimiento mientras el esquema no cambie.
+    """
+    tablas = cache_descubrimiento.tablas(conn, DB_NAME, lambda: _consultar_tablas(conn), clave=list(PATTERNS))
+
+    # Filtrar excluidas
+    if TABLAS_EXCLUIDAS:
+        tablas = [t for t in tablas if t not in TABLAS_EXCLUIDAS]
+    return tablas
+
+@contextmanager
+def _vigilar_esquema():
+    """Si una consulta al centralizado falla por tabla o columna inexistente, descarta el cache de descubrimiento."""
+    try:
+        yield
+    except pymysql.err.MySQLError as e:  # 1146 llega como ProgrammingError, 1054 como OperationalError
+        if e.args and e.args[0] in (1054, 1146):
+            cache_descubrimiento.invalidar(DB_NAME)
+        raise
+
+def _consultar_tablas(conn):
     sql = """
         SELECT TABLE_NAME AS tn
         FROM information_schema.tables
@@ -76,81 +148,164 @@ def listar_tablas(conn):
     """
     with conn.cursor() as cur:
         cur.execute(sql, (DB_NAME, *PATTERNS))
-        tablas = [r["tn"] for r in cur.fetchall()]
+        return [r["tn"] for r in cur.fetchall()]
 
-    # Filtrar excluidas
-    if TABLAS_EXCLUIDAS:
-        tablas = [t for t in tablas if t not in TABLAS_EXCLUIDAS]
-    return tablas
+def _cargar_estrategias(path: str = DIAGNOSTICO_FILE):
+    """
+    Lee {tabla: estrategia} del último reporte de diagnostico_indices.py.
+    Si no hay reporte, todas las tablas usan la estrategia "max".
+    """
+    p = Path(path)
+    if not p.exists():
+        return {}
+    try:
+        with p.open(encoding="utf-8") as f:
+            return json.load(f).get("estrategias_central", {})
+    except (OSError, ValueError) as e:
+        print(f"no se pudo leer {path}: {e}")
+        return {}
 
-#consulta la ultima fecha de registro como de sincronizacion de la tabla de centralziado
-def consultar_tabla(conn, tabla):
-    sql = f"""
-        SELECT
-            MAX(fecha) AS ultima_fecha,
-            MAX(fecha_busqueda) AS ultima_busqueda,
-            TIMESTAMPDIFF(MINUTE, MAX(fecha), NOW()) AS diff_min
-        FROM `{tabla}`
+def _sql_fechas(tabla, estrategia: str = "max", span=None):
+    """
+    SELECT de (ultima_fecha, ultima_busqueda, diff_min, diff_s[, span_llegadas_s]) para una tabla.
+    - "max" (o "sin_indice"): MAX() directo; barato solo si fecha y fecha_busqueda tienen índice.
+    - "orden": lee los VENTANA_BUSQUEDA registros más recientes por ORDER BY fecha DESC LIMIT,
+      que el índice de `fecha` resuelve sin recorrer la tabla.
+    Con span, span_llegadas_s es el tiempo que abarcan las últimas MUESTRA_LLEGADAS filas
+    (para modelo_llegadas). Con índice en `fecha` se leen solo esas filas; sin índice es un
+    recorrido completo más un ordenamiento, por eso se pide solo cada tanto (ver _ciclo).
+    Con span=False la columna va como NULL (mismas columnas que las partes con muestra
+    en un UNION ALL); con None no va.
     """
+    if estrategia == "orden":
+        origen = (f"(SELECT fecha, fecha_busqueda FROM `{tabla}` "
+                  f"ORDER BY fecha DESC LIMIT {int(VENTANA_BUSQUEDA)}) AS ult")
+    else:
+        origen = f"`{tabla}`"
+    if span:
+        span = (f",\n                TIMESTAMPDIFF(SECOND, (SELECT fecha FROM `{tabla}` ORDER BY fecha DESC "
+                f"LIMIT 1 OFFSET {int(modelo_llegadas.MUESTRA_LLEGADAS)}), MAX(fecha)) AS span_llegadas_s")
+    elif span is False:
+        span = ",\n                NULL AS span_llegadas_s"
+    else:
+        span = ""
+    return f"""
+            SELECT
+                MAX(fecha) AS ultima_fecha,
+                MAX(fecha_busqueda) AS ultima_busqueda,
+                TIMESTAMPDIFF(MINUTE, MAX(fecha), NOW()) AS diff_min,
+                TIMESTAMPDIFF(SECOND, MAX(fecha), NOW()) AS diff_s{span}
+            FROM {origen}"""
+
+#consulta la ultima fecha de registro como de sincronizacion de la tabla de centralziado
+@metricas.medido("consultar_tabla", "tabla")
+def consultar_tabla(conn, tabla, estrategia: str = "max", span=None):
+    sql = _sql_fechas(tabla, estrategia, span)
     with conn.cursor() as cur:
         cur.execute(sql)
         row = cur.fetchone() or {}
-        if not row.get("ultima_fecha"):
-            return None
-        tipo, planta = _parse_tipo_planta(tabla)
-        return {
-            "tabla": tabla,
-            "tipo": tipo,  # nuevo
-            "planta": planta,  # nuevo
-            "fecha": row["ultima_fecha"].strftime("%Y-%m-%d %H:%M:%S"),
-            "fecha_busqueda": (
-                row["ultima_busqueda"].strftime("%Y-%m-%d %H:%M:%S")
-                if row.get("ultima_busqueda") else None
-            ),
-            "minutos_diferencia": int(row["diff_min"]) if row.get("diff_min") is not None else None, # es la diferencia entre la fecha de ultimo registro y la fecha actua
-        }
+        return _fila_a_info(tabla, row)
+
+def _fila_a_info(tabla, row):
+    """Convierte una fila (ultima_fecha, ultima_busqueda, diff_min) al dict de consultar_tabla."""
+    if not row.get("ultima_fecha"):
+        return None
+    tipo, planta = _parse_tipo_planta(tabla)
+    return {
+        "tabla": tabla,
+        "tipo": tipo,  # nuevo
+        "planta": planta,  # nuevo
+        "fecha": row["ultima_fecha"].strftime("%Y-%m-%d %H:%M:%S"),
+        "fecha_busqueda": (
+            row["ultima_busqueda"].strftime("%Y-%m-%d %H:%M:%S")
+            if row.get("ultima_busqueda") else None
+        ),
+        "minutos_diferencia": int(row["diff_min"]) if row.get("diff_min") is not None else None, # es la diferencia entre la fecha de ultimo registro y la fecha actua
+        "segundos_diferencia": int(row["diff_s"]) if row.get("diff_s") is not None else None,
+        "span_llegadas_s": row.get("span_llegadas_s"),
+    }
+
+def _info_desde_cache(tabla, fecha, fecha_busqueda):
+    """Dict de consultar_tabla() armado desde el cache; minutos_diferencia contra la hora actual."""
+    tipo, planta = _parse_tipo_planta(tabla)
+    diff = (datetime.now() - datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S")).total_seconds()
+    return {
+        "tabla": tabla,
+        "tipo": tipo,
+        "planta": planta,
+        "fecha": fecha,
+        "fecha_busqueda": fecha_busqueda,
+        "minutos_diferencia": int(diff // 60),
+        "segundos_diferencia": int(diff),
+    }
+
+#igual que consultar_tabla, pero para muchas tablas en una sola consulta UNION ALL por lote
+@metricas.medido("consultar_tablas_lote")
+def consultar_tablas_lote(conn, tablas, lote: int = LOTE_TABLAS, estrategias=None, con_span=()):
+    """
+    Retorna {tabla: dict | None} con el mismo formato de consultar_tabla(),
+    usando una consulta UNION ALL por cada `lote` tablas (round trips constantes
+    respecto al número de plantas). Las tablas en con_span traen además span_llegadas_s;
+    si alguna del lote la trae, las demás la traen en NULL (un UNION ALL exige las
+    mismas columnas en todas las partes, si no MySQL responde 1222).
+    """
+    resultado = {}
+    lote = max(1, int(lote))
+    for i in range(0, len(tablas), lote):
+        grupo = tablas[i:i + lote]
+        for t in grupo:
+            if not _VALID_TBL.match(t):
+                raise ValueError(f"Nombre de tabla inválido: {t}")
+        estrategias = estrategias or {}
+        con_columna = any(t in con_span for t in grupo)
+        partes = [
+            f"SELECT %s AS tabla, x.* FROM "
+            f"({_sql_fechas(t, estrategias.get(t, 'max'), (t in con_span) if con_columna else None)}) AS x"
+            for t in grupo
+        ]
+        sql = "\nUNION ALL\n".join(partes)
+        with conn.cursor() as cur:
+            cur.execute(sql, tuple(grupo))
+            filas = {r["tabla"]: r for r in cur.fetchall()}
+        for t in grupo:
+            resultado[t] = _fila_a_info(t, filas.get(t) or {})
+    return resultado
+
+##la tabla remota y las credenciales de cada planta vienen de registro_plantas (plantas.json + .env)
+def _tabla_remota(planta, tipo: str) -> str:
+    """Nombre de la tabla en la BD remota de la planta para el tipo dado."""
+    return registro_plantas.obtener().tabla_remota(planta, tipo)
+
+def _conectar_planta(planta):
+    """Abre conexión a la BD remota de la planta con credenciales del registro."""
+    c = registro_plantas.obtener().conexion(planta)
+    # clave propia: el supervisor usa otros timeouts con la misma planta
+    return pool_conexiones.conectar(f"planta_{planta}:lectura", lambda: pymysql.connect(
+        host=c["host"], user=c["user"], password=c["password"], database=c["database"],
+        port=c["port"], cursorclass=DictCursor, autocommit=True,
+        connect_timeout=REMOTE_CONNECT_TIMEOUT,
+        read_timeout=REMOTE_READ_TIMEOUT, write_timeout=REMOTE_READ_TIMEOUT,
+    ))
 
 ##hora del ultimo registro de la tabla remota
+def _info_remota(planta, tabla, dt):
+    if not dt:
+        return {"planta": planta, "tabla": tabla, "fecha_ultima": None, "hora_ultima": None}
+    return {
+        "planta": planta,
+        "tabla": tabla,
+        "fecha_ultima": dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "hora_ultima": dt.strftime("%H:%M:%S"),
+    }
+
+@metricas.medido("ultima_hora_plc", "planta", "tipo")
 def ultima_hora_plc(planta: int, tipo: str = "plc1"):
     """
     Retorna dict con última fecha y hora del registro más reciente (columna `fecha`)
-    en la BD de la planta indicada. Las credenciales vienen de .env con sufijo _<planta>.
-    """
-    host = _get_env_for_plant(planta, "HOST")
-    user = _get_env_for_plant(planta, "USER")
-    password = _get_env_for_plant(planta, "PASS")
-    dbname = _get_env_for_plant(planta, "DB")
-    port = int(_get_env_for_plant(planta, "PORT", required=False, default="3306"))
-
-
-    conn = pymysql.connect(
-        host=host, user=user, password=password, database=dbname,
-        port=port, cursorclass=DictCursor, autocommit=True
-    )
-    plantas_plc={
-    "21": {"numero_planta": 2, "nombre_tabla": "plc1"},
-    "31":  {"numero_planta": 3, "nombre_tabla": "plc2"},
-    "41":  {"numero_planta": 4, "nombre_tabla": "plc1"},
-    "51": {"numero_planta": 5, "nombre_tabla": "plc1"},
-    "61": {"numero_planta": 6, "nombre_tabla": "plc1"},
-    "71":{"numero_planta": 7, "nombre_tabla": "plc1"},
-    "81": {"numero_planta": 8, "nombre_tabla": "plc1"}, ##primario de la serena  remoto `plc1`
-    "82":{"numero_planta": 8, "nombre_tabla": "plc2"},# terciaria de la serena, VSIs y cono #remoto plc2
-}
-    plantas_horometro = {
-        "21": {"numero_planta": 2, "nombre_tabla": "horometro_plc1"},
-        "31": {"numero_planta": 3, "nombre_tabla": "horometro_plc2"},
-        "41": {"numero_planta": 4, "nombre_tabla": "horometro_plc1"},
-        "51": {"numero_planta": 5, "nombre_tabla": "horometro_plc1"},
-        "61": {"numero_planta": 6, "nombre_tabla": "horometro_plc1"},
-        "71": {"numero_planta": 7, "nombre_tabla": "horometro_plc11"},
-        "81": {"numero_planta": 8, "nombre_tabla": "horometro_plc1"},  ##primario de la serena  remoto `plc1`
-        "82": {"numero_planta": 8, "nombre_tabla": "horometro_plc2"},  # terciaria de la serena, VSIs y cono #remoto plc2
-    }
-    if tipo == "plc":
-        tabla = plantas_plc[str(planta)]["nombre_tabla"]
-    elif tipo == "horometro":
-        tabla = plantas_horometro[str(planta)]["nombre_tabla"]
+    en la BD de la planta indicada. Tabla y credenciales vienen de registro_plantas.
+    """
+    tabla = _tabla_remota(planta, tipo)
+    conn = _conectar_planta(planta)
 
     try:
         with conn.cursor() as cur:
@@ -158,22 +313,164 @@ def ultima_hora_plc(planta: int, tipo: str = "plc1"):
             row = cur.fetchone() or {}
             if not row.get("ultima"):
                 print("no tenia")
-                return {"planta": planta, "tabla": tabla, "fecha_ultima": None, "hora_ultima": None}
-            dt = row["ultima"]
-            print(dt)
-            return {
-                "planta": planta,
-                "tabla": tabla,
-                "fecha_ultima": dt.strftime("%Y-%m-%d %H:%M:%S"),
-                "hora_ultima": dt.strftime("%H:%M:%S"),
-            }
+            else:
+                print(row["ultima"])
+            return _info_remota(planta, tabla, row.get("ultima"))
     finally:
         conn.close()
 
+@metricas.medido("ultimas_horas_planta", "planta")
+def ultimas_horas_planta(planta: int, tipos):
+    """
+    Como ultima_hora_plc() pero para varios tipos de la misma planta con una sola
+    conexión y una sola consulta:
+        SELECT (SELECT MAX(fecha) FROM `plc1`) AS u0, (SELECT MAX(fecha) FROM `horometro_plc1`) AS u1
+    Retorna {tipo: info | Exception}. Si la consulta combinada falla por una tabla o
+    columna inexistente (1146 / 1054), consulta cada tabla por separado para no perder las demás.
+    """
+    tablas = {tipo: _tabla_remota(planta, tipo) for tipo in tipos}
+    distintas = sorted(set(tablas.values()))
+    for t in distintas:
+        if not _VALID_TBL.match(t):
+            raise ValueError(f"Nombre de tabla inválido: {t}")
+    conn = _conectar_planta(planta)
+    try:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("SELECT " + ", ".join(
+                    f"(SELECT MAX(fecha) FROM `{t}`) AS u{i}" for i, t in enumerate(distintas)))
+                row = cur.fetchone() or {}
+                ultimas = {t: row.get(f"u{i}") for i, t in enumerate(distintas)}
+            except pymysql.err.MySQLError as e:
+                if not (e.args and e.args[0] in (1054, 1146)):
+                    raise
+                ultimas = {}
+                for t in distintas:
+                    try:
+                        cur.execute(f"SELECT MAX(fecha) AS ultima FROM `{t}`")
+                        ultimas[t] = (cur.fetchone() or {}).get("ultima")
+                    except pymysql.err.MySQLError as e:
+                        if not (e.args and e.args[0] in (1054, 1146)):
+                            raise
+                        ultimas[t] = e
+    finally:
+        conn.close()
+    res = {}
+    for tipo, t in tablas.items():
+        v = ultimas.get(t)
+        res[tipo] = v if isinstance(v, Exception) else _info_remota(planta, t, v)
+        print(f"planta {planta} {t}: {res[tipo] if isinstance(v, Exception) else v}")
+    return res
+
+##consulta remota con medicion de latencia, usada en modo serial y concurrente
+
+def _consultar_remota(item):
+    """
+    Ejecuta ultima_hora_plc() para un item de tabla atrasada.
+    Retorna (info_plc, error, latencia_s); nunca lanza excepción.
+    """
+    t0 = time.monotonic()
+    try:
+        info = ultima_hora_plc(item.get("planta"), item.get("tipo"))
+        return info, None, time.monotonic() - t0
+    except Exception as e:
+        return None, e, time.monotonic() - t0
+
+def _consultar_remotas_planta(items):
+    """
+    Consulta juntos los items de una misma planta (ultimas_horas_planta).
+    Retorna lista alineada con `items` de (info_plc, error, latencia_s); nunca lanza.
+    La latencia es la de la consulta combinada, compartida por todos los items.
+    """
+    t0 = time.monotonic()
+    try:
+        por_tipo = ultimas_horas_planta(items[0].get("planta"), [it.get("tipo") for it in items])
+    except Exception as e:
+        dt = time.monotonic() - t0
+        return [(None, e, dt) for _ in items]
+    dt = time.monotonic() - t0
+    res = []
+    for it in items:
+        v = por_tipo.get(it.get("tipo"))
+        res.append((None, v, dt) if isinstance(v, Exception) else (v, None, dt))
+    return res
+
+def _grupos_por_planta(items):
+    """{planta: [indices de items]} en orden de aparición."""
+    grupos = {}
+    for i, it in enumerate(items):
+        grupos.setdefault(it.get("planta"), []).append(i)
+    return grupos
+
+def consultar_remotas_concurrente(items, max_workers: int = MAX_WORKERS_REMOTOS,
+                                  plazo_s: float = PLAZO_GLOBAL_S):
+    """
+    Consulta en paralelo la última hora remota de cada item, con un pool acotado de hilos.
+    Cada consulta tiene sus propios timeouts de conexión/lectura y el lote completo
+    queda limitado por `plazo_s`. Retorna una lista alineada con `items` de tuplas
+    (info_plc, error, latencia_s); lo que no termina a tiempo vuelve con TimeoutError.
+    Con SONDEO_POR_PLANTA cada tarea consulta todos los items de una planta juntos.
+    """
+    resultados = [None] * len(items)
+    if not items:
+        return resultados
+
+    if SONDEO_POR_PLANTA:
+        tareas = list(_grupos_por_planta(items).values())
+    else:
+        tareas = [[i] for i in range(len(items))]
+
+    def _tarea(indices):
+        if SONDEO_POR_PLANTA:
+            return _consultar_remotas_planta([items[i] for i in indices])
+        return [_consultar_remota(items[indices[0]])]
+
+    t0 = time.monotonic()
+    ex = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tareas))))
+    futuros = {ex.submit(_tarea, indices): indices for indices in tareas}
+    try:
+        hechos, pendientes = wait(futuros, timeout=plazo_s)
+        for f in hechos:
+            for i, r in zip(futuros[f], f.result()):
+                resultados[i] = r
+        for f in pendientes:
+            f.cancel()
+            for i in futuros[f]:
+                resultados[i] = (
+                    None,
+                    TimeoutError(f"plazo global de {plazo_s}s excedido"),
+                    time.monotonic() - t0,
+                )
+    finally:
+        # no esperar hilos colgados: sus timeouts de socket los terminan solos
+        ex.shutdown(wait=False, cancel_futures=True)
+    return resultados
+
+def _reportar_latencias(items, remotos):
+    """
+    Imprime la latencia remota por planta (máxima y total de sus consultas). Con
+    SONDEO_POR_PLANTA todas las tablas de la planta comparten la latencia de una sola
+    consulta combinada, que se cuenta una vez.
+    """
+    por_planta = {}
+    for item, (_, err, lat) in zip(items, remotos):
+        r = por_planta.setdefault(item.get("planta"), {"consultas": 0, "errores": 0, "max_s": 0.0, "total_s": 0.0})
+        r["consultas"] += 1
+        r["errores"] += 1 if err is not None else 0
+        r["max_s"] = max(r["max_s"], lat)
+        r["total_s"] = r["max_s"] if SONDEO_POR_PLANTA else r["total_s"] + lat
+    print("--- latencia por planta ---")
+    for planta in sorted(por_planta, key=lambda p: (p is None, p)):
+        r = por_planta[planta]
+        print(f"planta {planta}: max={r['max_s']:.2f}s total={r['total_s']:.2f}s "
+              f"consultas={r['consultas']} errores={r['errores']}")
+    return por_planta
+
 ##funcion que elimna
 
 _VALID_TBL = re.compile(r"^[A-Za-z0-9_]+$")
 
+@metricas.medido("borrar_ultimos_30", "tabla")
 def borrar_ultimos_30(tabla: str, n: int = 30) -> int:
     """
     Elimina los N registros más recientes de `tabla`.
@@ -187,16 +484,8 @@ def borrar_ultimos_30(tabla: str, n: int = 30) -> int:
     print(f"elimamndo ultimos {n} registros de {tabla}")
     try:
         with conn.cursor() as cur:
-            # ¿La tabla tiene columna 'fecha'?
-            cur.execute(
-                """
-                SELECT COUNT(*) AS tiene
-                FROM information_schema.columns
-                WHERE table_schema = DATABASE() AND table_name=%s AND column_name='fecha'
-                """,
-                (tabla,),
-            )
-            usa_fecha = (cur.fetchone() or {}).get("tiene", 0) > 0
+            # ¿La tabla tiene columna 'fecha'? (consulta cacheada por tabla)
+            usa_fecha = "fecha" in planificador_resync.columnas(conn, tabla)
 
             if usa_fecha:
                 # MySQL permite DELETE ... ORDER BY ... LIMIT
@@ -214,20 +503,64 @@ def borrar_ultimos_30(tabla: str, n: int = 30) -> int:
     finally:
         conn.close()
 
+class TablaBloqueada(Exception):
+    """Otra ejecución (otro proceso o una corrida superpuesta) está borrando en la tabla."""
+
+@contextmanager
+def bloqueo_tabla(tabla: str, espera_s: float = BLOQUEO_TABLA_S):
+    """
+    Lock con nombre de MySQL por tabla del centralizado, tomado en una conexión propia
+    durante el borrado. Como vive en el servidor, excluye también a procesos de otras
+    máquinas; si la sesión muere, MySQL lo libera solo. Lanza TablaBloqueada si no se
+    obtiene en `espera_s` segundos.
+    """
+    nombre = f"monitoreo:{DB_NAME}.{tabla}"[:64]
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT GET_LOCK(%s, %s) AS ok", (nombre, espera_s))
+            if (cur.fetchone() or {}).get("ok") != 1:
+                raise TablaBloqueada(f"{tabla} bloqueada por otra ejecución")
+        try:
+            yield
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT RELEASE_LOCK(%s) AS ok", (nombre,))
+    finally:
+        conn.close()
+
+@metricas.medido("resincronizar_tabla", "tabla")
+def resincronizar_tabla(tabla: str, hora_remota, dry_run: bool = RESYNC_DRY_RUN):
+    """
+    Borra solo el rango que calcula planificador_resync (por bloques).
+    Si la tabla no tiene `fecha`, usa borrar_ultimos_30(). Retorna (filas_borradas, plan).
+    """
+    conn = get_conn()
+    try:
+        plan = planificador_resync.planificar(conn, tabla, hora_remota)
+        print(("[dry-run] " if dry_run else "") + planificador_resync.resumen(plan))
+        if plan["criterio"] != "sin_fecha":
+            return planificador_resync.ejecutar(conn, plan, dry_run=dry_run), plan
+    finally:
+        conn.close()
+    return (0 if dry_run else borrar_ultimos_30(tabla)), plan
+
 ##agregar registro de borrado al centralizado, ademas de log
 
+@metricas.medido("registrar_sincronizacion", "tabla")
 def registrar_sincronizacion(fecha, tabla, hora_detencion,
-                             log_file: str = "log_sincronizacion.log",
+                             log_file: str = log_async.LOG_FILE,
                              conn=None) -> int:
     """
     Inserta (fecha, tabla, hora_detencion) en soporte_tensor.registro_sincronizacion
-    y registra una línea en el archivo de log. Retorna el id insertado.
+    y registra el evento "resync" en el log (log_async). Retorna el id insertado.
     - fecha y hora_detencion pueden ser datetime o str 'YYYY-MM-DD HH:MM:SS'.
+    - Si hay un sink de eventos activo (y no se pasa conn), la fila queda en el buffer
+      y retorna None.
     """
-    # normalizar tabla a varchar(10)
-    if tabla is None:
-        tabla = ""
-    tabla = str(tabla)[:10]
+    # el log lleva el nombre completo; la columna, cortado a su ancho (varchar(10) sin ampliar)
+    tabla = str(tabla if tabla is not None else "")
+    tabla_bd = tabla[:ancho_tabla_sync()]
 
     # normalizar fechas a datetime (PyMySQL acepta datetime directamente)
     def _to_dt(v):
@@ -245,6 +578,17 @@ def registrar_sincronizacion(fecha, tabla, hora_detencion,
     if hora_det_dt is None:
         raise ValueError("`hora_detencion` no puede ser None / vacío")
 
+    sink = eventos_sink.activo()
+    if conn is None and sink is not None:
+        sink.agregar(
+            TABLA_REGISTRO_SYNC,
+            ("fecha", "tabla", "hora_detencion"),
+            (fecha_dt, tabla_bd, hora_det_dt),
+        )
+        log_async.registrar("resync", log_file, tabla=tabla, fecha=fecha_dt,
+                            hora_detencion=hora_det_dt, id="buffer")
+        return None
+
     close_conn = False
     if conn is None:
         conn = get_conn_soporte()  # usa tu función existente
@@ -252,48 +596,87 @@ def registrar_sincronizacion(fecha, tabla, hora_detencion,
 
     try:
         with conn.cursor() as cur:
-            sql = """
-                INSERT INTO soporte_tensor.registro_sincronizacion
+            sql = f"""
+                INSERT INTO {TABLA_REGISTRO_SYNC}
                     (fecha, tabla, hora_detencion)
                 VALUES (%s, %s, %s)
             """
-            cur.execute(sql, (fecha_dt, tabla, hora_det_dt))
+            cur.execute(sql, (fecha_dt, tabla_bd, hora_det_dt))
             conn.commit()
             inserted_id = cur.lastrowid
     finally:
         if close_conn:
             conn.close()
 
-    # --- Log: crea solo si no existe y agrega al final ---
-    p = Path(log_file)
-    if not p.exists():
-        p.touch()  # crea el archivo vacío si no existe
+    log_async.registrar("resync", log_file, tabla=tabla, fecha=fecha_dt,
+                        hora_detencion=hora_det_dt, id=inserted_id)
+    return inserted_id
 
-    linea = (
-        f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} "
-        f"| tabla={tabla} | fecha={fecha_dt.strftime('%Y-%m-%d %H:%M:%S')} "
-        f"| hora_detencion={hora_det_dt.strftime('%Y-%m-%d %H:%M:%S')} "
-        f"| id={inserted_id}"
-    )
-    with p.open("a", encoding="utf-8") as f:
-        f.write(linea + "\n")
+_ancho_tabla_sync = None
 
-    return inserted_id
+
+def _ancho_columna_tabla_sync(conn):
+    """CHARACTER_MAXIMUM_LENGTH y IS_NULLABLE de registro_sincronizacion.tabla, o None."""
+    esquema, tabla = TABLA_REGISTRO_SYNC.split(".", 1)
+    with conn.cursor() as cur:
+        cur.execute("SELECT CHARACTER_MAXIMUM_LENGTH AS ancho, IS_NULLABLE AS nulo FROM information_schema.columns "
+                    "WHERE table_schema = %s AND table_name = %s AND column_name = 'tabla'", (esquema, tabla))
+        return cur.fetchone()
+
+
+def ancho_tabla_sync():
+    """Ancho de registro_sincronizacion.tabla; se consulta una vez por proceso (10, el original, si falla)."""
+    global _ancho_tabla_sync
+    if _ancho_tabla_sync is None:
+        try:
+            conn = get_conn_soporte()
+            try:
+                r = _ancho_columna_tabla_sync(conn)
+            finally:
+                conn.close()
+            _ancho_tabla_sync = int(r["ancho"]) if r and r["ancho"] else 10
+        except (pymysql.err.MySQLError, OSError) as e:
+            print(f"no se pudo leer el ancho de {TABLA_REGISTRO_SYNC}.tabla, se usa 10: {e}")
+            return 10
+    return _ancho_tabla_sync
+
+
+def ampliar_registro_sync(conn):
+    """Amplía registro_sincronizacion.tabla a ANCHO_TABLA_SYNC si es más angosta. Retorna True si la cambió."""
+    r = _ancho_columna_tabla_sync(conn)
+    if not r or not r["ancho"] or int(r["ancho"]) >= ANCHO_TABLA_SYNC:
+        return False
+    nulo = "NULL" if r["nulo"] == "YES" else "NOT NULL"
+    with conn.cursor() as cur:
+        cur.execute(f"ALTER TABLE {TABLA_REGISTRO_SYNC} MODIFY tabla VARCHAR({ANCHO_TABLA_SYNC}) {nulo}")
+    print(f"{TABLA_REGISTRO_SYNC}.tabla ampliada de {r['ancho']} a {ANCHO_TABLA_SYNC}")
+    return True
 
 ###registrar error de sincronizacion
 
+@metricas.medido("registrar_error", "planta", "tipo")
 def registrar_error(planta: str, tipo: str, err_texto: str,
-                    conn=None, log_file: str = "log_sincronizacion.log") -> int:
+                    conn=None, log_file: str = log_async.LOG_FILE) -> int:
     """
     Inserta en soporte_tensor.error_sincronizacion (planta, tipo, error).
     - Trunca: planta/tipo a 10 chars; error a 1000 chars.
-    - Devuelve el id insertado.
-    - También agrega una línea de log (crea el archivo si no existe).
+    - Devuelve el id insertado (None si quedó en el sink de eventos activo).
+    - También registra el evento "error" en el log (log_async).
     """
-    planta = (planta or "")[:10]
+    planta = str(planta if planta is not None else "")[:10]
     tipo = (tipo or "")[:10]
     err_texto = (err_texto or "")[:1000]
 
+    sink = eventos_sink.activo()
+    if conn is None and sink is not None:
+        sink.agregar(
+            TABLA_ERROR_SYNC,
+            ("planta", "tipo", "error"),
+            (planta, tipo, err_texto),
+        )
+        log_async.registrar("error", log_file, planta=planta, tipo=tipo, error=err_texto)
+        return None
+
     close_conn = False
     if conn is None:
         conn = get_conn_soporte()
@@ -301,8 +684,8 @@ def registrar_error(planta: str, tipo: str, err_texto: str,
 
     try:
         with conn.cursor() as cur:
-            sql = """
-                INSERT INTO soporte_tensor.error_sincronizacion (planta, tipo, error)
+            sql = f"""
+                INSERT INTO {TABLA_ERROR_SYNC} (planta, tipo, error)
                 VALUES (%s, %s, %s)
             """
             cur.execute(sql, (planta, tipo, err_texto))
@@ -312,29 +695,102 @@ def registrar_error(planta: str, tipo: str, err_texto: str,
         if close_conn:
             conn.close()
 
-    # Log a archivo (append; se crea si no existe)
-    p = Path(log_file)
-    if not p.exists():
-        p.touch()
-    with p.open("a", encoding="utf-8") as f:
-        f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S} | ERROR | planta={planta} | tipo={tipo} | {err_texto}\n")
-
+    log_async.registrar("error", log_file, planta=planta, tipo=tipo, error=err_texto, id=inserted_id)
     return inserted_id
 
-def main():
+def planta_de_tabla(tabla, registro=None):
+    """Planta (str) de una tabla del centralizado según plantas.json, o por su nombre."""
+    e = (registro or registro_plantas.obtener()).entrada_central(tabla)
+    return e["planta"] if e else str(_parse_tipo_planta(tabla)[1])
+
+def main(tablas=None, ciclo: str = "sync", plantas=None):
+    """
+    Ejecuta un ciclo de revisión. `tablas` limita el ciclo a ese subconjunto (lo usa
+    la ejecución por procesos de lectura_paralela) y `plantas` a las tablas de esas
+    plantas (solo se consultan esas plantas). Retorna los resultados por tabla.
+    """
+    registro_plantas.obtener()  # valida plantas.json y .env antes de tocar las BD
+    with metricas.ciclo(ciclo), eventos_sink.ciclo(get_conn_soporte, habilitado=BUFFER_EVENTOS):
+        return _main(tablas, plantas)
+
+def _main(solo=None, plantas=None):
+    cache = cache_watermarks.CacheWatermarks() if CACHE_WATERMARKS else None
+    modelo = modelo_llegadas.ModeloLlegadas() if modelo_llegadas.MODELO_LLEGADAS else None
+    try:
+        return _ciclo(cache, solo, plantas, modelo)
+    finally:
+        if cache is not None:
+            cache.close()
+        if modelo is not None:
+            modelo.guardar()
+
+def _ciclo(cache, solo=None, plantas=None, modelo=None):
+    registro = registro_plantas.obtener()
     salida = []
     conn = get_conn()#parametros de conexion de centralizado
     try:
         tablas = listar_tablas(conn) #las tablas de centralizado, segun el nombre y un patron dado
+        if solo is not None:
+            solo = set(solo)
+            tablas = [t for t in tablas if t in solo]
+        if plantas is not None:
+            plantas = {str(p) for p in plantas}
+            tablas = [t for t in tablas if planta_de_tabla(t, registro) in plantas]
+
+        estrategias = _cargar_estrategias()
+        # tablas cuya marca de cambio no se movió se leen del cache local
+        infos = {}
+        marcas = {}
+        if cache is not None:
+            marcas = cache_watermarks.marcas_cambio(conn, DB_NAME, tablas)
+            for t in tablas:
+                vigente = cache.central_vigente(t, marcas.get(t))
+                if vigente:
+                    infos[t] = _info_desde_cache(t, *vigente)
+        por_consultar = [t for t in tablas if t not in infos]
+        metricas.incrementar("tablas_escaneadas", len(tablas))
+        metricas.incrementar("tablas_desde_cache", len(infos))
+        print(f"tablas: {len(tablas)}, desde cache: {len(infos)}, a consultar: {len(por_consultar)}")
+        # muestra del modelo de llegadas: en cada ciclo si el diagnóstico dice que hay índice en
+        # `fecha`; si no (o sin diagnóstico) cada LLEGADAS_CADA_N_CICLOS, por el costo del recorrido
+        con_span = set()
+        if modelo is not None:
+            con_span = {t for t in por_consultar
+                        if modelo.toca_muestra(t, estrategias.get(t) in ESTRATEGIAS_CON_INDICE)}
 
         ##aca
-        for t in tablas:#para cada tabla
+        with _vigilar_esquema():
+            if MODO_LOTE:
+                infos.update(consultar_tablas_lote(conn, por_consultar, estrategias=estrategias, con_span=con_span))  # una consulta por lote de tablas
+            else:
+                for t in por_consultar:
+                    infos[t] = consultar_tabla(conn, t, estrategias.get(t, "max"), (t in con_span) or None)#ultima fecha de registro de la tabla en centralizado, hora del ultimo registr
+        if cache is not None:
+            for t in por_consultar:
+                cache.guardar_central(t, infos.get(t), marcas.get(t))
 
-            info = consultar_tabla(conn, t)#ultima fecha de registro de la tabla en centralizado, hora del ultimo registr
+        for t in tablas:#para cada tabla
+            info = infos.get(t)
             if not info:
                 continue
+            # umbral por tabla: el del modelo de llegadas si ya aprendió la cadencia, si no el de plantas.json;
+            # un umbrales_min explícito en plantas.json es piso del umbral del modelo
+            umbral_s = registro.umbral_min(t) * 60
+            if modelo is not None:
+                modelo.observar(t, info["fecha"], info.get("span_llegadas_s"))
+                explicito = registro.umbral_explicito_min(t)
+                umbral_s = modelo.umbral_s(t, umbral_s, explicito * 60 if explicito else None)
+                metricas.fijar("umbral_atraso_segundos", round(umbral_s), planta=info["planta"], tipo=info["tipo"])
+                info["ventana_remota_s"] = modelo.umbral_s(t, VENTANA_REMOTA_S)
+            segundos = info.get("segundos_diferencia")
+            if segundos is None and info["minutos_diferencia"] is not None:
+                segundos = info["minutos_diferencia"] * 60
                 #si la diferencia entre la fecha de ultimo registro en centralizado y hora actual es mayo a un umbral se agrega a lista de talas a analizar
-            if info["minutos_diferencia"] and info["minutos_diferencia"] > UMBRAL_MIN:
+            if segundos and segundos > umbral_s:
+                if registro.entrada_central(t) is None:
+                    print(f"{t} atrasada, pero sin tabla remota en plantas.json; se omite")
+                    continue
+                metricas.incrementar("tablas_atrasadas", planta=info["planta"], tipo=info["tipo"])
                 salida.append(info)
     finally:
         conn.close()
@@ -347,14 +803,62 @@ def main():
 
 
     # --- NUEVO BLOQUE: llamar a ultima_hora_plc() por cada registro ---
+    # en modo concurrente las consultas remotas se hacen todas antes, en paralelo;
+    # la decision de borrar/registrar sigue el orden de las tablas
+    # con cache, la fecha remota consultada hace menos de TTL_REMOTO_S se reutiliza
+    remotos = [None] * len(salida_resultado)
+    desde_cache = set()
+    if cache is not None:
+        for idx, item in enumerate(salida_resultado):
+            vigente = cache.remoto_vigente(item.get("planta"), item.get("tipo"))
+            if vigente:
+                remotos[idx] = (vigente, None, 0.0)
+                desde_cache.add(idx)
+    # plantas con circuito abierto: se omiten sin intentar conectar
+    permitidas = {}
+    for idx, item in enumerate(salida_resultado):
+        planta = item.get("planta")
+        if remotos[idx] is None:
+            if planta not in permitidas:
+                permitidas[planta] = circuito_plantas.permitir(planta)
+            if not permitidas[planta]:
+                remotos[idx] = (None, circuito_plantas.CircuitoAbierto(f"planta {planta} con circuito abierto"), 0.0)
+    if MODO_CONCURRENTE:
+        pendientes = [idx for idx, r in enumerate(remotos) if r is None]
+        consultados = consultar_remotas_concurrente([salida_resultado[idx] for idx in pendientes])
+        for idx, r in zip(pendientes, consultados):
+            remotos[idx] = r
+
     resultados = []
-    for item in salida_resultado:
+    circuito_visto = set()
+    registrar_planta = {}  # planta -> False si su fallo de conexión no debe registrarse otra vez
+    for idx, item in enumerate(salida_resultado):
         print(f"----------------------------------")
         planta = item.get("planta")
         tipo = item.get("tipo")
         print(f"planta es {planta} y tipo es {tipo}")
+        if remotos[idx] is None and SONDEO_POR_PLANTA:
+            # modo serial: la primera tabla de la planta trae también las demás pendientes
+            misma = [i for i in range(idx, len(salida_resultado))
+                     if remotos[i] is None and salida_resultado[i].get("planta") == planta]
+            for i, r in zip(misma, _consultar_remotas_planta([salida_resultado[i] for i in misma])):
+                remotos[i] = r
+        if remotos[idx] is None:
+            remotos[idx] = _consultar_remota(item)
+        err_planta = remotos[idx][1]
+        if planta not in circuito_visto and idx not in desde_cache \
+                and not isinstance(err_planta, circuito_plantas.CircuitoAbierto):
+            circuito_visto.add(planta)
+            if err_planta is None:
+                circuito_plantas.exito(planta)
+            elif circuito_plantas.es_error_conexion(err_planta):
+                registrar_planta[planta] = circuito_plantas.fallo(planta, err_planta)
         try:
-            info_plc = ultima_hora_plc(planta, tipo) #ultima hora del registro remoto
+            info_plc, err_remoto, _ = remotos[idx] #ultima hora del registro remoto
+            if err_remoto is not None:
+                raise err_remoto
+            if cache is not None and idx not in desde_cache and info_plc.get("fecha_ultima"):
+                cache.guardar_remoto(planta, tipo, info_plc)
             print(f"info plc es: {info_plc}")
             print(f"la hora del ultimo regitrso es: {info_plc['fecha_ultima']}")
             hora_remota=info_plc['fecha_ultima']
@@ -369,9 +873,9 @@ def main():
             diferencia = (ahora - hora_dt).total_seconds()
             print(f"la diferencia es: {diferencia} y esl del tipo {type(diferencia)} ")
 
-            #si la direnecia es menor a 5 minutos, significa que la bd remota esta bien en la
-            #centralizada no se esta sincronizado
-            if diferencia < 300:
+            #si la direnecia es menor a la ventana (5 minutos, o la del modelo de llegadas de la tabla),
+            #significa que la bd remota esta bien en la centralizada no se esta sincronizado
+            if diferencia < item.get("ventana_remota_s", VENTANA_REMOTA_S):
                 tabla_a_eliminar=item["tabla"]
                 print(f"la diferencia es menor  a 5 minutos, debo eliminar registro del centralizado de la tabla {tabla_a_eliminar} si existe para que se sincronice con la remota")
 
@@ -392,8 +896,23 @@ def main():
                 #solo borra si fecha de busquedaes maayor  a hora_remota, que puede la fecha busqued estar llegando por un tema sde sincronizacion, como un vacio en datos remotpoos
                 if fecha_busqueda_centralizado > hora_dt and existe_busqueda:
                     print(f"la fecha de busqueda es mayor a la hora remota, debo eliminar registro del centralizado de la tabla {tabla_a_eliminar}")
-                    salida_borrar=borrar_ultimos_30(tabla_a_eliminar)
+                    simulado = RESYNC_DRY_RUN and MODO_RESYNC == "preciso"
+                    with _vigilar_esquema(), bloqueo_tabla(tabla_a_eliminar):
+                        if MODO_RESYNC == "preciso":
+                            salida_borrar, plan = resincronizar_tabla(tabla_a_eliminar, hora_dt, dry_run=simulado)
+                        else:
+                            salida_borrar=borrar_ultimos_30(tabla_a_eliminar)
                     print(f"la cantidad de registros borrados es: {salida_borrar}")
+                    if simulado:
+                        # dry-run: no se borró nada, se cuenta aparte con las filas que se habrían borrado
+                        metricas.incrementar("borrados_simulados", planta=planta, tipo=tipo)
+                        metricas.incrementar("filas_borrado_simulado", plan.get("filas", 0), planta=planta, tipo=tipo)
+                        resultados.append({"planta": planta, "tipo": tipo, "tabla": item["tabla"], "resultado": info_plc})
+                        continue
+                    metricas.incrementar("borrados", planta=planta, tipo=tipo)
+                    metricas.incrementar("filas_borradas", salida_borrar or 0, planta=planta, tipo=tipo)
+                    if cache is not None:
+                        cache.guardar_central(tabla_a_eliminar, None, None)  # la tabla cambió
                     #dejo el registro
                     fecha=ahora
                     tabla=tabla_a_eliminar
@@ -418,9 +937,31 @@ def main():
             #TODO algo pasa que no puedo conectar a las plantas remotas, dejar registro
             planta = item.get("planta")
             tipo = item.get("tipo")
+            if isinstance(e, circuito_plantas.CircuitoAbierto):
+                metricas.incrementar("omitidas_circuito", planta=planta, tipo=tipo)
+                continue
+            if isinstance(e, TablaBloqueada):
+                metricas.incrementar("tablas_bloqueadas", planta=planta, tipo=tipo)
+                continue
+            metricas.incrementar("errores", planta=planta, tipo=tipo)
+            if circuito_plantas.CIRCUITO and circuito_plantas.es_error_conexion(e):
+                # un solo registro por planta: el del fallo que abre el circuito
+                if not registrar_planta.get(planta, True):
+                    continue
+                registrar_planta[planta] = False
             salida_error=registrar_error(planta, tipo, str(e))
             print(f"la cantidad de registros registrados es: {salida_error}")
 
+    # una fila por cambio de estado del circuito (el fallo que lo abre ya quedó registrado arriba);
+    # todos, también la apertura, van además a la tabla de problemas del supervisor, de donde
+    # analitica_sla arma las caídas (el supervisor no sondea una planta con el circuito abierto)
+    for t in circuito_plantas.transiciones():
+        if t["de"] != "cerrado":
+            registrar_error(t["planta"], "circuito", circuito_plantas.describir(t))
+        supervisor_conexiones_remotas.registrar_transicion(t)
+    _reportar_latencias(salida_resultado, remotos)
+    return resultados
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+Log estructurado compartido (log_sincronizacion.log) con escritura en segundo plano.
+
+- registrar(evento, **campos) encola una línea JSON {"ts", "evento", ...}; un hilo
+  de fondo la escribe agrupando lo pendiente en un solo open/append.
+- El archivo activo rota por tamaño (LOG_MAX_BYTES) o antigüedad (LOG_ROTAR_S) a
+  <log>.<AAAAMMDDTHHMMSS>; los segmentos rotados se comprimen a .gz y se agregan a
+  <log>.indice.json con su rango de fechas y los eventos/tablas/plantas que contienen.
+- consultar() usa ese índice para abrir solo los segmentos que pueden tener
+  coincidencias (ver consultar_log.py).
+
+Varios procesos pueden escribir el mismo log: la rotación y el índice se protegen
+con flock sobre <log>.lock, y un segmento se comprime recién cuando lleva
+GRACIA_COMPRESION_S sin modificarse (por si otro proceso alcanzó a escribir en él).
+"""
+import atexit
+import fcntl
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+LOG_FILE = os.getenv("LOG_FILE", "log_sincronizacion.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_ROTAR_S = float(os.getenv("LOG_ROTAR_S", "86400"))       # rota al menos una vez al día
+LOG_RETENCION_DIAS = int(os.getenv("LOG_RETENCION_DIAS", "0"))  # 0 = conservar todo
+GRACIA_COMPRESION_S = 60
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+_CAMPOS_INDICE = ("evento", "tabla", "planta")
+
+_escritores = {}
+_lock = threading.Lock()
+_FIN = object()
+
+
+def registrar(evento, log_file: str = LOG_FILE, **campos):
+    """Encola un evento para el log; no bloquea ni lanza excepciones de E/S."""
+    reg = {"ts": datetime.now().strftime(_FMT), "evento": evento}
+    reg.update({k: v for k, v in campos.items() if v is not None})
+    _escritor(log_file).cola.put(reg)
+    return reg
+
+
+def vaciar(timeout: float = None):
+    """Espera a que todos los escritores hayan escrito lo encolado."""
+    with _lock:
+        escritores = list(_escritores.values())
+    for e in escritores:
+        e.esperar(timeout)
+
+
+def _escritor(log_file):
+    clave = str(Path(log_file).resolve())
+    with _lock:
+        e = _escritores.get(clave)
+        if e is None or not e.is_alive():
+            e = _escritores[clave] = _Escritor(Path(log_file).resolve())
+            e.start()
+        return e
+
+
+@atexit.register
+def _cerrar_todos():
+    with _lock:
+        escritores = list(_escritores.values())
+        _escritores.clear()
+    for e in escritores:
+        e.cola.put(_FIN)
+    for e in escritores:
+        e.join(timeout=10)
+
+
+class _Escritor(threading.Thread):
+    def __init__(self, path):
+        super().__init__(name=f"log-{path.name}", daemon=True)
+        self.path = path
+        self.cola = queue.Queue()
+        self._inicio_segmento = None
+        self._revisar_en = time.time()  # compactar segmentos que dejó otra ejecución
+
+    def esperar(self, timeout=None):
+        fin = None if timeout is None else time.monotonic() + timeout
+        while self.cola.unfinished_tasks:
+            if fin is not None and time.monotonic() > fin:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def run(self):
+        terminar = False
+        while not terminar:
+            lote = [self.cola.get()]
+            while True:
+                try:
+                    lote.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            regs = [r for r in lote if r is not _FIN]
+            terminar = len(regs) != len(lote)
+            try:
+                if regs:
+                    self._escribir(regs)
+            except Exception as e:
+                print(f"log_async: no se pudo escribir {self.path}: {e}")
+            finally:
+                for _ in lote:
+                    self.cola.task_done()
+
+    def _escribir(self, regs):
+        self._quizas_rotar()
+        texto = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in regs)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(texto)
+        if self._inicio_segmento is None:
+            self._inicio_segmento = time.time()
+
+    def _quizas_rotar(self):
+        if self._revisar_en is not None and time.time() >= self._revisar_en:
+            self._revisar_en = None
+            if any(True for _ in _segmentos_sin_comprimir(self.path)):
+                compactar(self.path)
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            self._inicio_segmento = None
+            return
+        if self._inicio_segmento is None:
+            self._inicio_segmento = _inicio_archivo(self.path) or st.st_mtime
+        if st.st_size == 0:
+            return
+        if st.st_size >= LOG_MAX_BYTES or time.time() - self._inicio_segmento >= LOG_ROTAR_S:
+            rotar(self.path)
+            self._inicio_segmento = None
+            self._revisar_en = time.time() + GRACIA_COMPRESION_S
+
+
+def _inicio_archivo(path):
+    """Fecha (epoch) de la primera línea JSON del archivo, o None."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            for linea in f:
+                reg = _parsear(linea)
+                if reg:
+                    return datetime.strptime(reg["ts"], _FMT).timestamp()
+    except OSError:
+        pass
+    return None
+
+
+def _parsear(linea):
+    linea = linea.strip()
+    if not linea.startswith("{"):
+        return None  # líneas del formato anterior ("fecha | ...")
+    try:
+        reg = json.loads(linea)
+    except ValueError:
+        return None
+    return reg if isinstance(reg, dict) and "ts" in reg else None
+
+
+@contextmanager
+def _bloqueo(path):
+    with open(f"{path}.lock", "a") as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def rotar(path):
+    """Renombra el log activo a un segmento con fecha y comprime los segmentos listos."""
+    path = Path(path)
+    with _bloqueo(path):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        if st.st_size == 0:
+            return None
+        destino = path.with_name(f"{path.name}.{datetime.now():%Y%m%dT%H%M%S}")
+        n = 1
+        while destino.exists() or destino.with_name(destino.name + ".gz").exists():
+            destino = path.with_name(f"{path.name}.{datetime.now():%Y%m%dT%H%M%S}_{n}")
+            n += 1
+        path.rename(destino)
+        _compactar(path)
+    return destino
+
+
+def compactar(path: str = LOG_FILE):
+    """Comprime e indexa los segmentos rotados pendientes (y aplica retención)."""
+    path = Path(path)
+    with _bloqueo(path):
+        _compactar(path)
+
+
+def _segmentos_sin_comprimir(path):
+    pref = path.name + "."
+    for p in path.parent.glob(pref + "*"):
+        sufijo = p.name[len(pref):]
+        if sufijo[:8].isdigit() and not p.name.endswith((".gz", ".tmp")):
+            yield p
+
+
+def _compactar(path):
+    indice = _leer_indice(path)
+    ahora = time.time()
+    for seg in sorted(_segmentos_sin_comprimir(path)):
+        if ahora - seg.stat().st_mtime < GRACIA_COMPRESION_S:
+            continue
+        entrada = {"archivo": seg.name + ".gz", "desde": None, "hasta": None, "lineas": 0}
+        valores = {c: set() for c in _CAMPOS_INDICE}
+        tmp = seg.with_name(seg.name + ".gz.tmp")
+        with seg.open(encoding="utf-8") as src, gzip.open(tmp, "wt", encoding="utf-8") as dst:
+            for linea in src:
+                dst.write(linea)
+                reg = _parsear(linea)
+                if not reg:
+                    continue
+                entrada["lineas"] += 1
+                ts = reg["ts"]
+                entrada["desde"] = ts if entrada["desde"] is None or ts < entrada["desde"] else entrada["desde"]
+                entrada["hasta"] = ts if entrada["hasta"] is None or ts > entrada["hasta"] else entrada["hasta"]
+                for c in _CAMPOS_INDICE:
+                    if reg.get(c) is not None:
+                        valores[c].add(str(reg[c]))
+        for c in _CAMPOS_INDICE:
+            entrada[c] = sorted(valores[c])
+        tmp.rename(seg.with_name(seg.name + ".gz"))
+        seg.unlink()
+        indice["segmentos"] = [s for s in indice["segmentos"] if s["archivo"] != entrada["archivo"]]
+        indice["segmentos"].append(entrada)
+
+    if LOG_RETENCION_DIAS > 0:
+        limite = (datetime.now() - timedelta(days=LOG_RETENCION_DIAS)).strftime(_FMT)
+        vigentes = []
+        for s in indice["segmentos"]:
+            if s["hasta"] and s["hasta"] < limite:
+                path.with_name(s["archivo"]).unlink(missing_ok=True)
+            else:
+                vigentes.append(s)
+        indice["segmentos"] = vigentes
+
+    indice["segmentos"].sort(key=lambda s: s["desde"] or "")
+    _guardar_indice(path, indice)
+
+
+def _ruta_indice(path):
+    return Path(path).with_name(Path(path).name + ".indice.json")
+
+
+def _leer_indice(path):
+    p = _ruta_indice(path)
+    if p.exists():
+        try:
+            with p.open(encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"segmentos": []}
+
+
+def _guardar_indice(path, indice):
+    p = _ruta_indice(path)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, indent=1)
+    tmp.replace(p)
+
+
+def _coincide(reg, filtros):
+    for campo, valor in filtros.items():
+        v = reg.get(campo)
+        if v is None:
+            return False
+        v = str(v)
+        if v != valor and not (campo == "planta" and v == f"HOST_{valor}"):
+            return False
+    return True
+
+
+def consultar(log_file: str = LOG_FILE, desde: str = None, hasta: str = None, **filtros):
+    """
+    Genera los registros (dict) entre `desde` y `hasta` ('YYYY-MM-DD HH:MM:SS', inclusive)
+    que coinciden con los filtros (evento=, tabla=, planta=), en orden cronológico.
+    Los segmentos comprimidos que el índice descarta no se abren.
+    """
+    path = Path(log_file)
+    filtros = {k: str(v) for k, v in filtros.items() if v is not None}
+    archivos = []
+    for s in _leer_indice(path)["segmentos"]:
+        if desde and s["hasta"] and s["hasta"] < desde:
+            continue
+        if hasta and s["desde"] and s["desde"] > hasta:
+            continue
+        if any(c in s and not _indice_admite(s[c], c, v) for c, v in filtros.items()):
+            continue
+        archivos.append(path.with_name(s["archivo"]))
+    archivos += sorted(_segmentos_sin_comprimir(path))
+    archivos.append(path)
+
+    for a in archivos:
+        if not a.exists():
+            continue
+        abrir = gzip.open if a.name.endswith(".gz") else open
+        with abrir(a, "rt", encoding="utf-8") as f:
+            for linea in f:
+                reg = _parsear(linea)
+                if not reg:
+                    continue
+                if desde and reg["ts"] < desde:
+                    continue
+                if hasta and reg["ts"] > hasta:
+                    continue
+                if _coincide(reg, filtros):
+                    yield reg
+
+
+def _indice_admite(valores, campo, valor):
+    return valor in valores or (campo == "planta" and f"HOST_{valor}" in valores)
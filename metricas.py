@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación del ciclo: tiempos por etapa (spans) y contadores con etiquetas.
+
+- metricas.medido("nombre", "param", ...) decora una función y mide cada llamada,
+  etiquetada con los parámetros indicados (p.ej. planta, tipo, tabla).
+- metricas.incrementar("nombre", valor, planta=..., tipo=...) suma a un contador.
+- metricas.ciclo("sync") envuelve una ejecución completa: al terminar deja el
+  resumen JSON del ciclo en RESUMEN_DIR y, si METRICAS_DIR está definido, el
+  archivo .prom para el textfile collector de node_exporter.
+- metricas.servir(puerto) expone /metrics en formato Prometheus (modo daemon).
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+METRICAS_DIR = os.getenv("METRICAS_DIR", "")    # textfile collector; vacío = no escribir .prom
+RESUMEN_DIR = os.getenv("RESUMEN_DIR", ".")     # resumen_<ciclo>.json; vacío = no escribir
+PREFIJO = "monitoreo"
+
+_lock = threading.Lock()
+_spans = {}        # (nombre, etiquetas) -> [llamadas, total_s, max_s]
+_contadores = {}   # (nombre, etiquetas) -> valor
+_gauges = {}       # (nombre, etiquetas) -> valor
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items() if v is not None))
+
+
+@contextmanager
+def span(nombre, **etiquetas):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        k = _clave(nombre, etiquetas)
+        with _lock:
+            s = _spans.setdefault(k, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += dt
+            s[2] = max(s[2], dt)
+
+
+def medido(nombre, *params_etiqueta):
+    """Decorador: mide cada llamada como span `nombre`, etiquetado con esos parámetros."""
+    def deco(fn):
+        firma = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def envuelta(*a, **kw):
+            etiquetas = {}
+            if params_etiqueta:
+                args = firma.bind_partial(*a, **kw)
+                args.apply_defaults()
+                etiquetas = {p: args.arguments.get(p) for p in params_etiqueta}
+            with span(nombre, **etiquetas):
+                return fn(*a, **kw)
+        return envuelta
+    return deco
+
+
+def incrementar(nombre, valor=1, **etiquetas):
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        _contadores[k] = _contadores.get(k, 0) + valor
+
+
+def fijar(nombre, valor, **etiquetas):
+    with _lock:
+        _gauges[_clave(nombre, etiquetas)] = valor
+
+
+def _instantanea():
+    with _lock:
+        return (
+            {k: list(v) for k, v in _spans.items()},
+            dict(_contadores),
+        )
+
+
+def exportar():
+    """Estado completo (spans, contadores, gauges) para enviarlo a otro proceso."""
+    spans, cont = _instantanea()
+    with _lock:
+        return {"spans": spans, "contadores": cont, "gauges": dict(_gauges)}
+
+
+def fusionar(exportado):
+    """Suma a este proceso lo exportado por otro (p.ej. un worker de lectura_paralela)."""
+    with _lock:
+        for k, (n, total, mx) in exportado["spans"].items():
+            s = _spans.setdefault(k, [0, 0.0, 0.0])
+            s[0] += n
+            s[1] += total
+            s[2] = max(s[2], mx)
+        for k, v in exportado["contadores"].items():
+            _contadores[k] = _contadores.get(k, 0) + v
+        for k, v in exportado["gauges"].items():
+            if not k[0].startswith("ciclo_"):
+                _gauges[k] = v
+
+
+@contextmanager
+def ciclo(nombre):
+    """
+    Mide una ejecución completa. Al salir fija duración/último timestamp del ciclo
+    y escribe el resumen JSON (solo lo ocurrido en este ciclo) y el .prom.
+    """
+    spans0, cont0 = _instantanea()
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    estado = "ok"
+    try:
+        yield
+    except Exception:
+        estado = "error"
+        incrementar("ciclos_fallidos", ciclo=nombre)
+        raise
+    finally:
+        dur = time.perf_counter() - t0
+        fijar("ciclo_duracion_segundos", dur, ciclo=nombre)
+        fijar("ciclo_ultimo_timestamp", time.time(), ciclo=nombre)
+        spans1, cont1 = _instantanea()
+        resumen = _resumen_delta(nombre, inicio, dur, estado, spans0, spans1, cont0, cont1)
+        try:
+            if RESUMEN_DIR:
+                _escribir_atomico(Path(RESUMEN_DIR) / f"resumen_{nombre}.json",
+                                  json.dumps(resumen, ensure_ascii=False, indent=2))
+            if METRICAS_DIR:
+                _escribir_atomico(Path(METRICAS_DIR) / f"{PREFIJO}_{nombre}.prom", texto_prometheus())
+        except OSError as e:
+            print(f"no se pudieron escribir métricas: {e}")
+
+
+def _resumen_delta(nombre, inicio, dur, estado, spans0, spans1, cont0, cont1):
+    etapas = {}
+    detalle = []
+    for k, (n, total, mx) in spans1.items():
+        n0, total0, _ = spans0.get(k, (0, 0.0, 0.0))
+        if n - n0 <= 0:
+            continue
+        e = etapas.setdefault(k[0], {"llamadas": 0, "total_s": 0.0})
+        e["llamadas"] += n - n0
+        e["total_s"] += total - total0
+        detalle.append({"etapa": k[0], **dict(k[1]), "llamadas": n - n0, "total_s": round(total - total0, 6)})
+    contadores = []
+    for k, v in cont1.items():
+        d = v - cont0.get(k, 0)
+        if d:
+            contadores.append({"nombre": k[0], **dict(k[1]), "valor": d})
+    detalle.sort(key=lambda d: d["total_s"], reverse=True)
+    return {
+        "ciclo": nombre,
+        "inicio": inicio.strftime("%Y-%m-%d %H:%M:%S"),
+        "duracion_s": round(dur, 6),
+        "estado": estado,
+        "etapas": {k: {"llamadas": v["llamadas"], "total_s": round(v["total_s"], 6)} for k, v in etapas.items()},
+        "mas_lentas": detalle[:20],
+        "contadores": contadores,
+    }
+
+
+def _fmt_etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    partes = []
+    for k, v in etiquetas:
+        v = v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{k}="{v}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def texto_prometheus() -> str:
+    """Todas las métricas del proceso en formato de exposición de Prometheus."""
+    spans, cont = _instantanea()
+    with _lock:
+        gauges = dict(_gauges)
+    lineas = []
+
+    nombre = f"{PREFIJO}_etapa_segundos"
+    lineas += [f"# HELP {nombre} Tiempo acumulado por etapa del ciclo", f"# TYPE {nombre} summary"]
+    for (etapa, et), (n, total, _) in sorted(spans.items()):
+        e = _fmt_etiquetas((("etapa", etapa),) + et)
+        lineas.append(f"{nombre}_sum{e} {total:.6f}")
+        lineas.append(f"{nombre}_count{e} {n}")
+    nombre_max = f"{PREFIJO}_etapa_max_segundos"
+    lineas += [f"# TYPE {nombre_max} gauge"]
+    for (etapa, et), (_, _, mx) in sorted(spans.items()):
+        lineas.append(f"{nombre_max}{_fmt_etiquetas((('etapa', etapa),) + et)} {mx:.6f}")
+
+    for tipo, datos, sufijo in (("counter", cont, "_total"), ("gauge", gauges, "")):
+        vistos = set()
+        for (n, et), v in sorted(datos.items()):
+            metrica = f"{PREFIJO}_{n}{sufijo}"
+            if metrica not in vistos:
+                lineas.append(f"# TYPE {metrica} {tipo}")
+                vistos.add(metrica)
+            lineas.append(f"{metrica}{_fmt_etiquetas(et)} {v}")
+    return "\n".join(lineas) + "\n"
+
+
+def _escribir_atomico(path, texto):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(texto, encoding="utf-8")
+    tmp.replace(path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *a):
+        pass
+
+
+def servir(puerto: int, host: str = "0.0.0.0"):
+    """Levanta /metrics en un hilo de fondo. Retorna el servidor (shutdown() para detenerlo)."""
+    srv = ThreadingHTTPServer((host, int(puerto)), _Handler)
+    threading.Thread(target=srv.serve_forever, name="metricas-http", daemon=True).start()
+    return srv
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo por tabla del intervalo esperado entre registros (inter-arrival), para
+umbrales de atraso adaptativos en lectura_tablas en vez de UMBRAL_MIN global y
+la ventana remota fija de 300 s.
+
+Junto con MAX(fecha), el escaneo del centralizado trae el tiempo que abarcan las
+últimas MUESTRA_LLEGADAS filas de la tabla (en cada ciclo si hay índice en `fecha`,
+si no uno de cada LLEGADAS_CADA_N_CICLOS: ver toca_muestra); dividido por la cantidad
+de filas es una muestra del intervalo medio reciente. Con ella se actualizan, en
+O(1) por tabla, la media y la varianza móviles exponenciales (ALFA_LLEGADAS). La
+muestra no se vuelve a contar mientras la última fecha no cambie, y se recorta al
+máximo esperado para que un corte (un hueco grande entre filas) no infle el modelo.
+
+La varianza es la del promedio de MUESTRA_LLEGADAS intervalos, no la de un
+intervalo suelto (con intervalos independientes, ~MUESTRA_LLEGADAS veces menor):
+en tablas que escriben en ráfagas un hueco aislado supera con facilidad
+media + K desvíos. Por eso el umbral lleva HOLGURA_SYNC_S y, en esas tablas,
+conviene subir K_LLEGADAS o fijar umbrales_min en plantas.json.
+
+Con al menos MIN_MUESTRAS_LLEGADAS muestras:
+  esperado = media + K_LLEGADAS * max(desvío, 10% de la media)
+  umbral de atraso del centralizado = esperado + HOLGURA_SYNC_S (demora normal de
+  la sincronización), acotado a [UMBRAL_PISO_S, UMBRAL_TECHO_S]; la misma cota
+  vale para decidir si la planta está al día (su último registro es reciente).
+Sin modelo todavía, se usan el umbral de plantas.json y la ventana fija. Un
+umbrales_min explícito en plantas.json (por tipo o por planta) es piso del umbral
+de atraso: el modelo puede alargarlo pero no acortarlo; el umbral_min global no.
+
+El estado se guarda en MODELO_LLEGADAS_FILE (JSON, con flock); al guardar solo se
+escriben las tablas que actualizó este proceso, así los procesos de
+lectura_paralela no se pisan.
+"""
+import fcntl
+import json
+import math
+import os
+from pathlib import Path
+
+MODELO_LLEGADAS = os.getenv("MODELO_LLEGADAS", "1") == "1"
+MODELO_LLEGADAS_FILE = os.getenv("MODELO_LLEGADAS_FILE", "modelo_llegadas.json")
+MUESTRA_LLEGADAS = int(os.getenv("MUESTRA_LLEGADAS", "20"))         # filas recientes por muestra
+ALFA_LLEGADAS = float(os.getenv("ALFA_LLEGADAS", "0.2"))
+MIN_MUESTRAS_LLEGADAS = int(os.getenv("MIN_MUESTRAS_LLEGADAS", "5"))
+K_LLEGADAS = float(os.getenv("K_LLEGADAS", "4"))
+HOLGURA_SYNC_S = float(os.getenv("HOLGURA_SYNC_S", "120"))
+UMBRAL_PISO_S = float(os.getenv("UMBRAL_PISO_S", "60"))
+UMBRAL_TECHO_S = float(os.getenv("UMBRAL_TECHO_S", "21600"))
+# tablas sin índice en `fecha`: la muestra cuesta un recorrido completo, se toma 1 ciclo de cada N
+LLEGADAS_CADA_N_CICLOS = int(os.getenv("LLEGADAS_CADA_N_CICLOS", "10"))
+
+
+class ModeloLlegadas:
+    """
+    {tabla: {"media", "var", "n", "ultima"[, "salteados"]}} con media/varianza en segundos;
+    var es la varianza del intervalo medio de cada muestra (ver el docstring del módulo).
+    """
+
+    def __init__(self, path: str = MODELO_LLEGADAS_FILE):
+        self.path = Path(path)
+        self.datos = self._leer()
+        self._cambiadas = set()
+
+    def _leer(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def observar(self, tabla, ultima_fecha, span_s, filas: int = MUESTRA_LLEGADAS):
+        """Suma la muestra span_s / filas si la tabla avanzó desde la última observación."""
+        if span_s is None or filas <= 0:
+            return
+        e = self.datos.get(tabla)
+        if e is not None and e.get("ultima") == ultima_fecha:
+            return
+        x = max(0.0, float(span_s) / filas)
+        if e is None or not e["n"]:
+            self.datos[tabla] = {"media": x, "var": 0.0, "n": 1, "ultima": ultima_fecha}
+        else:
+            if e["n"] >= MIN_MUESTRAS_LLEGADAS:
+                x = min(x, self._esperado(e))
+            d = x - e["media"]
+            e["media"] += ALFA_LLEGADAS * d
+            e["var"] = (1 - ALFA_LLEGADAS) * (e["var"] + ALFA_LLEGADAS * d * d)
+            e["n"] += 1
+            e["ultima"] = ultima_fecha
+        self._cambiadas.add(tabla)
+
+    def toca_muestra(self, tabla, con_indice: bool, cada: int = LLEGADAS_CADA_N_CICLOS):
+        """
+        True si en este ciclo hay que pedir la muestra de la tabla: siempre con índice en
+        `fecha`; sin él, en la primera observación y luego un ciclo de cada `cada` (0: nunca).
+        La cuenta de ciclos salteados se guarda con el modelo, así vale aunque cada ciclo
+        sea un proceso aparte (cron).
+        """
+        if con_indice:
+            return True
+        e = self.datos.get(tabla)
+        if e is None:
+            return cada > 0
+        if cada <= 0:
+            return False
+        e["salteados"] = e.get("salteados", 0) + 1
+        self._cambiadas.add(tabla)
+        if e["salteados"] < cada:
+            return False
+        e["salteados"] = 0
+        return True
+
+    @staticmethod
+    def _esperado(e):
+        return e["media"] + K_LLEGADAS * max(math.sqrt(e["var"]), 0.1 * e["media"])
+
+    def esperado_s(self, tabla):
+        """Intervalo máximo esperado entre registros (s), o None si aún no hay modelo."""
+        e = self.datos.get(tabla)
+        if e is None or e["n"] < MIN_MUESTRAS_LLEGADAS:
+            return None
+        return self._esperado(e)
+
+    def umbral_s(self, tabla, defecto_s, piso_s=None):
+        """
+        Segundos sin registros a partir de los cuales la tabla se considera atrasada.
+        piso_s (umbral explícito de plantas.json) gana sobre el modelo si es mayor.
+        """
+        esperado = self.esperado_s(tabla)
+        if esperado is None:
+            return defecto_s
+        umbral = min(max(esperado + HOLGURA_SYNC_S, UMBRAL_PISO_S), UMBRAL_TECHO_S)
+        return max(umbral, piso_s) if piso_s else umbral
+
+    def guardar(self):
+        if not self._cambiadas:
+            return
+        with open(f"{self.path}.lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                data = self._leer()
+                for t in self._cambiadas:
+                    data[t] = self.datos[t]
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                with tmp.open("w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                tmp.replace(self.path)
+            except OSError as e:
+                print(f"no se pudo guardar {self.path}: {e}")
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+        self._cambiadas.clear()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monitor residente: reemplaza las entradas de cron de lectura_tablas.py y
+supervisor_conexiones_remotas.py por un solo proceso que ejecuta ambas tareas
+a intervalos configurables, reutilizando conexiones keep-alive (pool_conexiones).
+"""
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import metricas
+import pool_conexiones
+import registro_plantas
+import lectura_tablas
+import supervisor_conexiones_remotas
+
+INTERVALO_SYNC_S = float(os.getenv("INTERVALO_SYNC_S", "300"))  # lectura_tablas.main
+INTERVALO_CONEXIONES_S = float(os.getenv("INTERVALO_CONEXIONES_S", "120"))  # verificar_conexiones_plantas
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "0"))  # /metrics; 0 = deshabilitado
+
+_detener = threading.Event()
+
+
+def _ejecutar(nombre, fn):
+    t0 = time.monotonic()
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} | inicio {nombre}")
+    try:
+        fn()
+        estado = "ok"
+    except Exception as e:
+        estado = f"error {type(e).__name__}: {e}"
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} | fin {nombre} ({time.monotonic() - t0:.2f}s) {estado}")
+
+
+def _conexiones():
+    for r in supervisor_conexiones_remotas.verificar_conexiones_plantas():
+        if not r["ok"]:
+            print(f"❌ Error: {r['planta']} ({r['host']}) -> {r.get('error')}")
+
+
+def ejecutar(intervalo_sync: float = INTERVALO_SYNC_S,
+             intervalo_conexiones: float = INTERVALO_CONEXIONES_S):
+    """
+    Bucle del planificador. Las tareas corren en el mismo hilo, una a la vez;
+    si una tarea se atrasa, los ticks perdidos se saltan (no se acumulan).
+    """
+    inicio = time.monotonic()
+    tareas = [
+        {"nombre": "check-sync", "fn": lectura_tablas.main, "intervalo": intervalo_sync, "proxima": inicio},
+        {"nombre": "check-connections", "fn": _conexiones, "intervalo": intervalo_conexiones, "proxima": inicio},
+    ]
+    pool_conexiones.activar()
+    try:
+        while not _detener.is_set():
+            ahora = time.monotonic()
+            for t in tareas:
+                if ahora >= t["proxima"] and not _detener.is_set():
+                    _ejecutar(t["nombre"], t["fn"])
+                    t["proxima"] += t["intervalo"]
+                    if t["proxima"] < time.monotonic():
+                        t["proxima"] = time.monotonic() + t["intervalo"]
+            pool_conexiones.purgar()
+            espera = min(t["proxima"] for t in tareas) - time.monotonic()
+            _detener.wait(max(0.0, espera))
+    finally:
+        pool_conexiones.desactivar()
+
+
+def detener(*_):
+    _detener.set()
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, detener)
+    signal.signal(signal.SIGINT, detener)
+    registro_plantas.obtener()  # config inválida => falla aquí, no en el primer ciclo
+    if METRICAS_PUERTO:
+        metricas.servir(METRICAS_PUERTO)
+        print(f"Métricas en http://0.0.0.0:{METRICAS_PUERTO}/metrics")
+    print(f"Monitor iniciado: sync cada {INTERVALO_SYNC_S:.0f}s, conexiones cada {INTERVALO_CONEXIONES_S:.0f}s")
+    ejecutar()
+    print("Monitor detenido")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Punto de entrada único del monitoreo. Los módulos (pymysql, dotenv, plantas.json,
+conexiones) se importan solo al ejecutar el subcomando que los necesita, así un
+`--help` o un chequeo puntual desde cron no paga la carga de todo el proyecto.
+
+    python monitoreo.py check-sync [--plantas 61,71] [--tablas plc_61] [--json]
+    python monitoreo.py check-connections [--plantas 61] [--json]
+    python monitoreo.py bench --plantas 8 16 --filas 5000
+    python monitoreo.py sla --dias 30          # y completitud, backfill, log, paralelo, diagnostico, daemon
+
+check-sync y check-connections terminan con código 1 si hubo errores o plantas sin
+conexión (para alertas de cron); los delegados terminan con el código del módulo, o 1
+si lanza una excepción. Con --json la salida de los módulos va a stderr y
+stdout queda solo con el resultado en JSON.
+"""
+import argparse
+import contextlib
+import json
+import re
+import sys
+import time
+from datetime import datetime
+
+# subcomando -> (módulo, descripción); reciben el resto de los argumentos tal cual.
+# Los módulos sin main(argv) se ejecutan como script (python -m).
+DELEGADOS = {
+    "bench": ("benchmark", "benchmark del ciclo sobre fake_mysql"),
+    "sla": ("analitica_sla", "analítica de SLA (uptime, MTTR, resyncs, desfase)"),
+    "completitud": ("completitud", "reporte de vacíos entre centralizado y plantas"),
+    "backfill": ("backfill", "copia un rango de fechas desde la planta"),
+    "log": ("consultar_log", "consulta el log de sincronización"),
+    "paralelo": ("lectura_paralela", "check-sync repartido en varios procesos"),
+    "diagnostico": ("diagnostico_indices", "diagnóstico de índices de las tablas"),
+    "daemon": ("monitor_daemon", "monitor residente (check-sync y check-connections a intervalos)"),
+}
+_SIN_MAIN = {"diagnostico_indices", "monitor_daemon"}
+
+
+def _lista(v):
+    return [x.strip() for x in v.split(",") if x.strip()]
+
+
+def _plantas_de_tablas(tablas):
+    import registro_plantas
+
+    registro = registro_plantas.obtener()
+    res = set()
+    for t in tablas:
+        e = registro.entrada_central(t)
+        m = re.search(r"(\d+)$", t)
+        if e or m:
+            res.add(e["planta"] if e else m.group(1))
+    return res
+
+
+def _contadores(exportado):
+    res = {}
+    for (nombre, _), v in exportado["contadores"].items():
+        res[nombre] = res.get(nombre, 0) + v
+    return res
+
+
+def check_sync(args):
+    import lectura_tablas
+    import metricas
+
+    resultados = lectura_tablas.main(tablas=args.tablas, plantas=args.plantas) or []
+    contadores = _contadores(metricas.exportar())
+    return {"ok": not contadores.get("errores"), "resultados": resultados, "contadores": contadores}
+
+
+def check_connections(args):
+    import supervisor_conexiones_remotas as sup
+
+    plantas = set(args.plantas or [])
+    if args.tablas:
+        plantas |= _plantas_de_tablas(args.tablas)
+    resultados = sup.verificar_conexiones_plantas(plantas=plantas if (args.plantas or args.tablas) else None)
+    if not args.json:
+        sup.imprimir_resultados(resultados)
+    return {"ok": all(r["ok"] for r in resultados), "resultados": resultados}
+
+
+def _delegar(modulo, argv):
+    import importlib
+    import runpy
+
+    # el código de salida es el del módulo (sys.exit / argparse) y 1 si lanza, para cron y systemd
+    try:
+        if modulo in _SIN_MAIN:
+            sys.argv = [f"{modulo}.py"] + argv
+            runpy.run_module(modulo, run_name="__main__", alter_sys=True)
+            return 0
+        codigo = importlib.import_module(modulo).main(argv)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+        return 1
+    # los main() que retornan datos (reportes, resultados) terminaron bien
+    return codigo if isinstance(codigo, int) and not isinstance(codigo, bool) else 0
+
+
+def _parser():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="comando", required=True)
+    for nombre, fn, ayuda in (("check-sync", check_sync, "un ciclo de lectura_tablas"),
+                              ("check-connections", check_connections, "sondeo de conexión a las plantas")):
+        p = sub.add_parser(nombre, help=ayuda)
+        p.add_argument("--plantas", "--plants", type=_lista, default=None, help="plantas separadas por coma (61,71)")
+        p.add_argument("--tablas", "--tables", type=_lista, default=None, help="tablas del centralizado separadas por coma")
+        p.add_argument("--json", action="store_true", help="resultado en JSON por stdout")
+        p.set_defaults(fn=fn)
+    for nombre, (_, ayuda) in DELEGADOS.items():
+        sub.add_parser(nombre, help=ayuda)  # solo para --help: main() los delega antes de parsear
+    return ap
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in DELEGADOS:
+        return _delegar(DELEGADOS[argv[0]][0], argv[1:])
+    args = _parser().parse_args(argv)
+
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    salida = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    try:
+        with salida:
+            data = args.fn(args)
+    except Exception as e:
+        data = {"ok": False, "error": f"{type(e).__name__}: {e}", "resultados": []}
+        if not args.json:
+            raise
+    data = {"comando": args.comando, "inicio": inicio.strftime("%Y-%m-%d %H:%M:%S"),
+            "duracion_s": round(time.perf_counter() - t0, 3),
+            "filtros": {"plantas": args.plantas, "tablas": args.tablas}, **data}
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
+    else:
+        estado = "✅" if data["ok"] else "❌"
+        print(f"{estado} {args.comando}: {len(data['resultados'])} resultados en {data['duracion_s']:.2f}s")
+    return 0 if data["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
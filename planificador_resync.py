@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador de resincronización: en vez de borrar siempre los últimos 30
+registros, calcula el rango exacto del centralizado que hay que borrar para que
+el sincronizador vuelva a bajar los datos desde la planta, y lo borra por
+bloques acotados para no mantener locks largos.
+
+Criterios, en orden:
+  1. "posterior_a_remota": filas con fecha > hora_remota (el centralizado tiene
+     datos que la planta no tiene).
+  2. "busqueda_adelantada": filas con fecha_busqueda > hora_remota; el último
+     punto en que ambos lados coinciden es la última fila cuya fecha_busqueda
+     no pasa la hora remota.
+  3. "ultima_fecha": las filas con la última fecha del centralizado.
+
+Los conteos y borrados se hacen sobre la cola de la tabla (ORDER BY fecha DESC),
+que el índice de `fecha` resuelve sin recorrer la tabla completa.
+"""
+import os
+import re
+
+import cache_descubrimiento
+
+RESYNC_CHUNK = int(os.getenv("RESYNC_CHUNK", "500"))
+RESYNC_MAX_FILAS = int(os.getenv("RESYNC_MAX_FILAS", "20000"))  # tope de filas a revisar/borrar por tabla
+
+_VALID_TBL = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+
+def columnas(conn, tabla):
+    """Columnas de `tabla` en el esquema de la conexión (cacheadas en cache_descubrimiento)."""
+    def consultar():
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT COLUMN_NAME AS col
+                FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = %s
+                """,
+                (tabla,),
+            )
+            return {r["col"] for r in cur.fetchall()}
+    return cache_descubrimiento.columnas(conn, tabla, consultar)
+
+
+def invalidar_columnas(tabla=None):
+    if tabla is None:
+        cache_descubrimiento.invalidar()
+    else:
+        cache_descubrimiento.invalidar(tabla=tabla)
+
+
+def _cola(tabla, cols, max_filas):
+    sel = ", ".join(f"`{c}`" for c in ("fecha", "fecha_busqueda") if c in cols)
+    return f"(SELECT {sel} FROM `{tabla}` ORDER BY `fecha` DESC LIMIT {int(max_filas)}) AS cola"
+
+
+def planificar(conn, tabla, hora_remota, max_filas: int = RESYNC_MAX_FILAS):
+    """
+    Retorna el plan de borrado para `tabla`:
+    {tabla, criterio, condicion, params, filas, desde, truncado, filas_examinadas_estimadas, bloques}
+    Si la tabla no tiene columna `fecha` retorna criterio "sin_fecha" (usar borrado fijo).
+    """
+    if not _VALID_TBL.match(tabla):
+        raise ValueError("Nombre de tabla inválido")
+    cols = columnas(conn, tabla)
+    plan = {"tabla": tabla, "criterio": "sin_fecha", "filas": 0}
+    if "fecha" not in cols:
+        return plan
+
+    candidatos = [("posterior_a_remota", "`fecha` > %s", (hora_remota,))]
+    if "fecha_busqueda" in cols:
+        candidatos.append(("busqueda_adelantada", "`fecha_busqueda` > %s", (hora_remota,)))
+
+    with conn.cursor() as cur:
+        elegido = None
+        for criterio, cond, params in candidatos:
+            cur.execute(
+                f"SELECT COUNT(*) AS filas, MIN(fecha) AS desde FROM {_cola(tabla, cols, max_filas)} WHERE {cond}",
+                params,
+            )
+            r = cur.fetchone() or {}
+            if r.get("filas"):
+                elegido = (criterio, cond, params, int(r["filas"]), r["desde"])
+                break
+
+        if elegido is None:
+            cur.execute(f"SELECT MAX(fecha) AS ultima FROM `{tabla}`")
+            ultima = (cur.fetchone() or {}).get("ultima")
+            if ultima is None:
+                return plan
+            cur.execute(f"SELECT COUNT(*) AS filas FROM `{tabla}` WHERE `fecha` >= %s", (ultima,))
+            filas = int((cur.fetchone() or {}).get("filas") or 0)
+            elegido = ("ultima_fecha", "`fecha` >= %s", (ultima,), filas, ultima)
+
+        criterio, cond, params, filas, desde = elegido
+        # acotar por fecha para que el último DELETE no recorra la tabla buscando más filas
+        condicion = f"`fecha` >= %s AND {cond}"
+        params = (desde, *params)
+
+        try:
+            cur.execute(f"EXPLAIN DELETE FROM `{tabla}` WHERE {condicion}", params)
+            examinadas = sum(int(r.get("rows") or 0) for r in cur.fetchall())
+        except Exception:
+            examinadas = None
+
+    plan.update({
+        "criterio": criterio,
+        "condicion": condicion,
+        "params": params,
+        "filas": filas,
+        "desde": desde,
+        "truncado": filas >= max_filas,
+        "filas_examinadas_estimadas": examinadas,
+        "bloques": -(-filas // max(1, RESYNC_CHUNK)),
+    })
+    return plan
+
+
+def ejecutar(conn, plan, chunk: int = RESYNC_CHUNK, dry_run: bool = False) -> int:
+    """
+    Borra las filas del plan en bloques de `chunk` (cada DELETE se confirma por separado).
+    Con dry_run no borra nada y retorna 0. Retorna las filas borradas.
+    """
+    if dry_run or plan.get("filas", 0) <= 0 or "condicion" not in plan:
+        return 0
+    tabla = plan["tabla"]
+    if not _VALID_TBL.match(tabla):
+        raise ValueError("Nombre de tabla inválido")
+
+    sql = f"DELETE FROM `{tabla}` WHERE {plan['condicion']} ORDER BY `fecha` DESC LIMIT %s"
+    total = 0
+    with conn.cursor() as cur:
+        while total < plan["filas"]:
+            n = min(int(chunk), plan["filas"] - total)
+            cur.execute(sql, (*plan["params"], n))
+            conn.commit()
+            total += cur.rowcount
+            if cur.rowcount < n:
+                break
+    return total
+
+
+def resumen(plan) -> str:
+    if plan["criterio"] == "sin_fecha":
+        return f"{plan['tabla']}: sin columna fecha, se usa borrado fijo"
+    return (
+        f"{plan['tabla']}: criterio={plan['criterio']} filas={plan['filas']} desde={plan.get('desde')} "
+        f"bloques={plan.get('bloques')} examinadas~{plan.get('filas_examinadas_estimadas')}"
+        + (" (truncado al tope RESYNC_MAX_FILAS)" if plan.get("truncado") else "")
+    )
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de conexiones keep-alive para el modo daemon (monitor_daemon.py).
+
+Mientras el pool está inactivo (scripts one-shot desde cron) conectar() solo
+llama a la fábrica y devuelve una conexión nueva, igual que antes. Activo,
+mantiene hasta MAX_POR_CLAVE conexiones ociosas por clave
+("central:<schema>", "planta_61:lectura", ...): al pedir una se valida con ping y al
+llamar close() vuelve al pool en vez de cerrarse. Si el ping falla la conexión se
+descarta sin reconectar (la fábrica crea la nueva: un solo intento y un solo timeout
+si el servidor está caído).
+
+La clave identifica también los parámetros de la fábrica: quienes conectan al mismo
+servidor con otros timeouts (lectura_tablas y el supervisor con las plantas) usan
+claves distintas, si no el primero que crea la conexión fija los timeouts de ambos.
+"""
+import os
+import threading
+import time
+
+MAX_POR_CLAVE = int(os.getenv("POOL_MAX_POR_CLAVE", "2"))
+MAX_OCIOSO_S = float(os.getenv("POOL_MAX_OCIOSO_S", "300"))  # segundos
+
+_lock = threading.Lock()
+_ociosas = {}  # clave -> [(conn, t_devuelta)]
+_activo = False
+
+
+class _ConexionPrestada:
+    """Envuelve una conexión del pool; close() la devuelve en vez de cerrarla."""
+
+    def __init__(self, clave, conn):
+        self._clave = clave
+        self._conn = conn
+        self._devuelta = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._devuelta:
+            return
+        self._devuelta = True
+        _devolver(self._clave, self._conn)
+
+
+def activar(max_por_clave: int = None, max_ocioso_s: float = None):
+    global _activo, MAX_POR_CLAVE, MAX_OCIOSO_S
+    with _lock:
+        if max_por_clave is not None:
+            MAX_POR_CLAVE = int(max_por_clave)
+        if max_ocioso_s is not None:
+            MAX_OCIOSO_S = float(max_ocioso_s)
+        _activo = True
+
+
+def desactivar():
+    """Cierra todas las conexiones ociosas y vuelve al modo sin pool."""
+    global _activo
+    with _lock:
+        _activo = False
+        pendientes = [c for lista in _ociosas.values() for c, _ in lista]
+        _ociosas.clear()
+    for c in pendientes:
+        _cerrar(c)
+
+
+def activo() -> bool:
+    return _activo
+
+
+def conectar(clave: str, fabrica):
+    """
+    Retorna una conexión para `clave`. Sin pool activo es `fabrica()` tal cual.
+    Con pool, reutiliza una ociosa validada con ping o crea una nueva.
+    """
+    if not _activo:
+        return fabrica()
+
+    while True:
+        with _lock:
+            lista = _ociosas.get(clave) or []
+            item = lista.pop() if lista else None
+        if item is None:
+            break
+        conn, t_devuelta = item
+        if time.monotonic() - t_devuelta > MAX_OCIOSO_S:
+            _cerrar(conn)
+            continue
+        try:
+            conn.ping(reconnect=False)  # health-check; si el servidor la cortó, la crea la fábrica
+            return _ConexionPrestada(clave, conn)
+        except Exception:
+            _cerrar(conn)
+            # las demás ociosas van al mismo servidor: no se espera otro ping fallido
+            with _lock:
+                resto = _ociosas.pop(clave, [])
+            for c, _ in resto:
+                _cerrar(c)
+            break
+
+    return _ConexionPrestada(clave, fabrica())
+
+
+def purgar():
+    """Cierra las conexiones ociosas que superaron MAX_OCIOSO_S."""
+    ahora = time.monotonic()
+    viejas = []
+    with _lock:
+        for clave, lista in _ociosas.items():
+            vivas = []
+            for conn, t in lista:
+                (viejas if ahora - t > MAX_OCIOSO_S else vivas).append((conn, t))
+            _ociosas[clave] = vivas
+    for conn, _ in viejas:
+        _cerrar(conn)
+    return len(viejas)
+
+
+def estado():
+    """{clave: conexiones_ociosas}"""
+    with _lock:
+        return {k: len(v) for k, v in _ociosas.items()}
+
+
+def _devolver(clave, conn):
+    if getattr(conn, "open", False):
+        with _lock:
+            if _activo:
+                lista = _ociosas.setdefault(clave, [])
+                if len(lista) < MAX_POR_CLAVE:
+                    lista.append((conn, time.monotonic()))
+                    return
+    _cerrar(conn)
+
+
+def _cerrar(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
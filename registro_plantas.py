@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de plantas y tablas, compartido por lectura_tablas y el supervisor.
+
+Se carga una sola vez desde PLANTAS_CONFIG (plantas.json) más las credenciales
+HOST_XX / USER_XX / PASS_XX / DB_XX / PORT_XX del .env, y se valida completo al
+partir: si falta algo se lanza RuntimeError con todos los problemas juntos, en
+vez de fallar a mitad de un ciclo.
+
+Formato de plantas.json:
+    {
+      "umbral_min": 3,                       # umbral global (minutos)
+      "umbrales_min": {"pesometro": 10},     # opcional, por tipo
+      "plantas": {
+        "61": {
+          "numero_planta": 6,
+          "activa": true,                    # opcional; false = no se valida ni se usa
+          "tablas": {"plc": "plc1", "horometro": "horometro_plc1"},
+          "umbrales_min": {"plc": 5}         # opcional, por tipo en esta planta
+        }
+      }
+    }
+Las plantas con HOST_XX en el .env que no están en el archivo se registran
+solo con su conexión (las sondea el supervisor, pero no tienen tablas).
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+PLANTAS_CONFIG = os.getenv("PLANTAS_CONFIG", str(Path(__file__).with_name("plantas.json")))
+TIPOS = ("plc", "horometro", "pesometro")
+
+_VALID_TBL = re.compile(r"^[A-Za-z0-9_]+$")
+_PLANT_RE = re.compile(r"^HOST_(\d+)$")
+_TABLA_CENTRAL_RE = re.compile(r"^(horometro|pesometro|plc)[^0-9]*?(\d+)$", re.I)
+
+_registro = None
+_lock = threading.Lock()
+
+
+class Registro:
+    """
+    Vista de solo lectura del registro:
+      - conexiones: {planta: {"host", "port", "user", "password", "database"}}
+      - tablas: {(tipo, planta): {"tipo", "planta", "numero_planta", "tabla_remota", "umbral_min",
+        "umbral_explicito"}}; umbral_explicito indica que umbral_min viene de umbrales_min
+        (por tipo o por planta) y no del umbral global
+    """
+
+    def __init__(self, conexiones, tablas, umbral_min):
+        self.conexiones = conexiones
+        self.tablas = tablas
+        self.umbral_min_global = umbral_min
+
+    def plantas(self):
+        """Sufijos de planta ordenados: ['21', '31', ...]."""
+        return sorted(self.conexiones, key=int)
+
+    def conexion(self, planta):
+        try:
+            return self.conexiones[str(planta)]
+        except KeyError:
+            raise RuntimeError(f"Planta {planta} no está en el registro (falta HOST_{planta} o entrada en plantas.json)")
+
+    def entrada(self, tipo, planta):
+        """Entrada de la tabla (tipo, planta) o None si no tiene tabla remota configurada."""
+        return self.tablas.get((str(tipo).lower(), str(planta)))
+
+    def entrada_central(self, tabla_central):
+        m = _TABLA_CENTRAL_RE.match(tabla_central or "")
+        if not m:
+            return None
+        return self.entrada(m.group(1), m.group(2))
+
+    def tabla_remota(self, planta, tipo):
+        e = self.entrada(tipo, planta)
+        if e is None:
+            raise RuntimeError(f"Sin tabla remota configurada para tipo={tipo} planta={planta}")
+        return e["tabla_remota"]
+
+    def umbral_min(self, tabla_central):
+        e = self.entrada_central(tabla_central)
+        return e["umbral_min"] if e else self.umbral_min_global
+
+    def umbral_explicito_min(self, tabla_central):
+        """umbral_min de umbrales_min en plantas.json, o None si la tabla usa el global."""
+        e = self.entrada_central(tabla_central)
+        return e["umbral_min"] if e and e["umbral_explicito"] else None
+
+
+def _umbral_valido(v) -> bool:
+    """Minutos enteros positivos (acepta "5")."""
+    try:
+        return int(v) > 0 and not isinstance(v, bool) and float(v) == int(v)
+    except (TypeError, ValueError):
+        return False
+
+
+def cargar(path: str = PLANTAS_CONFIG, env=None) -> Registro:
+    """Lee y valida el archivo y el entorno. Lanza RuntimeError con la lista de problemas."""
+    env = os.environ if env is None else env
+    problemas = []
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            cfg = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"No se pudo leer {path}: {e}")
+
+    umbral_global = cfg.get("umbral_min", env.get("UMBRAL_MIN", "3"))
+    try:
+        umbral_global = int(umbral_global)
+    except (TypeError, ValueError):
+        problemas.append(f"umbral_min inválido: {umbral_global!r}")
+        umbral_global = 3
+    umbrales_tipo = dict(cfg.get("umbrales_min") or {})
+    for tipo in list(umbrales_tipo):
+        if tipo not in TIPOS:
+            problemas.append(f"umbrales_min: tipo desconocido {tipo!r}")
+        elif not _umbral_valido(umbrales_tipo[tipo]):
+            problemas.append(f"umbrales_min.{tipo} inválido: {umbrales_tipo[tipo]!r}")
+            del umbrales_tipo[tipo]
+
+    plantas_cfg = cfg.get("plantas")
+    if not isinstance(plantas_cfg, dict) or not plantas_cfg:
+        problemas.append("falta la sección 'plantas'")
+        plantas_cfg = {}
+
+    conexiones = {}
+    tablas = {}
+    for planta, p in plantas_cfg.items():
+        planta = str(planta)
+        if not planta.isdigit():
+            problemas.append(f"planta {planta!r}: la clave debe ser numérica (sufijo de HOST_XX)")
+            continue
+        if not p.get("activa", True):
+            continue
+        umbrales_planta = dict(p.get("umbrales_min") or {})
+        for tipo in list(umbrales_planta):
+            if not _umbral_valido(umbrales_planta[tipo]):
+                problemas.append(f"planta {planta}: umbrales_min.{tipo} inválido: {umbrales_planta[tipo]!r}")
+                del umbrales_planta[tipo]
+        conn, faltan = _conexion_desde_env(planta, env)
+        if faltan:
+            problemas.append(f"planta {planta}: faltan variables {', '.join(faltan)} en .env")
+        else:
+            conexiones[planta] = conn
+        for tipo, tabla_remota in (p.get("tablas") or {}).items():
+            if tipo not in TIPOS:
+                problemas.append(f"planta {planta}: tipo desconocido {tipo!r}")
+                continue
+            if not _VALID_TBL.match(str(tabla_remota)):
+                problemas.append(f"planta {planta}: nombre de tabla inválido {tabla_remota!r}")
+                continue
+            umbral = umbrales_planta.get(tipo, umbrales_tipo.get(tipo, umbral_global))
+            tablas[(tipo, planta)] = {
+                "tipo": tipo,
+                "planta": planta,
+                "numero_planta": p.get("numero_planta"),
+                "tabla_remota": tabla_remota,
+                "umbral_min": int(umbral),
+                "umbral_explicito": tipo in umbrales_planta or tipo in umbrales_tipo,
+            }
+
+    # plantas solo declaradas en el .env (HOST_XX), sin tablas
+    for k in env.keys():
+        m = _PLANT_RE.match(k)
+        if m and m.group(1) not in conexiones and m.group(1) not in plantas_cfg:
+            conn, faltan = _conexion_desde_env(m.group(1), env)
+            if faltan:
+                problemas.append(f"planta {m.group(1)}: faltan variables {', '.join(faltan)} en .env")
+            else:
+                conexiones[m.group(1)] = conn
+
+    if problemas:
+        raise RuntimeError("Configuración de plantas inválida:\n  - " + "\n  - ".join(problemas))
+    return Registro(conexiones, tablas, umbral_global)
+
+
+def _conexion_desde_env(planta, env):
+    vals = {k: env.get(f"{k}_{planta}") for k in ("HOST", "USER", "PASS", "DB")}
+    faltan = [f"{k}_{planta}" for k, v in vals.items() if v is None or str(v).strip() == ""]
+    try:
+        port = int(env.get(f"PORT_{planta}", "3306"))
+    except ValueError:
+        faltan.append(f"PORT_{planta} (no numérico)")
+        port = None
+    return {
+        "host": vals["HOST"],
+        "port": port,
+        "user": vals["USER"],
+        "password": vals["PASS"],
+        "database": vals["DB"],
+    }, faltan
+
+
+def obtener() -> Registro:
+    """Registro cargado una vez por proceso."""
+    global _registro
+    if _registro is None:
+        with _lock:
+            if _registro is None:
+                _registro = cargar()
+    return _registro
@@ -1,9 +1,16 @@
-import os, re
+import os, json, math, socket, time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import pymysql
 from pymysql.cursors import DictCursor
 from dotenv import load_dotenv
+import circuito_plantas
+import eventos_sink
+import log_async
+import metricas
+import pool_conexiones
+import registro_plantas
 
 load_dotenv()
 
@@ -16,58 +23,150 @@ CENTRAL_PASS = os.getenv("DB_PASS", "password")
 CENTRAL_DB   = os.getenv("DB_NAME_SOPORTE", "datos_base_plantas")  # no importa si la tabla está calificada con esquema
 
 def get_central_conn():
-    return pymysql.connect(
+    return pool_conexiones.conectar(f"central:{CENTRAL_DB}", lambda: pymysql.connect(
         host=CENTRAL_HOST, port=CENTRAL_PORT,
         user=CENTRAL_USER, password=CENTRAL_PASS,
         database=CENTRAL_DB, cursorclass=DictCursor, autocommit=True,
-    )
+    ))
 
-# --- Utilidades ---
-_PLANT_RE = re.compile(r"^HOST_(\d+)$")   # detecta HOST_XX
+# Tabla (id, fecha, planta, problema) de los fallos de conexión y cambios del circuito;
+# la lee analitica_sla. Por defecto la del esquema de la conexión central.
+TABLA_PROBLEMAS = os.getenv("TABLA_PROBLEMAS", f"{CENTRAL_DB}.estado_bd_remoto")
+
+# --- Barrido paralelo y latencias ---
+MAX_WORKERS_CONEXIONES = int(os.getenv("MAX_WORKERS_CONEXIONES", "16"))
+LATENCIAS_FILE = os.getenv("LATENCIAS_FILE", "latencias_plantas.json")
+VENTANA_LATENCIAS = int(os.getenv("VENTANA_LATENCIAS", "200"))  # muestras por planta y fase
+FASES = ("tcp_s", "auth_s", "select_s", "total_s")
+BUFFER_EVENTOS = os.getenv("BUFFER_EVENTOS", "1") == "1"
 
+# --- Utilidades ---
 def _plant_suffixes_from_env():
-    """Devuelve lista de sufijos detectados: ['21','31','61', ...]."""
-    suf = []
-    for k in os.environ.keys():
-        m = _PLANT_RE.match(k)
-        if m:
-            suf.append(m.group(1))
-    return sorted(suf, key=int)
-
-def _try_connect_plant(suffix: str):
-    """Intenta conectar a la BD de una planta usando *_<suffix> del .env."""
-    host = os.getenv(f"HOST_{suffix}")
-    user = os.getenv(f"USER_{suffix}")
-    password = os.getenv(f"PASS_{suffix}")
-    dbname = os.getenv(f"DB_{suffix}")
-    port = int(os.getenv(f"PORT_{suffix}", "3306"))
-
-    if not all([host, user, password, dbname]):
-        raise RuntimeError(f"Variables incompletas para planta {suffix}")
+    """Devuelve lista de sufijos del registro (plantas.json + HOST_XX del .env): ['21','31','61', ...]."""
+    return registro_plantas.obtener().plantas()
 
+def _conectar_por_fases(host, port, user, password, dbname, tiempos):
+    """Conecta midiendo por separado el TCP y el handshake+auth de MySQL."""
+    t0 = time.monotonic()
+    sock = socket.create_connection((host, port), 6)
+    tiempos["tcp_s"] = time.monotonic() - t0
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
     conn = pymysql.connect(
         host=host, port=port, user=user, password=password, database=dbname,
-        cursorclass=DictCursor, autocommit=True, connect_timeout=6, read_timeout=6, write_timeout=6
+        cursorclass=DictCursor, autocommit=True, connect_timeout=6, read_timeout=6, write_timeout=6,
+        defer_connect=True,
     )
-    # simple ping para validar
-    with conn.cursor() as cur:
-        cur.execute("SELECT 1")
-        cur.fetchone()
-    conn.close()
-
-def _append_log(linea: str, log_file: str = "log_sincronizacion.log"):
-    p = Path(log_file)
+    t1 = time.monotonic()
+    try:
+        conn.connect(sock)
+    except Exception:
+        sock.close()
+        raise
+    tiempos["auth_s"] = time.monotonic() - t1
+    return conn
+
+@metricas.medido("sondeo_planta", "suffix")
+def _try_connect_plant(suffix: str, tiempos=None):
+    """
+    Intenta conectar a la BD de una planta con las credenciales del registro.
+    Retorna los tiempos {tcp_s, auth_s, select_s, total_s} (None si no se midió);
+    si se pasa `tiempos`, se llena ese dict (sirve para ver hasta dónde llegó si falla).
+    Con el pool activo y una conexión reutilizada, auth_s es el ping de validación.
+    """
+    c = registro_plantas.obtener().conexion(suffix)
+    host, port, user, password, dbname = c["host"], c["port"], c["user"], c["password"], c["database"]
+
+    if tiempos is None:
+        tiempos = {}
+    tiempos.update({f: None for f in FASES})
+    t0 = time.monotonic()
+    # con pool activo (daemon) reutiliza la conexión y el ping del pool valida el enlace
+    conn = pool_conexiones.conectar(
+        f"planta_{suffix}:supervisor",  # timeouts propios, no comparte con lectura_tablas
+        lambda: _conectar_por_fases(host, port, user, password, dbname, tiempos),
+    )
+    if tiempos["auth_s"] is None:
+        tiempos["auth_s"] = time.monotonic() - t0
+    try:
+        # simple ping para validar
+        t1 = time.monotonic()
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        tiempos["select_s"] = time.monotonic() - t1
+    finally:
+        conn.close()
+    tiempos["total_s"] = time.monotonic() - t0
+    return tiempos
+
+def _probar_planta(suffix: str):
+    """Ejecuta _try_connect_plant sin lanzar: retorna (tiempos, error)."""
+    tiempos = {}
+    try:
+        return _try_connect_plant(suffix, tiempos), None
+    except Exception as e:
+        return tiempos, e
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return None
+    k = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[k]
+
+def _cargar_latencias(path: str = LATENCIAS_FILE):
+    p = Path(path)
     if not p.exists():
-        p.touch()
-    with p.open("a", encoding="utf-8") as f:
-        f.write(linea + "\n")
+        return {}
+    try:
+        with p.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _guardar_latencias(data, path: str = LATENCIAS_FILE):
+    p = Path(path)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f)
+    tmp.replace(p)
 
-def _insert_problema(planta_key: str, problema: str,
-                     table_fqn: str = "soporte_tensor.problemas_conexion"):
-    """Inserta en tabla (id, fecha, planta, problema)."""
+def _actualizar_latencias(historial, planta_key, tiempos):
+    """
+    Agrega las muestras de un sondeo a la ventana móvil de la planta y
+    retorna {fase: {ultimo, p50, p95, p99, n}}.
+    """
+    por_fase = historial.setdefault(planta_key, {})
+    resumen = {}
+    for fase in FASES:
+        muestras = por_fase.setdefault(fase, [])
+        v = (tiempos or {}).get(fase)
+        if v is not None:
+            muestras.append(round(v, 4))
+            del muestras[:-VENTANA_LATENCIAS]
+        orden = sorted(muestras)
+        resumen[fase] = {
+            "ultimo": v,
+            "p50": _percentil(orden, 50),
+            "p95": _percentil(orden, 95),
+            "p99": _percentil(orden, 99),
+            "n": len(orden),
+        }
+    return resumen
+
+def _insert_problema(planta_key: str, problema: str, table_fqn: str = None):
+    """Inserta en tabla (id, fecha, planta, problema); por defecto TABLA_PROBLEMAS."""
+    table_fqn = table_fqn or TABLA_PROBLEMAS
     problema = (problema or "")[:1000]
     planta_key = (planta_key or "")[:30]
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if not problema.startswith(("RECUPERADA", "CIRCUITO")):  # ya quedan en el log como evento "circuito"
+        log_async.registrar("conexion_fallida", planta=planta_key, problema=problema)
+    sink = eventos_sink.activo()
+    if sink is not None:
+        sink.agregar(table_fqn, ("fecha", "planta", "problema"), (now, planta_key, problema))
+        return
     sql = f"INSERT INTO {table_fqn} (fecha, planta, problema) VALUES (%s, %s, %s)"
     conn = get_central_conn()
     try:
@@ -76,34 +175,87 @@ def _insert_problema(planta_key: str, problema: str,
         conn.commit()
     finally:
         conn.close()
-    _append_log(f"{now} | CONEXION_FALLIDA | planta={planta_key} | {problema}")
+
+def registrar_transicion(t, table_fqn: str = None):
+    """Fila de la tabla de problemas para un cambio de estado del circuito (circuito_plantas.transiciones)."""
+    _insert_problema(f"HOST_{t['planta']}", circuito_plantas.describir(t), table_fqn=table_fqn)
 
 # --- Función principal ---
-def verificar_conexiones_plantas(table_fqn: str = " estado_bd_remoto"):
+def verificar_conexiones_plantas(table_fqn: str = None, plantas=None):
     """
-    Recorre todas las plantas detectadas por HOST_XX y valida conexión.
-    Si falla, registra en 'table_fqn' y escribe en log.
+    Recorre todas las plantas detectadas por HOST_XX (o solo `plantas`) y valida
+    conexión, sondeando todas en paralelo. Cada resultado incluye la latencia por fase
+    (tcp, auth, SELECT 1, total) con percentiles p50/p95/p99 de la ventana móvil de la planta.
+    Si falla, registra en 'table_fqn' (TABLA_PROBLEMAS por defecto) y escribe en log (una vez por apertura del
+    circuito de la planta; con el circuito abierto la planta se omite sin sondear).
     """
+    with metricas.ciclo("conexiones"):
+        return _verificar_conexiones_plantas(table_fqn or TABLA_PROBLEMAS, plantas)
+
+def _verificar_conexiones_plantas(table_fqn, plantas=None):
     sufijos = _plant_suffixes_from_env()
+    if plantas is not None:
+        plantas = {str(p) for p in plantas}
+        sufijos = [s for s in sufijos if s in plantas]
+    if not sufijos:
+        return []
+    # las plantas con circuito abierto no se sondean hasta que venza su espera
+    permitidas = [s for s in sufijos if circuito_plantas.permitir(s)]
+    sondeos = {}
+    if permitidas:
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS_CONEXIONES, len(permitidas)))) as ex:
+            sondeos = dict(zip(permitidas, ex.map(_probar_planta, permitidas)))
+
+    historial = _cargar_latencias()
     resultados = []
-    for s in sufijos:
-        host_key = f"HOST_{s}"           # lo que se guardará en 'planta'
-        host_val = os.getenv(host_key)
-        try:
-            _try_connect_plant(s)
-            resultados.append({"planta": host_key, "host": host_val, "ok": True})
-        except Exception as e:
-            msg = f"{type(e).__name__}: {str(e)} (host={host_val})"
-            _insert_problema(host_key, msg, table_fqn=table_fqn)
-            resultados.append({"planta": host_key, "host": host_val, "ok": False, "error": str(e)})
+    with eventos_sink.ciclo(get_central_conn, habilitado=BUFFER_EVENTOS):
+        for s in sufijos:
+            host_key = f"HOST_{s}"           # lo que se guardará en 'planta'
+            host_val = registro_plantas.obtener().conexion(s)["host"]
+            if s not in sondeos:
+                metricas.fijar("planta_arriba", 0, planta=host_key)
+                resultados.append({"planta": host_key, "host": host_val, "ok": False, "omitida": True,
+                                   "error": "circuito abierto", "latencia": _actualizar_latencias(historial, host_key, None)})
+                continue
+            tiempos, err = sondeos[s]
+            latencia = _actualizar_latencias(historial, host_key, tiempos)
+            for fase, v in (tiempos or {}).items():
+                if v is not None:
+                    metricas.fijar("conexion_latencia_segundos", round(v, 6), planta=host_key, fase=fase[:-2])
+            metricas.fijar("planta_arriba", 1 if err is None else 0, planta=host_key)
+            if err is None:
+                circuito_plantas.exito(s)
+                resultados.append({"planta": host_key, "host": host_val, "ok": True, "latencia": latencia})
+            else:
+                msg = f"{type(err).__name__}: {str(err)} (host={host_val})"
+                metricas.incrementar("conexiones_fallidas", planta=host_key)
+                if circuito_plantas.fallo(s, msg):
+                    _insert_problema(host_key, msg, table_fqn=table_fqn)
+                resultados.append({"planta": host_key, "host": host_val, "ok": False, "error": str(err), "latencia": latencia})
+        # una fila por cambio de estado del circuito (el fallo que lo abre ya quedó registrado arriba)
+        for t in circuito_plantas.transiciones():
+            if t["de"] != "cerrado":
+                registrar_transicion(t, table_fqn)
+    _guardar_latencias(historial)
     return resultados
 
+def _fmt_ms(v):
+    return "-" if v is None else f"{v * 1000:.0f}ms"
+
+def imprimir_resultados(resultados):
+    for r in resultados:
+        tot = r["latencia"]["total_s"]
+        lat = f"p50={_fmt_ms(tot['p50'])} p95={_fmt_ms(tot['p95'])} p99={_fmt_ms(tot['p99'])}"
+        if r["ok"]:
+            fases = " ".join(f"{f[:-2]}={_fmt_ms(r['latencia'][f]['ultimo'])}" for f in ("tcp_s", "auth_s", "select_s"))
+            print(f"✅ Conectado: {r['planta']} ({r['host']}) {fases} | {lat}")
+        elif r.get("omitida"):
+            print(f"⏸️  Omitida: {r['planta']} ({r['host']}) -> circuito abierto | {lat}")
+        else:
+            print(f"❌ Error: {r['planta']} ({r['host']}) -> {r.get('error')} | {lat}")
+
 if __name__ == "__main__":
     print("Verificando conexiones con plantas...")
     resultados = verificar_conexiones_plantas()
     print("\nResumen de ejecución:\n")
-    for r in resultados:
-        if r["ok"]:
-            print(f"✅ Conectado: {r['planta']} ({r['host']})")
-        else:
-            print(f"❌ Error: {r['planta']} ({r['host']}) -> {r.get('error')}")
\ No newline at end of file
+    imprimir_resultados(resultados)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas sobre fake_mysql (servidor simulado, ver benchmark.py). Cada prueba corre en
+un directorio temporal: los módulos dejan sus archivos de estado en el directorio actual.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def directorio_temporal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+
+import analitica_sla as sla
+
+
+@pytest.fixture
+def fuentes(monkeypatch):
+    """Fuentes en memoria: {tabla: [filas]}; los resúmenes guardados quedan en 'guardado'."""
+    datos = {"tablas": {}, "guardado": [], "abiertas": {}}
+
+    def lotes(conn, fuente, columnas, desde_id, lote=2):
+        filas = [f for f in datos["tablas"].get(sla._clave(fuente), []) if f["id"] > desde_id]
+        for i in range(0, len(filas), lote):
+            yield filas[i:i + lote]
+
+    def guardar(conn, acc, progreso, abiertas=None):
+        datos["guardado"].append(acc)
+        if abiertas is not None:
+            datos["abiertas"] = dict(abiertas)
+
+    monkeypatch.setattr(sla, "_lotes", lotes)
+    monkeypatch.setattr(sla, "_guardar", guardar)
+    monkeypatch.setattr(sla, "_caidas_abiertas", lambda conn: dict(datos["abiertas"]))
+    monkeypatch.setattr(sla, "_columnas", lambda conn, fuente: {"id", "planta", "tipo", "fecha", "error"})
+    monkeypatch.setattr(sla.circuito_plantas, "CIRCUITO", False)
+    return datos
+
+
+def _agregar(datos, fuente, **fila):
+    filas = datos["tablas"].setdefault(sla._clave(fuente), [])
+    filas.append({"id": len(filas) + 1, **fila})
+
+
+def _por_planta(datos):
+    total = {}
+    for acc in datos["guardado"]:
+        for (dia, planta), cols in acc.plantas.items():
+            t = total.setdefault(planta, dict.fromkeys(sla._COLS_PLANTA, 0))
+            for c, v in cols.items():
+                t[c] += v
+    return total
+
+
+def test_caida_abierta_por_fila_de_circuito(fuentes):
+    """Sin fila de fallo previa (la planta cayó primero para lectura_tablas)."""
+    _agregar(fuentes, sla.SLA_TABLA_CONEXION, fecha=datetime(2026, 10, 17, 10, 0), planta="HOST_61",
+             problema="CIRCUITO semiabierto -> abierto: (2003, 'timed out')")
+    _agregar(fuentes, sla.SLA_TABLA_CONEXION, fecha=datetime(2026, 10, 17, 10, 40), planta="HOST_61",
+             problema="CIRCUITO abierto -> semiabierto")
+    _agregar(fuentes, sla.SLA_TABLA_CONEXION, fecha=datetime(2026, 10, 17, 10, 45), planta="HOST_61",
+             problema="RECUPERADA tras 2700 s")
+    sla._procesar_conexion(None, 0)
+    r = _por_planta(fuentes)["61"]
+    assert r["caidas"] == 1 and r["reparaciones"] == 1
+    assert r["minutos_caida"] == pytest.approx(45)
+    assert r["fallos_conexion"] == 1
+    assert fuentes["abiertas"] == {}
+
+
+def test_semiabierto_sin_caida_no_la_abre(fuentes):
+    _agregar(fuentes, sla.SLA_TABLA_CONEXION, fecha=datetime(2026, 10, 17, 10, 0), planta="HOST_61",
+             problema="CIRCUITO abierto -> semiabierto")
+    _agregar(fuentes, sla.SLA_TABLA_CONEXION, fecha=datetime(2026, 10, 17, 10, 1), planta="HOST_61",
+             problema="RECUPERADA tras 60 s")
+    sla._procesar_conexion(None, 0)
+    assert _por_planta(fuentes) == {}
+    assert fuentes["abiertas"] == {}
+
+
+def test_resync_de_tabla_de_12_caracteres():
+    acc = sla.Acumulado()
+    acc.resync({"fecha": datetime(2026, 10, 17, 10, 5), "tabla": "horometro_61",
+                "hora_detencion": datetime(2026, 10, 17, 10, 0)})
+    (clave, r), = acc.tablas.items()
+    assert clave[1] == "horometro_61"
+    assert (r["planta"], r["tipo"], r["resyncs"], r["desfase_max_s"]) == ("61", "horometro", 1, 300.0)
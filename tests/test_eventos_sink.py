@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+from pathlib import Path
+
+import pymysql
+
+import eventos_sink
+import fake_mysql
+
+
+def _sink(srv, **kw):
+    return eventos_sink.SinkEventos(lambda: srv.connect(host="central", database="soporte"), **kw)
+
+
+def test_grupo_que_falla_no_frena_a_los_demas(monkeypatch):
+    srv = fake_mysql.Servidor()
+    sink = _sink(srv)
+    sink.agregar("soporte.registro", ("tabla",), ("plc_61",))
+    sink.agregar("soporte.error", ("error",), ("x" * 2000,))
+    sink.agregar("soporte.errores", ("planta",), ("61",))
+    original = sink._insertar
+
+    def insertar(conn, tabla, columnas, grupo):
+        if tabla == "soporte.error":
+            raise pymysql.err.DataError(1406, "Data too long for column 'error' at row 1")
+        original(conn, tabla, columnas, grupo)
+    monkeypatch.setattr(sink, "_insertar", insertar)
+
+    assert sink.vaciar() == 2
+    base = srv.base("central", "soporte")
+    assert [f["tabla"] for f in base["registro"].filas] == ["plc_61"]
+    assert [f["planta"] for f in base["errores"].filas] == ["61"]
+    assert not Path(sink.spill_file).exists()
+    descartados = [json.loads(l) for l in Path(sink.descartados_file).read_text(encoding="utf-8").splitlines()]
+    assert [d["tabla"] for d in descartados] == ["soporte.error"]
+    assert "1406" in descartados[0]["error"]
+    assert sink.vaciar() == 0  # lo descartado no se reintenta
+
+
+def test_sin_conexion_queda_todo_pendiente():
+    srv = fake_mysql.Servidor()
+    srv.caidos.add("central")
+    sink = _sink(srv)
+    sink.agregar("errores", ("planta",), ("61",))
+    sink.agregar("registro", ("tabla",), ("plc_61",))
+    assert sink.vaciar() == 0
+    assert len(Path(sink.spill_file).read_text(encoding="utf-8").splitlines()) == 2
+    srv.caidos.clear()
+    assert sink.vaciar() == 2
+    assert not Path(sink.spill_file).exists()
+
+
+def test_conexion_cortada_a_mitad_de_vaciado(monkeypatch):
+    srv = fake_mysql.Servidor()
+    sink = _sink(srv)
+    sink.agregar("a", ("x",), (1,))
+    sink.agregar("b", ("x",), (2,))
+    sink.agregar("c", ("x",), (3,))
+    original = sink._insertar
+
+    def insertar(conn, tabla, columnas, grupo):
+        if tabla == "b":
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+        original(conn, tabla, columnas, grupo)
+    monkeypatch.setattr(sink, "_insertar", insertar)
+    assert sink.vaciar() == 1
+    pendientes = [json.loads(l)["tabla"] for l in Path(sink.spill_file).read_text(encoding="utf-8").splitlines()]
+    assert pendientes == ["b", "c"]
+
+
+def _escribir_spill(path, *tablas):
+    Path(path).write_text("".join(json.dumps({"tabla": t, "columnas": ["x"], "valores": [1]}) + "\n"
+                                  for t in tablas), encoding="utf-8")
+
+
+def test_recoge_pendientes_de_partes_que_ya_no_existen():
+    srv = fake_mysql.Servidor()
+    _escribir_spill("eventos_pendientes_3.jsonl", "a")   # de una corrida con 4 procesos
+    _escribir_spill("eventos_pendientes.jsonl", "b")     # de una corrida sin lectura_paralela
+    _escribir_spill("eventos_descartados.jsonl", "c")    # no es de la serie
+    sink = _sink(srv, spill_file="eventos_pendientes_0.jsonl")
+    assert sink.vaciar() == 2
+    base = srv.base("central", "soporte")
+    assert len(base["a"].filas) == len(base["b"].filas) == 1
+    assert not Path("eventos_pendientes_3.jsonl").exists()
+    assert not Path("eventos_pendientes.jsonl").exists()
+    assert Path("eventos_descartados.jsonl").exists()
+
+
+def test_pendientes_ajenos_pasan_al_propio_sin_conexion():
+    srv = fake_mysql.Servidor()
+    srv.caidos.add("central")
+    _escribir_spill("eventos_pendientes_2.jsonl", "a")
+    sink = _sink(srv, spill_file="eventos_pendientes.jsonl")
+    assert sink.vaciar() == 0
+    assert not Path("eventos_pendientes_2.jsonl").exists()
+    assert [json.loads(l)["tabla"] for l in Path("eventos_pendientes.jsonl").read_text(encoding="utf-8").splitlines()] == ["a"]
+
+
+def test_hermano_bloqueado_por_su_duenio_se_omite():
+    srv = fake_mysql.Servidor()
+    _escribir_spill("eventos_pendientes_1.jsonl", "a")
+    duenio = _sink(srv, spill_file="eventos_pendientes_1.jsonl")
+    sink = _sink(srv, spill_file="eventos_pendientes_0.jsonl")
+    with duenio._bloqueo_spill():
+        assert sink.vaciar() == 0
+    assert Path("eventos_pendientes_1.jsonl").exists()
+    assert duenio.vaciar() == 1
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+import pymysql
+import pytest
+
+import fake_mysql
+import lectura_tablas as lt
+
+
+def _central(tablas, filas=30, paso_s=5):
+    srv = fake_mysql.Servidor()
+    base = srv.base("central", "datos_base_plantas")
+    ultima = datetime.now().replace(microsecond=0)
+    for t in tablas:
+        base[t] = fake_mysql.Tabla(["id", "fecha", "fecha_busqueda"], [
+            {"id": i + 1, "fecha": ultima - timedelta(seconds=paso_s * (filas - 1 - i)),
+             "fecha_busqueda": ultima - timedelta(seconds=paso_s * (filas - 1 - i))}
+            for i in range(filas)])
+    return srv, srv.connect(host="central", database="datos_base_plantas")
+
+
+def test_lote_mezcla_tablas_con_y_sin_muestra():
+    tablas = ["plc_61", "horometro_61", "pesometro_61"]
+    _, conn = _central(tablas)
+    infos = lt.consultar_tablas_lote(conn, tablas, estrategias={"plc_61": "orden"}, con_span={"plc_61"})
+    assert infos["plc_61"]["span_llegadas_s"] == 5 * lt.modelo_llegadas.MUESTRA_LLEGADAS
+    assert infos["horometro_61"]["span_llegadas_s"] is None
+    assert infos["pesometro_61"]["span_llegadas_s"] is None
+
+
+def test_lote_sin_muestra_no_agrega_columna():
+    _, conn = _central(["plc_61", "plc_71"])
+    infos = lt.consultar_tablas_lote(conn, ["plc_61", "plc_71"])
+    assert all(i["span_llegadas_s"] is None for i in infos.values())
+
+
+def test_fake_rechaza_union_con_distintas_columnas():
+    _, conn = _central(["plc_61", "plc_71"])
+    sql = (f"SELECT %s AS tabla, x.* FROM ({lt._sql_fechas('plc_61', 'max', True)}) AS x UNION ALL "
+           f"SELECT %s AS tabla, x.* FROM ({lt._sql_fechas('plc_71', 'max')}) AS x")
+    with conn.cursor() as cur, pytest.raises(pymysql.err.OperationalError) as e:
+        cur.execute(sql, ("plc_61", "plc_71"))
+    assert e.value.args[0] == 1222
+
+
+@pytest.fixture
+def soporte(monkeypatch):
+    """Servidor simulado instalado como pymysql.connect, con registro_sincronizacion vacía."""
+    srv = fake_mysql.Servidor()
+    tabla = fake_mysql.Tabla(["id", "fecha", "tabla", "hora_detencion"])
+    srv.base(lt.DB_HOST, "soporte_tensor")["registro_sincronizacion"] = tabla
+    monkeypatch.setattr(lt, "_ancho_tabla_sync", None)
+    deshacer = fake_mysql.instalar(srv)
+    yield tabla
+    deshacer()
+
+
+@pytest.mark.parametrize("ancho, esperado", [(30, "horometro_61"), (10, "horometro_")])
+def test_resync_corta_al_ancho_de_la_columna(soporte, ancho, esperado):
+    soporte.anchos["tabla"] = ancho
+    ahora = datetime.now().replace(microsecond=0)
+    lt.registrar_sincronizacion(ahora, "horometro_61", ahora - timedelta(minutes=5))
+    assert soporte.filas[-1]["tabla"] == esperado
+
+
+def test_log_de_resync_con_nombre_completo(soporte):
+    soporte.anchos["tabla"] = 10
+    ahora = datetime.now().replace(microsecond=0)
+    lt.registrar_sincronizacion(ahora, "horometro_61", ahora - timedelta(minutes=5), log_file="sync.log")
+    lt.log_async.vaciar(5)
+    eventos = list(lt.log_async.consultar("sync.log", tabla="horometro_61"))
+    assert [e["evento"] for e in eventos] == ["resync"]
+    assert soporte.filas[-1]["tabla"] == "horometro_"
+
+
+@pytest.fixture
+def escenario(monkeypatch, directorio_temporal):
+    """Ciclo completo sobre fake_mysql: 2 plantas, todas las tablas atrasadas (ver benchmark.armar_escenario)."""
+    import json
+
+    import benchmark
+    import registro_plantas
+    import supervisor_conexiones_remotas as sup
+
+    srv, env, config = benchmark.armar_escenario(fake_mysql, 2, 100, 1.0, 0, 0, 0)
+    (directorio_temporal / "plantas.json").write_text(json.dumps(config), encoding="utf-8")
+    for k, v in env.items():
+        monkeypatch.setenv(k, v)
+    for modulo, nombre in ((lt, "CACHE_WATERMARKS"), (lt.circuito_plantas, "CIRCUITO"),
+                           (lt.cache_descubrimiento, "CACHE_DESCUBRIMIENTO"), (lt.modelo_llegadas, "MODELO_LLEGADAS")):
+        monkeypatch.setattr(modulo, nombre, False)
+    monkeypatch.setattr(lt, "DB_HOST", env["DB_HOST"])
+    monkeypatch.setattr(registro_plantas, "_registro", registro_plantas.cargar(str(directorio_temporal / "plantas.json")))
+    monkeypatch.setattr(lt.metricas, "_contadores", {})  # acumulan por proceso
+    deshacer = fake_mysql.instalar(srv, sup)
+    yield srv
+    deshacer()
+
+
+def _contadores():
+    res = {}
+    for (nombre, _), v in lt.metricas.exportar()["contadores"].items():
+        res[nombre] = res.get(nombre, 0) + v
+    return res
+
+
+def test_dry_run_no_cuenta_borrados(escenario, monkeypatch):
+    monkeypatch.setattr(lt, "RESYNC_DRY_RUN", True)
+    monkeypatch.setattr(lt, "MODO_RESYNC", "preciso")
+    lt.main()
+    c = _contadores()
+    assert "borrados" not in c and "filas_borradas" not in c
+    assert c["borrados_simulados"] == 6 and c["filas_borrado_simulado"] > 0
+    central = escenario.base("central", "datos_base_plantas")
+    assert {n: len(t.filas) for n, t in central.items()} == {n: 100 for n in central}
+
+
+def test_borrado_real_cuenta_borrados(escenario, monkeypatch):
+    monkeypatch.setattr(lt, "RESYNC_DRY_RUN", False)
+    lt.main()
+    c = _contadores()
+    assert c["borrados"] == 6 and c["filas_borradas"] > 0
+    assert "borrados_simulados" not in c
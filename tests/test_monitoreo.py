@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import sys
+
+import pytest
+
+import monitoreo
+
+MODULOS = {
+    "mod_retorna_datos": "def main(argv):\n    return {'ok': True}\n",
+    "mod_retorna_codigo": "def main(argv):\n    return 3\n",
+    "mod_sale": "import sys\ndef main(argv):\n    sys.exit(2)\n",
+    "mod_lanza": "def main(argv):\n    raise RuntimeError('sin conexión')\n",
+    "mod_script": "import sys\nif __name__ == '__main__':\n    sys.exit(4)\n",
+}
+
+
+@pytest.fixture
+def modulos(tmp_path, monkeypatch):
+    for nombre, codigo in MODULOS.items():
+        (tmp_path / f"{nombre}.py").write_text(codigo, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(monitoreo, "_SIN_MAIN", {"mod_script"})
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    yield
+    for nombre in MODULOS:
+        sys.modules.pop(nombre, None)
+
+
+@pytest.mark.parametrize("modulo,esperado", [
+    ("mod_retorna_datos", 0),
+    ("mod_retorna_codigo", 3),
+    ("mod_sale", 2),
+    ("mod_lanza", 1),
+    ("mod_script", 4),
+])
+def test_delegar_propaga_codigo_de_salida(modulos, modulo, esperado):
+    assert monitoreo._delegar(modulo, []) == esperado
+
+
+def test_subcomando_delegado_con_argumentos_invalidos(monkeypatch):
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    assert monitoreo.main(["log", "--opcion-que-no-existe"]) == 2
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import pymysql
+import pytest
+
+import fake_mysql
+import pool_conexiones
+
+
+@pytest.fixture
+def pool():
+    pool_conexiones.activar(max_por_clave=2)
+    yield pool_conexiones
+    pool_conexiones.desactivar()
+
+
+def test_claves_distintas_no_comparten_conexion(pool):
+    srv = fake_mysql.Servidor()
+    a = pool.conectar("planta_61:lectura", lambda: srv.connect(host="planta-61", read_timeout=10))
+    conn_a = a._conn
+    a.close()
+    b = pool.conectar("planta_61:supervisor", lambda: srv.connect(host="planta-61", read_timeout=6))
+    assert b._conn is not conn_a
+    b.close()
+    assert pool.estado() == {"planta_61:lectura": 1, "planta_61:supervisor": 1}
+
+
+def test_servidor_caido_un_solo_intento(pool, monkeypatch):
+    srv = fake_mysql.Servidor()
+    intentos = []
+    original = fake_mysql.ConexionFalsa.connect
+
+    def connect(self, sock=None):
+        intentos.append(self.host)
+        return original(self, sock)
+    monkeypatch.setattr(fake_mysql.ConexionFalsa, "connect", connect)
+
+    fabrica = lambda: srv.connect(host="planta-61")
+    c1, c2 = pool.conectar("planta_61:lectura", fabrica), pool.conectar("planta_61:lectura", fabrica)
+    c1.close()
+    c2.close()
+    intentos.clear()
+    srv.caidos.add("planta-61")
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.conectar("planta_61:lectura", fabrica)
+    assert intentos == ["planta-61"]  # solo la fábrica: ni el ping reconecta ni se prueba la otra ociosa
+    assert pool.estado().get("planta_61:lectura", 0) == 0